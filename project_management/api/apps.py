@@ -1,6 +1,18 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .metrics import install_query_timer
+        from .querywatch import install_query_watcher
+        from .search import reinstall_search_triggers
+
+        post_migrate.connect(reinstall_search_triggers, sender=self)
+        connection_created.connect(install_query_timer)
+        connection_created.connect(install_query_watcher)
@@ -0,0 +1,229 @@
+from functools import wraps
+from time import perf_counter
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import APIException, AuthenticationFailed
+from rest_framework.request import Request
+from rest_framework.utils.encoders import JSONEncoder
+
+from .authentication import CachedJWTAuthentication
+from .cache import acached_retrieve
+from .conditional import CollectionValidators
+from .filters import TaskFilterSerializer
+from .lean import aserialize_page
+from .metrics import add_render_time
+from .models import Projects, Tasks, Comments
+from .pagination import (
+    ProjectCursorPagination,
+    TaskCursorPagination,
+    CommentCursorPagination,
+)
+from .permissions import aget_project_roles, check_role, filter_visible
+from .querysets import optimize_queryset
+from .renderers import dumps
+from .routers import achoose_replica, replica_reads
+from .serializers import ProjectSerializer, TaskSerializer, CommentSerializer
+from .views import ProjectViewSet, TaskViewSet, CommentViewSet
+
+
+# Async read path
+#
+# Under ASGI, GET requests for project, task and comment lists and details
+# are served by these coroutines with the async ORM instead of occupying a
+# worker thread each. Writes and every other method fall through to the
+# DRF viewsets. Responses match the DRF views, minus the browsable API.
+
+
+def json_response(data, status_code=status.HTTP_200_OK):
+    started = perf_counter()
+    content = dumps(data)
+    if content is not None:
+        response = HttpResponse(
+            content, status=status_code, content_type="application/json"
+        )
+    else:
+        response = JsonResponse(
+            data, status=status_code, encoder=JSONEncoder, safe=False
+        )
+    add_render_time(perf_counter() - started)
+    return response
+
+
+async def aauthenticate(request):
+    """
+    Async `CachedJWTAuthentication`. Returns `(user, error response)`.
+    """
+    authentication = CachedJWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header else None
+    if raw_token is None:
+        return None, json_response(
+            {"detail": "Authentication credentials were not provided."},
+            status.HTTP_401_UNAUTHORIZED,
+        )
+    try:
+        token = authentication.get_validated_token(raw_token)
+        user = await authentication.aget_user(token)
+    except AuthenticationFailed as exc:
+        # Same body as DRF's exception handler
+        detail = exc.detail if isinstance(exc.detail, dict) else {"detail": exc.detail}
+        return None, json_response(detail, exc.status_code)
+    return user, None
+
+
+def async_read_view(viewset, actions):
+    """
+    Build a view that answers GET with the decorated coroutine and hands any
+    other method to `viewset.as_view(actions)`.
+    """
+    sync_view = sync_to_async(viewset.as_view(actions))
+
+    def decorator(handler):
+        @csrf_exempt
+        @wraps(handler)
+        async def view(request, *args, **kwargs):
+            if request.method != "GET":
+                return await sync_view(request, *args, **kwargs)
+            user, error = await aauthenticate(request)
+            if error is not None:
+                error.headers["WWW-Authenticate"] = 'Bearer realm="api"'
+                return error
+            request = Request(request)
+            request.user = user
+            try:
+                with replica_reads(await achoose_replica(user)):
+                    return await handler(request, *args, **kwargs)
+            except APIException as exc:
+                return json_response({"detail": exc.detail}, exc.status_code)
+
+        # Named after the viewset action it stands in for, as in api.metrics
+        view.cls, view.actions = viewset, actions
+        return view
+
+    return decorator
+
+
+@async_read_view(ProjectViewSet, {"get": "list", "post": "create"})
+async def project_list(request):
+    """GET /api/projects/"""
+    projects = filter_visible(Projects.objects.all(), request.user, "id")
+    projects = optimize_queryset(projects, ProjectSerializer)
+    paginator = ProjectCursorPagination()
+    page = await paginator.apaginate_queryset(projects, request)
+    serializer = ProjectSerializer(page, many=True)
+    return json_response(paginator.get_paginated_data(serializer.data))
+
+
+@async_read_view(
+    ProjectViewSet,
+    {
+        "get": "retrieve",
+        "put": "update",
+        "patch": "partial_update",
+        "delete": "destroy",
+    },
+)
+async def project_detail(request, pk):
+    """GET /api/projects/{id}/"""
+    check_role(await aget_project_roles(request), pk)
+    projects = optimize_queryset(Projects.objects.all(), ProjectSerializer)
+    data = await acached_retrieve(ProjectSerializer, projects, pk)
+    if data is not None:
+        return json_response(data)
+    return json_response(
+        {"detail": "Project not found"}, status.HTTP_404_NOT_FOUND
+    )
+
+
+@async_read_view(TaskViewSet, {"get": "list", "post": "create"})
+async def task_list(request, project_id):
+    """GET /api/projects/{project_id}/tasks/"""
+    check_role(await aget_project_roles(request), project_id)
+    params = TaskFilterSerializer(data=request.query_params)
+    if not params.is_valid():
+        return json_response(params.errors, status.HTTP_400_BAD_REQUEST)
+
+    paginator = TaskCursorPagination()
+    paginator.ordering = params.get_ordering()
+    fields = params.get_sparse_fields()
+    tasks = params.filter_queryset(Tasks.objects.filter(project_id=project_id))
+
+    validators = await CollectionValidators.acreate(
+        request, tasks, TaskSerializer, fields
+    )
+    not_modified = validators.not_modified_response()
+    if not_modified is not None:
+        return not_modified
+
+    data = await aserialize_page(
+        paginator,
+        tasks,
+        TaskSerializer,
+        request,
+        fields=fields,
+        extra_columns=[field.lstrip("-") for field in paginator.ordering],
+    )
+    return validators.apply(json_response(paginator.get_paginated_data(data)))
+
+
+@async_read_view(
+    TaskViewSet,
+    {
+        "get": "retrieve",
+        "put": "update",
+        "patch": "partial_update",
+        "delete": "destroy",
+    },
+)
+async def task_detail(request, pk):
+    """GET /api/tasks/{id}/"""
+    tasks = optimize_queryset(Tasks.objects.all(), TaskSerializer)
+    data = await acached_retrieve(TaskSerializer, tasks, pk)
+    if data is not None:
+        roles = await aget_project_roles(request)
+        check_role(roles, data["project"]["id"], detail="Task not found")
+        return json_response(data)
+    return json_response({"detail": "Task not found"}, status.HTTP_404_NOT_FOUND)
+
+
+@async_read_view(CommentViewSet, {"get": "list", "post": "create"})
+async def comment_list(request, task_id):
+    """GET /api/tasks/{task_id}/comments/"""
+    comments = filter_visible(
+        Comments.objects.filter(task_id=task_id), request.user, "task__project"
+    )
+    validators = await CollectionValidators.acreate(
+        request, comments, CommentSerializer
+    )
+    not_modified = validators.not_modified_response()
+    if not_modified is not None:
+        return not_modified
+
+    paginator = CommentCursorPagination()
+    data = await aserialize_page(paginator, comments, CommentSerializer, request)
+    return validators.apply(json_response(paginator.get_paginated_data(data)))
+
+
+@async_read_view(
+    CommentViewSet,
+    {
+        "get": "retrieve",
+        "put": "update",
+        "patch": "partial_update",
+        "delete": "destroy",
+    },
+)
+async def comment_detail(request, pk):
+    """GET /api/comments/{id}/"""
+    comments = filter_visible(
+        Comments.objects.filter(pk=pk), request.user, "task__project"
+    )
+    comment = await optimize_queryset(comments, CommentSerializer).afirst()
+    if comment:
+        return json_response(CommentSerializer(comment).data)
+    return json_response(
+        {"detail": "Comment not found"}, status.HTTP_404_NOT_FOUND
+    )
@@ -0,0 +1,108 @@
+import copy
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+class UserCache:
+    """
+    A small thread-safe LRU of `Users` rows whose entries expire after `ttl`
+    seconds. Saving or deleting a user evicts it in this process (see
+    `signals.py`); other processes pick the change up within `ttl`, which
+    bounds how long a deactivated user can keep authenticating.
+    """
+
+    def __init__(self, ttl=30, max_size=1024):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, pk):
+        with self._lock:
+            entry = self._entries.get(pk)
+            if entry is None:
+                return None
+            user, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[pk]
+                return None
+            self._entries.move_to_end(pk)
+        # Each request gets its own copy, so views cannot leak state
+        return copy.copy(user)
+
+    def set(self, user):
+        if user is None or self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[user.pk] = (copy.copy(user), time.monotonic() + self.ttl)
+            self._entries.move_to_end(user.pk)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def evict(self, pk):
+        with self._lock:
+            self._entries.pop(pk, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache(**settings.API_AUTH_CACHE)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    `JWTAuthentication` that resolves the token's user from `user_cache`,
+    so repeat requests from the same user do not query the database.
+    """
+
+    def get_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        user = user_cache.get(user_id)
+        if user is None:
+            user = self.user_model.objects.filter(
+                **{jwt_settings.USER_ID_FIELD: user_id}
+            ).first()
+            user_cache.set(user)
+        return self.check_user(user, validated_token)
+
+    async def aget_user(self, validated_token):
+        """
+        `get_user()` for async views, loading misses with the async ORM.
+        """
+        user_id = self.get_user_id(validated_token)
+        user = user_cache.get(user_id)
+        if user is None:
+            user = await self.user_model.objects.filter(
+                **{jwt_settings.USER_ID_FIELD: user_id}
+            ).afirst()
+            user_cache.set(user)
+        return self.check_user(user, validated_token)
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+    def check_user(self, user, validated_token):
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if jwt_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            jwt_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code="password_changed"
+            )
+        return user
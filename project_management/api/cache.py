@@ -0,0 +1,188 @@
+from threading import Lock
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework import serializers
+
+from .metrics import timed_data
+
+
+# Response cache
+#
+# Every cached response stores the `(model, pk)` of each object it renders
+# (e.g. a task, its project, the project owner and the assignee) together
+# with the version token each of those objects had at the time. Saving or
+# deleting any object replaces its version token, which makes every response
+# that embeds it stale without having to know which responses those are.
+
+_stats = {"hits": 0, "misses": 0}
+_stats_lock = Lock()
+
+
+def get_cache():
+    return caches[settings.API_RESPONSE_CACHE["ALIAS"]]
+
+
+def is_enabled():
+    return settings.API_RESPONSE_CACHE.get("ENABLED", True)
+
+
+def _record(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def cache_stats():
+    """
+    Return the hit/miss counters of this process.
+    """
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        for outcome in _stats:
+            _stats[outcome] = 0
+
+
+def version_key(label, pk):
+    return f"api:version:{label}:{pk}"
+
+
+def response_key(serializer_class, pk):
+    return f"api:response:{serializer_class.__name__}:{pk}"
+
+
+def bump_versions(model, pks):
+    """
+    Give each `(model, pk)` a new version token, invalidating every cached
+    response that embeds it.
+    """
+    label = model._meta.label_lower
+    get_cache().set_many(
+        {version_key(label, pk): uuid4().hex for pk in pks}, timeout=None
+    )
+
+
+def get_dependencies(serializer, instance):
+    """
+    Collect `(model label, pk)` for `instance` and every object nested in
+    its serialized representation.
+    """
+    dependencies = [(instance._meta.label_lower, instance.pk)]
+    for field in serializer.fields.values():
+        if field.write_only or not isinstance(field, serializers.Serializer):
+            continue
+        related = getattr(instance, field.source, None)
+        if related is not None:
+            dependencies.extend(get_dependencies(field, related))
+    return dependencies
+
+
+def _get_versions(cache, dependencies, create_missing=False):
+    keys = [version_key(label, pk) for label, pk in dependencies]
+    versions = cache.get_many(keys)
+    missing = {key: uuid4().hex for key in keys if key not in versions}
+    if missing and create_missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return [versions.get(key) for key in keys]
+
+
+def cached_retrieve(serializer_class, queryset, pk):
+    """
+    Return `serializer_class(queryset.get(pk=pk)).data`, served from the
+    response cache while none of the rendered objects has changed.
+    Returns None when the object does not exist.
+    """
+    try:
+        pk = queryset.model._meta.pk.to_python(pk)
+    except ValidationError:
+        return None
+    if not is_enabled():
+        instance = queryset.filter(pk=pk).first()
+        return timed_data(serializer_class(instance)) if instance else None
+
+    cache = get_cache()
+    key = response_key(serializer_class, pk)
+    entry = cache.get(key)
+    if entry is not None:
+        dependencies, versions, data = entry
+        if _get_versions(cache, dependencies) == versions:
+            _record("hits")
+            return data
+
+    _record("misses")
+    # Pin the object's own version before reading it, so a write that lands
+    # between the query and the store below is not cached as current. Read
+    # from the primary: a lagging replica's row would outlive the lag here.
+    label = queryset.model._meta.label_lower
+    (before,) = _get_versions(cache, [(label, pk)], create_missing=True)
+    instance = queryset.using(DEFAULT_DB_ALIAS).filter(pk=pk).first()
+    if instance is None:
+        return None
+    serializer = serializer_class(instance)
+    data = timed_data(serializer)
+    dependencies = get_dependencies(serializer, instance)
+    versions = _get_versions(cache, dependencies, create_missing=True)
+    if versions[0] == before:
+        cache.set(
+            key,
+            (dependencies, versions, data),
+            timeout=settings.API_RESPONSE_CACHE.get("TIMEOUT", 300),
+        )
+    return data
+
+
+async def _aget_versions(cache, dependencies, create_missing=False):
+    keys = [version_key(label, pk) for label, pk in dependencies]
+    versions = await cache.aget_many(keys)
+    missing = {key: uuid4().hex for key in keys if key not in versions}
+    if missing and create_missing:
+        await cache.aset_many(missing, timeout=None)
+        versions.update(missing)
+    return [versions.get(key) for key in keys]
+
+
+async def acached_retrieve(serializer_class, queryset, pk):
+    """
+    `cached_retrieve()` for async views, using the async cache and ORM APIs.
+    """
+    try:
+        pk = queryset.model._meta.pk.to_python(pk)
+    except ValidationError:
+        return None
+    if not is_enabled():
+        instance = await queryset.filter(pk=pk).afirst()
+        return timed_data(serializer_class(instance)) if instance else None
+
+    cache = get_cache()
+    key = response_key(serializer_class, pk)
+    entry = await cache.aget(key)
+    if entry is not None:
+        dependencies, versions, data = entry
+        if await _aget_versions(cache, dependencies) == versions:
+            _record("hits")
+            return data
+
+    _record("misses")
+    label = queryset.model._meta.label_lower
+    (before,) = await _aget_versions(cache, [(label, pk)], create_missing=True)
+    instance = await queryset.using(DEFAULT_DB_ALIAS).filter(pk=pk).afirst()
+    if instance is None:
+        return None
+    serializer = serializer_class(instance)
+    data = timed_data(serializer)
+    dependencies = get_dependencies(serializer, instance)
+    versions = await _aget_versions(cache, dependencies, create_missing=True)
+    if versions[0] == before:
+        await cache.aset(
+            key,
+            (dependencies, versions, data),
+            timeout=settings.API_RESPONSE_CACHE.get("TIMEOUT", 300),
+        )
+    return data
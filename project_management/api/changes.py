@@ -0,0 +1,193 @@
+from django.db import connections
+from django.db.models import BooleanField
+from django.db.models.expressions import RawSQL
+
+from .models import ChangeLog, ProjectMembers, Tasks, Comments
+from .querysets import optimize_queryset
+from .serializers import TaskSerializer, CommentSerializer, ProjectMemberSerializer
+
+
+# Change log
+#
+# Every write to a task, comment or member appends a row to `ChangeLog`.
+# Its auto-incrementing id is the sync token: a client that last synced at
+# token N fetches `id > N` for its project and gets only what changed since.
+# An object moved to another project is logged as deleted from the one it
+# left. A moved task's comments are logged too: deleted from the old project
+# and updated in the new one, whose clients have not seen them yet.
+
+# Entries must be read in commit order: a reader that saw entry N + 1 while
+# the transaction writing N was still open would move past N for good. On
+# SQLite a write holds the database lock until it commits, so ids become
+# visible in order. Postgres hands ids out at insert time, so there the log
+# is read by writing transaction (the `xact` column of migration 0011), then
+# id, and only up to the oldest transaction still open: whatever commits
+# later sorts after everything read. Tokens are entry ids on both.
+
+MAX_CHANGES = 1000
+
+COMMITTED = "xact < pg_snapshot_xmin(pg_current_snapshot())"
+AFTER_TOKEN = (
+    "(xact, id) > ("
+    "COALESCE((SELECT xact FROM api_changelog WHERE id = %s), '0'::xid8), %s)"
+)
+
+# label: (model, serializer, response key, lookup of the project id)
+SYNCED_MODELS = {
+    "task": (Tasks, TaskSerializer, "tasks", "project_id"),
+    "comment": (Comments, CommentSerializer, "comments", "task__project_id"),
+    "member": (ProjectMembers, ProjectMemberSerializer, "members", "project_id"),
+}
+
+_LABELS = {model: label for label, (model, *_) in SYNCED_MODELS.items()}
+
+
+def get_project_id(instance):
+    """
+    Return the project an instance belongs to, or None if it cannot be found.
+    """
+    if isinstance(instance, Comments):
+        if Comments.task.is_cached(instance):
+            return instance.task.project_id
+        return (
+            Tasks.objects.filter(pk=instance.task_id)
+            .values_list("project_id", flat=True)
+            .first()
+        )
+    return instance.project_id
+
+
+def record_changes(model, instances, action):
+    """
+    Append one change log entry per instance with a single INSERT.
+    """
+    label = _LABELS[model]
+    instances = list(instances)
+    # Comments whose task is not loaded get their projects in one query
+    task_ids = {
+        instance.task_id
+        for instance in instances
+        if isinstance(instance, Comments) and not Comments.task.is_cached(instance)
+    }
+    projects = dict(
+        Tasks.objects.filter(pk__in=task_ids).values_list("id", "project_id")
+        if task_ids
+        else ()
+    )
+    entries = []
+    for instance in instances:
+        if isinstance(instance, Comments) and instance.task_id in projects:
+            project_id = projects[instance.task_id]
+        else:
+            project_id = get_project_id(instance)
+        if project_id is not None:
+            entries.append(
+                ChangeLog(
+                    project_id=project_id,
+                    model=label,
+                    object_id=instance.pk,
+                    action=action,
+                )
+            )
+    ChangeLog.objects.bulk_create(entries)
+
+
+def remember_project(instance):
+    """
+    Note the project `instance` is in before it is saved, so that saving it
+    to another one logs the move (see `log_save`).
+    """
+    instance._project_before = get_project_id(instance)
+
+
+def record_moves(model, previous_projects, instances):
+    """
+    Log a tombstone in the project each of `instances` was moved out of,
+    given their `{pk: previous project id}`.
+    """
+    label = _LABELS[model]
+    moves = {}
+    for instance in instances:
+        previous, project_id = previous_projects.get(instance.pk), None
+        if previous is not None:
+            project_id = get_project_id(instance)
+        if previous not in (None, project_id):
+            moves[instance.pk] = (previous, project_id)
+    entries = [
+        ChangeLog(project_id=previous, model=label, object_id=pk, action="delete")
+        for pk, (previous, _) in moves.items()
+    ]
+    if model is Tasks and moves:
+        # The comments of moved tasks move with them
+        comments = Comments.objects.filter(task_id__in=moves).values_list(
+            "id", "task_id"
+        )
+        for pk, task_id in comments:
+            previous, project_id = moves[task_id]
+            for project, action in [(previous, "delete"), (project_id, "update")]:
+                entries.append(
+                    ChangeLog(
+                        project_id=project, model="comment", object_id=pk, action=action
+                    )
+                )
+    if entries:
+        ChangeLog.objects.bulk_create(entries)
+
+
+def log_entries(project_id, since=0):
+    """
+    The project's change log entries after token `since`, in commit order.
+    """
+    entries = ChangeLog.objects.filter(project_id=project_id)
+    if connections[entries.db].vendor != "postgresql":
+        return entries.filter(id__gt=since).order_by("id")
+    return entries.filter(
+        RawSQL(COMMITTED, [], output_field=BooleanField()),
+        RawSQL(AFTER_TOKEN, [since, since], output_field=BooleanField()),
+    ).order_by(RawSQL("xact", []), "id")
+
+
+def current_token(project_id):
+    last = log_entries(project_id).values_list("id", flat=True).last()
+    return last or 0
+
+
+def changes_since(project_id, since, limit=None):
+    """
+    Collapse the change log after `since` into the latest state of each
+    changed object: current representations for creates and updates, ids
+    (tombstones) for deletes. At most `limit` log entries are read.
+    """
+    limit = limit or MAX_CHANGES
+    entries = list(
+        log_entries(project_id, since).values_list(
+            "id", "model", "object_id", "action"
+        )[: limit + 1]
+    )
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    latest = {}
+    for _, label, object_id, action in entries:
+        latest[label, object_id] = action
+
+    result = {
+        "since": str(entries[-1][0] if entries else since),
+        "has_more": has_more,
+    }
+    for label, (model, serializer_class, key, lookup) in SYNCED_MODELS.items():
+        upserted, deleted = [], []
+        for (kind, pk), action in latest.items():
+            if kind == label:
+                (deleted if action == "delete" else upserted).append(pk)
+        # Objects deleted or moved away after this batch show up as tombstones
+        # in a later one
+        instances = optimize_queryset(
+            model.objects.filter(pk__in=upserted, **{lookup: project_id}),
+            serializer_class,
+        ).order_by("pk")
+        result[key] = {
+            "upserted": serializer_class(instances, many=True).data,
+            "deleted": sorted(deleted),
+        }
+    return result
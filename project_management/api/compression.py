@@ -0,0 +1,186 @@
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# Response compression
+#
+# Like Django's GZipMiddleware, with brotli (`pip install brotli`) and zstd
+# (`pip install zstandard`) when installed, the encoding picked from the
+# client's `Accept-Encoding` q-values and the server's preference order,
+# and a configurable level and minimum size (`API_COMPRESSION`). Streaming
+# responses (the project export) go through a single compressor, so they
+# are compressed as one stream rather than chunk by chunk. Responses that
+# already have a `Content-Encoding`, or whose content type is compressed
+# already (images, archives, ...), are left alone.
+
+# Content types not worth compressing again
+COMPRESSED_TYPES = (
+    "image/",
+    "audio/",
+    "video/",
+    "font/woff",
+    "application/gzip",
+    "application/x-gzip",
+    "application/zip",
+    "application/zstd",
+    "application/x-brotli",
+    "application/octet-stream",
+)
+UNCOMPRESSED_TYPES = ("image/svg+xml",)
+
+
+class BrotliCompressor:
+    def __init__(self, level):
+        self.compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self.compressor.process(data)
+
+    def flush(self):
+        return self.compressor.finish()
+
+
+def gzip_compressor(level):
+    # wbits=31 writes a gzip header (with a zero mtime) and trailer
+    return zlib.compressobj(level, zlib.DEFLATED, 31)
+
+
+def zstd_compressor(level):
+    return zstandard.ZstdCompressor(level=level).compressobj()
+
+
+COMPRESSORS = {"gzip": gzip_compressor}
+if brotli is not None:
+    COMPRESSORS["br"] = BrotliCompressor
+if zstandard is not None:
+    COMPRESSORS["zstd"] = zstd_compressor
+
+
+def get_config():
+    return settings.API_COMPRESSION
+
+
+def parse_accept_encoding(header):
+    """
+    Return `{coding: q}` for an `Accept-Encoding` header.
+    """
+    accepted = {}
+    for item in header.split(","):
+        coding, *params = item.split(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate_encoding(header, preference=None):
+    """
+    The coding to compress with: the available coding with the highest q
+    (ties going to the earlier one in `preference`), or None.
+    """
+    if preference is None:
+        preference = get_config()["ENCODINGS"]
+    accepted = parse_accept_encoding(header)
+    best, best_q = None, 0.0
+    for coding in preference:
+        if coding not in COMPRESSORS:
+            continue
+        q = accepted.get(coding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(data, coding, level):
+    compressor = COMPRESSORS[coding](level)
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_sequence(chunks, coding, level):
+    compressor = COMPRESSORS[coding](level)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+async def acompress_sequence(chunks, coding, level):
+    compressor = COMPRESSORS[coding](level)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def is_compressible(response):
+    content_type = response.get("Content-Type", "").split(";")[0].strip().lower()
+    if content_type.startswith(UNCOMPRESSED_TYPES):
+        return True
+    return not content_type.startswith(COMPRESSED_TYPES)
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    def process_response(self, request, response):
+        config = get_config()
+        if response.has_header("Content-Encoding") or not is_compressible(response):
+            return response
+        if response.streaming:
+            length = response.get("Content-Length")
+            if length is not None and int(length) < config["MIN_SIZE"]:
+                return response
+        elif len(response.content) < config["MIN_SIZE"]:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        coding = negotiate_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if coding is None:
+            return response
+        level = config["LEVELS"][coding]
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = acompress_sequence(
+                    response.streaming_content, coding, level
+                )
+            else:
+                response.streaming_content = compress_sequence(
+                    response.streaming_content, coding, level
+                )
+            del response.headers["Content-Length"]
+        else:
+            content = compress(response.content, coding, level)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response.headers["Content-Length"] = str(len(content))
+
+        # A strong ETag promises identical bytes (RFC 9110 8.8.1)
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = coding
+        return response
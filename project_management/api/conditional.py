@@ -0,0 +1,72 @@
+from hashlib import md5
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+from .querysets import get_related_lookups
+
+
+class CollectionValidators:
+    """
+    ETag for a list endpoint, computed from a single aggregate query instead
+    of serializing the payload.
+
+    The fingerprint covers the row count and `max(updated_at)` of the
+    collection and of every object its serializer nests, plus the non-null
+    count of each nested relation so that `SET_NULL` cascades are noticed.
+    The full path (filters, cursor, sparse fields) and the negotiated media
+    type are part of the ETag, so every page and representation has its own.
+
+    No Last-Modified is sent: `max(updated_at)` does not move when a row is
+    deleted, so If-Modified-Since alone would answer 304 for a stale list.
+    """
+
+    def __init__(self, request, queryset, serializer_class, fields=None, state=None):
+        if state is None:
+            state = queryset.order_by().aggregate(
+                **self.get_aggregates(serializer_class, fields)
+            )
+
+        fingerprint = "|".join(
+            [
+                request.get_full_path(),
+                getattr(request, "accepted_media_type", "") or "",
+                *(
+                    value.isoformat() if hasattr(value, "isoformat") else str(value)
+                    for value in state.values()
+                ),
+            ]
+        )
+        digest = md5(fingerprint.encode(), usedforsecurity=False).hexdigest()
+        self.etag = f"W/{quote_etag(digest)}"
+        self.request = request
+
+    @classmethod
+    async def acreate(cls, request, queryset, serializer_class, fields=None):
+        """
+        Build the validators with the async ORM.
+        """
+        state = await queryset.order_by().aaggregate(
+            **cls.get_aggregates(serializer_class, fields)
+        )
+        return cls(request, queryset, serializer_class, fields, state=state)
+
+    @staticmethod
+    def get_aggregates(serializer_class, fields=None):
+        select_related, _ = get_related_lookups(serializer_class, fields)
+        aggregates = {"count": Count("pk"), "updated_at": Max("updated_at")}
+        for index, lookup in enumerate(select_related):
+            aggregates[f"related_{index}"] = Count(lookup)
+            aggregates[f"related_{index}_updated_at"] = Max(f"{lookup}__updated_at")
+        return aggregates
+
+    def not_modified_response(self):
+        """
+        Return a 304 response if the client's copy is current, else None.
+        """
+        return get_conditional_response(self.request, etag=self.etag)
+
+    def apply(self, response):
+        response.headers["ETag"] = self.etag
+        return response
@@ -0,0 +1,78 @@
+from rest_framework import serializers
+
+from .models import Tasks
+from .serializers import TaskSerializer
+
+
+class CommaSeparatedChoiceField(serializers.CharField):
+    """
+    Accept `a,b,c` and validate every item against `choices`.
+    """
+
+    def __init__(self, choices, **kwargs):
+        self.choices = list(choices)
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        values = [value.strip() for value in super().to_internal_value(data).split(",")]
+        invalid = [value for value in values if value not in self.choices]
+        if invalid:
+            raise serializers.ValidationError(
+                f"Invalid value(s): {', '.join(invalid)}. "
+                f"Allowed values are: {', '.join(self.choices)}"
+            )
+        return values
+
+
+# Task list query parameters
+class TaskFilterSerializer(serializers.Serializer):
+    """
+    Validate the query string of GET /api/projects/{project_id}/tasks/.
+    """
+
+    ORDERING_FIELDS = ["created_at", "due_date", "title"]
+
+    status = CommaSeparatedChoiceField(
+        [choice for choice, _ in Tasks.STATUS_CHOICES], required=False
+    )
+    priority = CommaSeparatedChoiceField(
+        [choice for choice, _ in Tasks.PRIORITY_CHOICES], required=False
+    )
+    assigned_to = serializers.IntegerField(required=False)
+    due_after = serializers.DateTimeField(required=False)
+    due_before = serializers.DateTimeField(required=False)
+    ordering = serializers.ChoiceField(
+        choices=ORDERING_FIELDS + [f"-{field}" for field in ORDERING_FIELDS],
+        required=False,
+    )
+    fields = CommaSeparatedChoiceField(TaskSerializer.Meta.fields, required=False)
+
+    def filter_queryset(self, queryset):
+        """
+        Apply the validated filters to a `Tasks` queryset.
+        """
+        data = self.validated_data
+        if "status" in data:
+            queryset = queryset.filter(status__in=data["status"])
+        if "priority" in data:
+            queryset = queryset.filter(priority__in=data["priority"])
+        if "assigned_to" in data:
+            queryset = queryset.filter(assigned_to_id=data["assigned_to"])
+        if "due_after" in data:
+            queryset = queryset.filter(due_date__gte=data["due_after"])
+        if "due_before" in data:
+            queryset = queryset.filter(due_date__lte=data["due_before"])
+        return queryset
+
+    def get_ordering(self):
+        """
+        Keyset ordering for the paginator: the requested field, then `id`.
+        """
+        ordering = self.validated_data.get("ordering", "created_at")
+        return (ordering, "-id" if ordering.startswith("-") else "id")
+
+    def get_sparse_fields(self):
+        """
+        The requested sparse fieldset, or None for every field.
+        """
+        return self.validated_data.get("fields")
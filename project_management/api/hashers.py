@@ -0,0 +1,130 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.crypto import get_random_string
+
+
+# Password hashing policy
+#
+# PASSWORD_HASHERS lists the hashers below, the one named by
+# API_PASSWORD_HASHING["ALGORITHM"] first. Their cost parameters come from
+# API_PASSWORD_HASHING["OPTIONS"]; when either changes, stored hashes are
+# upgraded the next time their owner logs in (`check_password()` rehashes
+# whenever the hasher reports `must_update()`).
+
+
+def get_hasher_options(algorithm):
+    return settings.API_PASSWORD_HASHING.get("OPTIONS", {}).get(algorithm, {})
+
+
+class TunableHasherMixin:
+    def __init__(self):
+        for name, value in get_hasher_options(self.algorithm).items():
+            setattr(self, name, value)
+
+
+class Argon2PasswordHasher(TunableHasherMixin, hashers.Argon2PasswordHasher):
+    """Options: `time_cost`, `memory_cost` (KiB), `parallelism`."""
+
+
+class ScryptPasswordHasher(TunableHasherMixin, hashers.ScryptPasswordHasher):
+    """Options: `work_factor`, `block_size`, `parallelism`, `maxmem`."""
+
+
+class PBKDF2PasswordHasher(TunableHasherMixin, hashers.PBKDF2PasswordHasher):
+    """Options: `iterations`."""
+
+
+@receiver(setting_changed)
+def reset_hashers(*, setting, **kwargs):
+    if setting == "API_PASSWORD_HASHING":
+        hashers.get_hashers.cache_clear()
+        hashers.get_hashers_by_algorithm.cache_clear()
+    if setting in ("API_PASSWORD_HASHING", "PASSWORD_HASHERS"):
+        get_dummy_password.cache_clear()
+
+
+# Verification pool
+#
+# Hashing is CPU bound and the hash functions release the GIL, so a login
+# storm would otherwise run one hash per request thread at once. Logins are
+# verified by at most WORKERS threads; up to QUEUE more wait their turn and
+# anything beyond that is turned away instead of piling up.
+
+
+class VerificationBusy(Exception):
+    pass
+
+
+class VerificationPool:
+    def __init__(self, workers, queue):
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="password-verify"
+        )
+        self.slots = threading.BoundedSemaphore(workers + queue)
+
+    def submit(self, function, *args):
+        if not self.slots.acquire(blocking=False):
+            raise VerificationBusy
+
+        def run():
+            try:
+                return function(*args)
+            finally:
+                self.slots.release()
+
+        try:
+            return self.executor.submit(run)
+        except BaseException:
+            self.slots.release()
+            raise
+
+
+@lru_cache(maxsize=None)
+def get_verification_pool():
+    config = settings.API_PASSWORD_HASHING
+    return VerificationPool(config.get("WORKERS", 4), config.get("QUEUE", 64))
+
+
+@lru_cache(maxsize=None)
+def get_dummy_password():
+    return hashers.make_password(get_random_string(32))
+
+
+def _verify(password, encoded):
+    """
+    Return `(is_correct, upgraded hash or None)`. Runs on the pool, so it
+    does not touch the database.
+    """
+    upgraded = []
+
+    def upgrade(raw):
+        upgraded.append(hashers.make_password(raw))
+
+    is_correct = hashers.check_password(password, encoded, setter=upgrade)
+    return is_correct, (upgraded[0] if upgraded else None)
+
+
+def verify_password(user, password):
+    """
+    Check `password` for `user` on the verification pool, upgrading the
+    stored hash if the policy changed. When `user` is None the password is
+    checked against a dummy hash, so unknown emails cost as much as wrong
+    passwords. Raises `VerificationBusy` when the pool is full.
+    """
+    encoded = user.password if user is not None else get_dummy_password()
+    future = get_verification_pool().submit(_verify, password, encoded)
+    is_correct, upgraded = future.result(
+        timeout=settings.API_PASSWORD_HASHING.get("TIMEOUT", 10)
+    )
+    if user is None:
+        return False
+    if upgraded is not None:
+        user.password = upgraded
+        user.save(update_fields=["password"])
+    return is_correct
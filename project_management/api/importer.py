@@ -0,0 +1,390 @@
+import csv
+import json
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import (
+    Users,
+    Projects,
+    ProjectMembers,
+    Tasks,
+    Comments,
+    ImportCheckpoint,
+    ImportIdMap,
+)
+from .permissions import ADMIN, invalidate_project_roles
+from .search import (
+    drop_search_triggers,
+    install_search_index,
+    rebuild_search_index,
+    search_triggers_installed,
+)
+from .stats import rebuild_summary, summary_enabled
+
+
+# Bulk import
+#
+# Each input is an NDJSON or CSV file of one model, read one record at a
+# time and written with one `bulk_create()` per batch. Source ids are
+# mapped to the new primary keys in memory, so foreign keys in later inputs
+# (a task's `project`, a comment's `task`, ...) are resolved without
+# queries. With a job name, every batch commits its id map entries and
+# checkpoint in the same transaction as its rows, and a rerun of the job
+# resumes after the last committed batch.
+#
+# `bulk_create()` sends no signals: owner memberships, the task summary and
+# the search index (when its triggers were dropped) are rebuilt for the
+# imported rows at the end, and no change log entries are written.
+
+
+class InvalidRecord(Exception):
+    pass
+
+
+class Input:
+    """
+    How records of one model are read: `fields` are copied, `foreign_keys`
+    maps a field to the input its source ids refer to.
+    """
+
+    def __init__(self, name, model, fields, foreign_keys, mapped):
+        self.name = name
+        self.model = model
+        self.fields = fields
+        self.foreign_keys = foreign_keys
+        # Whether other inputs refer to this one's ids
+        self.mapped = mapped
+
+
+INPUTS = [
+    Input(
+        "users",
+        Users,
+        fields=[
+            "username",
+            "email",
+            "password",
+            "first_name",
+            "last_name",
+            "is_active",
+            "is_staff",
+            "date_joined",
+            "updated_at",
+        ],
+        foreign_keys={},
+        mapped=True,
+    ),
+    Input(
+        "projects",
+        Projects,
+        fields=["name", "description", "created_at", "updated_at"],
+        foreign_keys={"owner": "users"},
+        mapped=True,
+    ),
+    Input(
+        "members",
+        ProjectMembers,
+        fields=["role"],
+        foreign_keys={"project": "projects", "user": "users"},
+        mapped=False,
+    ),
+    Input(
+        "tasks",
+        Tasks,
+        fields=[
+            "title",
+            "description",
+            "status",
+            "priority",
+            "due_date",
+            "created_at",
+            "updated_at",
+        ],
+        foreign_keys={"project": "projects", "assigned_to": "users"},
+        mapped=True,
+    ),
+    Input(
+        "comments",
+        Comments,
+        fields=["content", "created_at", "updated_at"],
+        foreign_keys={"task": "tasks", "user": "users"},
+        mapped=False,
+    ),
+]
+
+# Indexes dropped by `--defer-indexes`; unique constraints always stay
+DEFERRABLE_MODELS = [Projects, ProjectMembers, Tasks, Comments]
+
+
+def read_records(path):
+    """
+    Yield the records of an NDJSON (one object per line) or CSV file. Empty
+    CSV cells are read as null.
+    """
+    with open(path, newline="", encoding="utf-8") as file:
+        if path.endswith(".csv"):
+            for record in csv.DictReader(file):
+                yield {
+                    key: value if value != "" else None for key, value in record.items()
+                }
+        else:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def index_names(model):
+    with connection.cursor() as cursor:
+        return set(
+            connection.introspection.get_constraints(cursor, model._meta.db_table)
+        )
+
+
+def drop_indexes():
+    with connection.schema_editor() as editor:
+        for model in DEFERRABLE_MODELS:
+            existing = index_names(model)
+            for index in model._meta.indexes:
+                if index.name in existing:
+                    editor.remove_index(model, index)
+    drop_search_triggers(connection)
+
+
+def restore_indexes():
+    """
+    Create whichever indexes are missing, including those of an earlier run
+    that stopped before restoring them. Returns the names created.
+    """
+    missing = []
+    for model in DEFERRABLE_MODELS:
+        existing = index_names(model)
+        missing += [
+            (model, index)
+            for index in model._meta.indexes
+            if index.name not in existing
+        ]
+    if missing:
+        with connection.schema_editor() as editor:
+            for model, index in missing:
+                editor.add_index(model, index)
+    created = [index.name for _, index in missing]
+    if not search_triggers_installed(connection):
+        install_search_index(connection)
+        rebuild_search_index(connection)
+        created.append("search index")
+    return created
+
+
+@contextmanager
+def explicit_timestamps(model):
+    """
+    Keep the timestamps of imported rows instead of `auto_now` overwriting
+    them; rows without one get the current time.
+    """
+    fields = [
+        field
+        for field in model._meta.concrete_fields
+        if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)
+    ]
+    flags = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield [field.attname for field in fields]
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, flags):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Importer:
+    def __init__(self, job=None, batch_size=1000, report=print, report_every=1.0):
+        self.job = job
+        self.batch_size = batch_size
+        self.report = report
+        self.report_every = report_every
+        self.id_maps = {spec.name: {} for spec in INPUTS if spec.mapped}
+        self.positions = {}
+        self.member_user_ids = set()
+        if job:
+            self.load_checkpoints()
+
+    def load_checkpoints(self):
+        for model, position in ImportCheckpoint.objects.filter(
+            job=self.job
+        ).values_list("model", "position"):
+            self.positions[model] = position
+        for model, source_id, target_id in (
+            ImportIdMap.objects.filter(job=self.job)
+            .values_list("model", "source_id", "target_id")
+            .iterator(chunk_size=10000)
+        ):
+            self.id_maps[model][source_id] = target_id
+
+    def run(self, sources, defer_indexes=False):
+        """
+        Import `{input name: path}` in dependency order. Instead of a path,
+        a source can be an iterable of records (e.g. generated ones).
+        """
+        if defer_indexes:
+            drop_indexes()
+        try:
+            for spec in INPUTS:
+                if spec.name in sources:
+                    self.import_file(spec, sources[spec.name])
+        finally:
+            started = time.monotonic()
+            created = restore_indexes()
+            if created:
+                elapsed = time.monotonic() - started
+                self.report(f"indexes: restored {len(created)} in {elapsed:.1f}s")
+        self.finish()
+
+    def import_file(self, spec, source):
+        skip = self.positions.get(spec.name, 0)
+        if skip:
+            self.report(f"{spec.name}: resuming after {skip:,} records")
+        position, rows = 0, 0
+        started = reported = time.monotonic()
+        batch = []
+        with explicit_timestamps(spec.model) as timestamps:
+            records = read_records(source) if isinstance(source, str) else source
+            for record in records:
+                position += 1
+                if position <= skip:
+                    continue
+                batch.append((record, self.build(spec, record, timestamps, position)))
+                if len(batch) >= self.batch_size:
+                    rows += self.save_batch(spec, batch, position)
+                    batch = []
+                    if time.monotonic() - reported >= self.report_every:
+                        reported = time.monotonic()
+                        self.report_rate(spec.name, rows, reported - started)
+            if batch:
+                rows += self.save_batch(spec, batch, position)
+        self.report_rate(spec.name, rows, time.monotonic() - started, done=True)
+
+    def report_rate(self, name, rows, elapsed, done=False):
+        rate = rows / elapsed if elapsed else 0
+        status = "done, " if done else ""
+        self.report(f"{name}: {status}{rows:,} rows ({rate:,.0f} rows/s)")
+
+    def build(self, spec, record, timestamps, position):
+        values = {}
+        try:
+            if spec.mapped and record.get("id") is None:
+                raise InvalidRecord("missing id")
+            for name in spec.fields:
+                if record.get(name) is not None:
+                    values[name] = self.clean(spec.model, name, record[name])
+            for name, target in spec.foreign_keys.items():
+                source_id = record.get(name)
+                if source_id is None:
+                    continue
+                try:
+                    values[f"{name}_id"] = self.id_maps[target][str(source_id)]
+                except KeyError:
+                    raise InvalidRecord(f"unknown {name} {source_id!r}")
+        except ValidationError as exc:
+            raise InvalidRecord(f"{spec.name} record {position}: {exc.messages[0]}")
+        except InvalidRecord as exc:
+            raise InvalidRecord(f"{spec.name} record {position}: {exc}")
+
+        now = timezone.now()
+        for attname in timestamps:
+            values.setdefault(attname, now)
+        if spec.model is Users:
+            # Passwords are imported as hashes; users without one cannot log in
+            values.setdefault("password", make_password(None))
+        return spec.model(**values)
+
+    @staticmethod
+    def clean(model, name, value):
+        """
+        Convert and validate choices, lengths and formats. Blank values are
+        allowed, as they are in rows created by the API.
+        """
+        field = model._meta.get_field(name)
+        value = field.to_python(value)
+        if field.choices and value not in dict(field.flatchoices):
+            raise ValidationError(f"Value {value!r} is not a valid choice.")
+        field.run_validators(value)
+        if isinstance(value, datetime) and timezone.is_naive(value):
+            value = timezone.make_aware(value)
+        return value
+
+    def save_batch(self, spec, batch, position):
+        objs = [obj for _, obj in batch]
+        with transaction.atomic():
+            spec.model.objects.bulk_create(objs)
+            if spec.mapped:
+                ids = {str(record["id"]): obj.pk for record, obj in batch}
+                if self.job:
+                    ImportIdMap.objects.bulk_create(
+                        ImportIdMap(
+                            job=self.job,
+                            model=spec.name,
+                            source_id=source_id,
+                            target_id=target_id,
+                        )
+                        for source_id, target_id in ids.items()
+                    )
+            if self.job:
+                ImportCheckpoint.objects.update_or_create(
+                    job=self.job, model=spec.name, defaults={"position": position}
+                )
+        # Only once committed
+        if spec.mapped:
+            self.id_maps[spec.name].update(ids)
+        if spec.model is ProjectMembers:
+            self.member_user_ids.update(obj.user_id for obj in objs)
+        return len(objs)
+
+    def finish(self):
+        """
+        Side effects of the signals `bulk_create()` skipped. Every imported
+        task and comment belongs to an imported project.
+        """
+        project_ids = set(self.id_maps["projects"].values())
+        owners = ensure_owner_memberships(project_ids)
+        invalidate_project_roles(
+            self.member_user_ids | {member.user_id for member in owners}
+        )
+        if summary_enabled():
+            rebuild_summary(project_ids)
+
+
+def ensure_owner_memberships(project_ids):
+    """
+    Owners are Admins of their projects, as the post_save signal would make
+    them. Returns the memberships created.
+    """
+    owners, existing = {}, set()
+    for batch in batched(sorted(project_ids), 500):
+        owners.update(
+            Projects.objects.filter(pk__in=batch).values_list("id", "owner_id")
+        )
+        owner_rows = ProjectMembers.objects.filter(
+            project_id__in=batch, user_id=F("project__owner_id")
+        )
+        existing.update(owner_rows.values_list("project_id", flat=True))
+        owner_rows.exclude(role=ADMIN).update(role=ADMIN)
+    return ProjectMembers.objects.bulk_create(
+        [
+            ProjectMembers(project_id=project_id, user_id=owner_id, role=ADMIN)
+            for project_id, owner_id in owners.items()
+            if project_id not in existing
+        ],
+        batch_size=1000,
+    )
+
+
+def batched(items, size):
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.importer import INPUTS, Importer, InvalidRecord
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk import users, projects, members, tasks and comments from NDJSON "
+        "or CSV files (one file per model, `.csv` files are read as CSV)."
+    )
+
+    def add_arguments(self, parser):
+        for spec in INPUTS:
+            parser.add_argument(
+                f"--{spec.name}",
+                metavar="PATH",
+                help=f"File of {spec.name}.",
+            )
+        parser.add_argument(
+            "--job",
+            help=(
+                "Name of the import. Progress and the id map are checkpointed "
+                "under it, and running the same job again resumes it."
+            ),
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--defer-indexes",
+            action="store_true",
+            help="Drop secondary indexes while loading and rebuild them at the end.",
+        )
+
+    def handle(self, *args, job=None, batch_size=1000, defer_indexes=False, **options):
+        paths = {spec.name: options[spec.name] for spec in INPUTS if options[spec.name]}
+        if not paths:
+            raise CommandError("Nothing to import.")
+        importer = Importer(job=job, batch_size=batch_size, report=self.stdout.write)
+        try:
+            importer.run(paths, defer_indexes=defer_indexes)
+        except (InvalidRecord, OSError, ValueError) as exc:
+            resume = f" Run it again with --job {job} to resume." if job else ""
+            raise CommandError(f"{str(exc).rstrip('.')}.{resume}")
+        self.stdout.write(self.style.SUCCESS("Import complete."))
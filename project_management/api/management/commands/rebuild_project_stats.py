@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from api.stats import rebuild_summary
+
+
+class Command(BaseCommand):
+    help = "Recompute the project task summary used by the stats endpoint."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--project",
+            type=int,
+            action="append",
+            dest="projects",
+            help="Only rebuild this project (repeatable).",
+        )
+
+    def handle(self, *args, projects=None, **options):
+        buckets = rebuild_summary(projects)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {buckets} summary rows."))
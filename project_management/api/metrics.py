@@ -0,0 +1,295 @@
+from bisect import bisect_left
+from contextvars import ContextVar
+from threading import Lock
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+
+
+# Request metrics
+#
+# `MetricsMiddleware` times every request and labels it with the view and
+# action it resolved to (e.g. `TaskViewSet.list`). The queries it runs are
+# counted and timed by a wrapper installed on every database connection.
+# Serializers building list pages and detail data (`timed_data()`) and the
+# JSON renderer report their own time. All of these go through the
+# request's `Sample` held in a context variable (which follows the request
+# into the threads `sync_to_async()` runs it in). Samples are added to
+# in-process histograms, served in the Prometheus text format on GET
+# /metrics.
+#
+# Each process keeps its own histograms; Prometheus sums them across
+# scrape targets. Streaming responses are timed up to their first byte and
+# their size is not recorded. Scrapes must send `API_METRICS["TOKEN"]`;
+# without one, the metrics are only served under DEBUG.
+
+# Process-wide counters kept by other modules, served along with the above
+COUNTERS = {
+    "api_response_cache_hits_total": ("Response cache hits", "hits"),
+    "api_response_cache_misses_total": ("Response cache misses", "misses"),
+}
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+HISTOGRAMS = {
+    "api_request_duration_seconds": ("Wall time of requests", SECONDS_BUCKETS),
+    "api_request_queries": ("Database queries per request", QUERY_BUCKETS),
+    "api_request_db_seconds": ("Database time per request", SECONDS_BUCKETS),
+    "api_request_serialize_seconds": ("Serializer time", SECONDS_BUCKETS),
+    "api_request_render_seconds": ("JSON rendering time", SECONDS_BUCKETS),
+    "api_response_size_bytes": ("Size of response bodies", SIZE_BUCKETS),
+}
+
+# Other methods are labelled "other", so that clients cannot add series
+METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+
+_sample = ContextVar("metrics_sample", default=None)
+
+
+class Sample:
+    __slots__ = ("queries", "db_time", "serialize_time", "render_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.render_time = 0.0
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    def __init__(self):
+        self.lock = Lock()
+        # {(metric, view, method): Histogram}
+        self.histograms = {}
+        # {(view, method, status): count}
+        self.requests = {}
+
+    def record(self, view, method, status, values):
+        if method not in METHODS:
+            method = "other"
+        with self.lock:
+            key = (view, method, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            for name, value in values.items():
+                histogram = self.histograms.get((name, view, method))
+                if histogram is None:
+                    histogram = Histogram(HISTOGRAMS[name][1])
+                    self.histograms[(name, view, method)] = histogram
+                histogram.observe(value)
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.requests.clear()
+
+    def render(self):
+        """
+        The metrics in the Prometheus text exposition format.
+        """
+        # Imported here: `api/cache.py` reports serializer time to this module
+        from .cache import cache_stats
+
+        with self.lock:
+            requests = sorted(self.requests.items())
+            histograms = sorted(
+                (key, (list(h.counts), h.sum, h.count, h.buckets))
+                for key, h in self.histograms.items()
+            )
+        lines = [
+            "# HELP api_requests_total Requests by view, method and status",
+            "# TYPE api_requests_total counter",
+        ]
+        for (view, method, status), count in requests:
+            labels = format_labels(view=view, method=method, status=status)
+            lines.append(f"api_requests_total{{{labels}}} {count}")
+        stats = cache_stats()
+        for name, (description, key) in COUNTERS.items():
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name} {stats[key]}")
+        current = None
+        for (name, view, method), (counts, total, count, buckets) in histograms:
+            if name != current:
+                current = name
+                lines.append(f"# HELP {name} {HISTOGRAMS[name][0]}")
+                lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, counts):
+                cumulative += bucket_count
+                labels = format_labels(view=view, method=method, le=bound)
+                lines.append(f"{name}_bucket{{{labels}}} {cumulative}")
+            labels = format_labels(view=view, method=method)
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"{name}_sum{{{labels}}} {total}")
+            lines.append(f"{name}_count{{{labels}}} {count}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def format_labels(**labels):
+    return ",".join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"),
+        )
+        for name, value in labels.items()
+    )
+
+
+def is_enabled():
+    return settings.API_METRICS["ENABLED"]
+
+
+def time_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper counting and timing the current request's
+    queries.
+    """
+    sample = _sample.get()
+    if sample is None:
+        return execute(sql, params, many, context)
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        sample.db_time += perf_counter() - started
+        sample.queries += 1
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """`connection_created` receiver."""
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+def add_serialize_time(seconds):
+    sample = _sample.get()
+    if sample is not None:
+        sample.serialize_time += seconds
+
+
+def timed_data(serializer):
+    """
+    `serializer.data`, timed as the current request's serialization.
+    """
+    started = perf_counter()
+    try:
+        return serializer.data
+    finally:
+        add_serialize_time(perf_counter() - started)
+
+
+def add_render_time(seconds):
+    sample = _sample.get()
+    if sample is not None:
+        sample.render_time += seconds
+
+
+def view_name(request):
+    """
+    `Class.action` for viewsets (and the async views standing in for them),
+    the view's dotted path otherwise.
+    """
+    match = request.resolver_match
+    if match is None:
+        return "unresolved"
+    view = match.func
+    cls = getattr(view, "cls", None)
+    if cls is None:
+        return f"{view.__module__}.{view.__qualname__}"
+    actions = getattr(view, "actions", None) or {}
+    action = actions.get(request.method.lower())
+    if action is None:
+        return cls.__name__
+    return f"{cls.__name__}.{action}"
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not is_enabled():
+            return self.get_response(request)
+        sample = Sample()
+        token = _sample.set(sample)
+        started = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _sample.reset(token)
+        self.record(request, response, sample, perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        if not is_enabled():
+            return await self.get_response(request)
+        sample = Sample()
+        token = _sample.set(sample)
+        started = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _sample.reset(token)
+        self.record(request, response, sample, perf_counter() - started)
+        return response
+
+    def record(self, request, response, sample, duration):
+        values = {
+            "api_request_duration_seconds": duration,
+            "api_request_queries": sample.queries,
+            "api_request_db_seconds": sample.db_time,
+            "api_request_serialize_seconds": sample.serialize_time,
+            "api_request_render_seconds": sample.render_time,
+        }
+        if not response.streaming:
+            values["api_response_size_bytes"] = len(response.content)
+        registry.record(
+            view_name(request), request.method, response.status_code, values
+        )
+
+
+def metrics_view(request):
+    """GET /metrics"""
+    token = settings.API_METRICS["TOKEN"]
+    if token:
+        header = request.headers.get("Authorization", "")
+        if not constant_time_compare(header, f"Bearer {token}"):
+            return HttpResponse(status=401)
+    elif not settings.DEBUG:
+        return HttpResponse(status=403)
+    return HttpResponse(
+        registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
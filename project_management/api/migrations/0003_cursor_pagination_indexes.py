@@ -0,0 +1,25 @@
+# Generated by Django 5.1.4 on 2026-10-18 02:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_alter_users_options_alter_users_managers_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comments',
+            index=models.Index(fields=['task', 'created_at', 'id'], name='comments_task_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projects',
+            index=models.Index(fields=['created_at', 'id'], name='projects_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tasks',
+            index=models.Index(fields=['project', 'created_at', 'id'], name='tasks_project_created_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.4 on 2026-10-18 02:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_cursor_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tasks',
+            index=models.Index(fields=['project', 'status'], name='tasks_project_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tasks',
+            index=models.Index(fields=['assigned_to', 'status', 'due_date'], name='tasks_assignee_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tasks',
+            index=models.Index(condition=models.Q(('status', 'Done'), _negated=True), fields=['project', 'due_date'], name='tasks_open_due_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.4 on 2026-10-18 02:59
+
+from django.db import migrations, models
+
+
+def add_owner_memberships(apps, schema_editor):
+    """
+    Project owners are Admin members of their projects.
+    """
+    Projects = apps.get_model("api", "Projects")
+    ProjectMembers = apps.get_model("api", "ProjectMembers")
+    owners = ProjectMembers.objects.filter(
+        project_id=models.OuterRef("pk"), user_id=models.OuterRef("owner_id")
+    )
+    ProjectMembers.objects.filter(
+        project__owner_id=models.F("user_id"), role="Member"
+    ).update(role="Admin")
+    ProjectMembers.objects.bulk_create(
+        [
+            ProjectMembers(project_id=project_id, user_id=owner_id, role="Admin")
+            for project_id, owner_id in Projects.objects.filter(
+                ~models.Exists(owners)
+            ).values_list("id", "owner_id").iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_changelog'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='projectmembers',
+            index=models.Index(fields=['user', 'project', 'role'], name='members_user_project_idx'),
+        ),
+        migrations.RunPython(add_owner_memberships, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.4 on 2026-10-18 03:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_project_owner_memberships'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectTaskSummary',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('project_id', models.IntegerField()),
+                ('status', models.CharField(max_length=15)),
+                ('priority', models.CharField(max_length=10)),
+                ('assignee_id', models.IntegerField()),
+                ('tasks', models.IntegerField(default=0)),
+                ('comments', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('project_id', 'status', 'priority', 'assignee_id'), name='task_summary_bucket_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,164 @@
+# Generated by Django 5.1.4 on 2026-10-18 03:15
+
+from django.db import migrations
+from django.db.utils import OperationalError
+
+
+# Full-text index over tasks and comments, see `api/search.py`. The SQL is
+# the one of this migration's time, copied so that later changes to the
+# module do not alter the history.
+
+SQLITE_INDEX = """
+CREATE VIRTUAL TABLE IF NOT EXISTS api_search_index USING fts5(
+    project, task UNINDEXED, title, body, tokenize = 'porter unicode61'
+)
+"""
+
+SQLITE_RANK = (
+    "INSERT INTO api_search_index(api_search_index, rank) "
+    "VALUES ('rank', 'bm25(0.0, 0.0, 4.0, 1.0)')"
+)
+
+SQLITE_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS api_search_task_insert
+    AFTER INSERT ON api_tasks BEGIN
+        INSERT INTO api_search_index(rowid, project, task, title, body)
+        VALUES (new.id * 2, new.project_id, new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_search_task_update
+    AFTER UPDATE OF title, description, project_id ON api_tasks
+    WHEN old.title IS NOT new.title
+        OR old.description IS NOT new.description
+        OR old.project_id IS NOT new.project_id
+    BEGIN
+        UPDATE api_search_index
+        SET project = new.project_id, title = new.title, body = new.description
+        WHERE rowid = old.id * 2;
+        UPDATE api_search_index SET project = new.project_id
+        WHERE old.project_id IS NOT new.project_id
+            AND rowid IN (SELECT id * 2 + 1 FROM api_comments WHERE task_id = new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_search_task_delete
+    AFTER DELETE ON api_tasks BEGIN
+        DELETE FROM api_search_index WHERE rowid = old.id * 2;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_search_comment_insert
+    AFTER INSERT ON api_comments BEGIN
+        INSERT INTO api_search_index(rowid, project, task, title, body)
+        SELECT new.id * 2 + 1, project_id, new.task_id, '', new.content
+        FROM api_tasks WHERE id = new.task_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_search_comment_update
+    AFTER UPDATE OF content, task_id ON api_comments
+    WHEN old.content IS NOT new.content OR old.task_id IS NOT new.task_id
+    BEGIN
+        UPDATE api_search_index
+        SET project = (SELECT project_id FROM api_tasks WHERE id = new.task_id),
+            task = new.task_id,
+            body = new.content
+        WHERE rowid = old.id * 2 + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_search_comment_delete
+    AFTER DELETE ON api_comments BEGIN
+        DELETE FROM api_search_index WHERE rowid = old.id * 2 + 1;
+    END
+    """,
+]
+
+SQLITE_REBUILD = [
+    """
+    INSERT INTO api_search_index(rowid, project, task, title, body)
+    SELECT id * 2, project_id, id, title, description FROM api_tasks
+    """,
+    """
+    INSERT INTO api_search_index(rowid, project, task, title, body)
+    SELECT c.id * 2 + 1, t.project_id, c.task_id, '', c.content
+    FROM api_comments c JOIN api_tasks t ON t.id = c.task_id
+    """,
+]
+
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS api_search_task_insert",
+    "DROP TRIGGER IF EXISTS api_search_task_update",
+    "DROP TRIGGER IF EXISTS api_search_task_delete",
+    "DROP TRIGGER IF EXISTS api_search_comment_insert",
+    "DROP TRIGGER IF EXISTS api_search_comment_update",
+    "DROP TRIGGER IF EXISTS api_search_comment_delete",
+    "DROP TABLE IF EXISTS api_search_index",
+]
+
+POSTGRES_INDEX = [
+    """
+    ALTER TABLE api_tasks ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english'::regconfig, title), 'A')
+        || setweight(to_tsvector('english'::regconfig, description), 'B')
+    ) STORED
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS tasks_search_idx
+    ON api_tasks USING GIN (search_vector)
+    """,
+    """
+    ALTER TABLE api_comments ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english'::regconfig, content), 'B')
+    ) STORED
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS comments_search_idx
+    ON api_comments USING GIN (search_vector)
+    """,
+]
+
+POSTGRES_DROP = [
+    "ALTER TABLE api_tasks DROP COLUMN IF EXISTS search_vector",
+    "ALTER TABLE api_comments DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    with schema_editor.connection.cursor() as cursor:
+        if vendor == "postgresql":
+            for statement in POSTGRES_INDEX:
+                cursor.execute(statement)
+            return
+        if vendor != "sqlite":
+            return
+        try:
+            cursor.execute(SQLITE_INDEX)
+        except OperationalError:
+            # SQLite built without FTS5: search falls back to scans
+            return
+        for statement in [SQLITE_RANK, *SQLITE_TRIGGERS, *SQLITE_REBUILD]:
+            cursor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    statements = {"postgresql": POSTGRES_DROP, "sqlite": SQLITE_DROP}
+    with schema_editor.connection.cursor() as cursor:
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            cursor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_project_task_summary'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.4 on 2026-10-18 03:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('job', models.CharField(max_length=100)),
+                ('model', models.CharField(max_length=20)),
+                ('position', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('job', 'model'), name='import_checkpoint_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ImportIdMap',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('job', models.CharField(max_length=100)),
+                ('model', models.CharField(max_length=20)),
+                ('source_id', models.CharField(max_length=64)),
+                ('target_id', models.IntegerField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('job', 'model', 'source_id'), name='import_id_map_uniq')],
+            },
+        ),
+    ]
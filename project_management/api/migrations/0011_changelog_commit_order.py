@@ -0,0 +1,44 @@
+# Generated by Django 5.1.4 on 2026-10-18 05:10
+
+from django.db import migrations
+
+
+# Postgres only: the transaction that wrote each change log entry, so that
+# the sync endpoint reads the log in commit order (see `api/changes.py`).
+# The column is not a model field: inserts leave it to its default.
+
+POSTGRES_COLUMN = [
+    """
+    ALTER TABLE api_changelog ADD COLUMN IF NOT EXISTS xact xid8
+    NOT NULL DEFAULT pg_current_xact_id()
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS changelog_commit_idx
+    ON api_changelog (project_id, xact, id)
+    """,
+]
+
+POSTGRES_DROP = ["ALTER TABLE api_changelog DROP COLUMN IF EXISTS xact"]
+
+
+def add_transaction_column(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        for statement in POSTGRES_COLUMN:
+            schema_editor.execute(statement)
+
+
+def drop_transaction_column(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        for statement in POSTGRES_DROP:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_import_checkpoints'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_transaction_column, drop_transaction_column),
+    ]
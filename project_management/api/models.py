@@ -37,6 +37,7 @@ class Users(AbstractBaseUser):
     first_name = models.CharField(max_length=30)
     last_name = models.CharField(max_length=30)
     date_joined = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
 
@@ -56,6 +57,12 @@ class Projects(models.Model):
     description = models.TextField()
     owner = models.ForeignKey(Users, on_delete=models.CASCADE, related_name="projects")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="projects_created_id_idx"),
+        ]
 
     def __str__(self):
         return self.name
@@ -74,6 +81,14 @@ class ProjectMembers(models.Model):
     )
     role = models.CharField(max_length=10, choices=ROLE_CHOICES)
 
+    class Meta:
+        indexes = [
+            # Covers the per-user role map and project visibility subqueries
+            models.Index(
+                fields=["user", "project", "role"], name="members_user_project_idx"
+            ),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.role} ({self.project.name})"
 
@@ -101,8 +116,27 @@ class Tasks(models.Model):
         Projects, on_delete=models.CASCADE, related_name="tasks"
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     due_date = models.DateTimeField()
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["project", "created_at", "id"], name="tasks_project_created_idx"
+            ),
+            models.Index(fields=["project", "status"], name="tasks_project_status_idx"),
+            models.Index(
+                fields=["assigned_to", "status", "due_date"],
+                name="tasks_assignee_status_idx",
+            ),
+            # Open tasks only: dashboards rarely look at finished work by due date
+            models.Index(
+                fields=["project", "due_date"],
+                condition=~models.Q(status="Done"),
+                name="tasks_open_due_idx",
+            ),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -114,6 +148,118 @@ class Comments(models.Model):
     user = models.ForeignKey(Users, on_delete=models.CASCADE, related_name="comments")
     task = models.ForeignKey(Tasks, on_delete=models.CASCADE, related_name="comments")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["task", "created_at", "id"], name="comments_task_created_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"Comment by {self.user.username} on {self.task.title}"
+
+
+# Change log model
+class ChangeLog(models.Model):
+    """
+    Append-only log of task, comment and member writes, read by the
+    incremental sync endpoint. `project_id` is a plain column rather than a
+    foreign key so that entries can be written while a project is being
+    deleted.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    MODEL_CHOICES = [("task", "task"), ("comment", "comment"), ("member", "member")]
+    ACTION_CHOICES = [("create", "create"), ("update", "update"), ("delete", "delete")]
+
+    project_id = models.IntegerField()
+    model = models.CharField(max_length=10, choices=MODEL_CHOICES)
+    object_id = models.IntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["project_id", "id"], name="changelog_project_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.action} {self.model} {self.object_id} (project {self.project_id})"
+
+
+# Project task summary model
+class ProjectTaskSummary(models.Model):
+    """
+    Materialized task and comment counts per project, one row per
+    `(status, priority, assignee)` combination, maintained from signals when
+    `API_PROJECT_STATS["SUMMARY"]` is on (see `stats.py`). Unassigned tasks
+    use `assignee_id` 0 so that the unique constraint covers them.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    project_id = models.IntegerField()
+    status = models.CharField(max_length=15)
+    priority = models.CharField(max_length=10)
+    assignee_id = models.IntegerField()
+    tasks = models.IntegerField(default=0)
+    comments = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["project_id", "status", "priority", "assignee_id"],
+                name="task_summary_bucket_uniq",
+            ),
+        ]
+
+    def __str__(self):
+        bucket = f"{self.status}/{self.priority}"
+        return f"{bucket}: {self.tasks} (project {self.project_id})"
+
+
+# Import checkpoint models
+class ImportCheckpoint(models.Model):
+    """
+    Number of records of each input of an import job already committed, so
+    that `manage.py import_data --job` can resume where it stopped.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    job = models.CharField(max_length=100)
+    model = models.CharField(max_length=20)
+    position = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["job", "model"], name="import_checkpoint_uniq"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.job} {self.model}: {self.position}"
+
+
+class ImportIdMap(models.Model):
+    """
+    Source id to local id of every user, project and task imported by a job,
+    committed with the rows themselves.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    job = models.CharField(max_length=100)
+    model = models.CharField(max_length=20)
+    source_id = models.CharField(max_length=64)
+    target_id = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["job", "model", "source_id"], name="import_id_map_uniq"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.job} {self.model} {self.source_id} -> {self.target_id}"
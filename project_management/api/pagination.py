@@ -0,0 +1,245 @@
+from base64 import b64decode, b64encode
+from urllib import parse
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetCursorPagination(BasePagination):
+    """
+    Keyset (seek) pagination over a unique, indexed ordering such as
+    `(created_at, id)`.
+
+    Unlike OFFSET pagination, every page is fetched with a
+    `WHERE (created_at, id) > (:last_created_at, :last_id)` filter, so the
+    cost of a page only depends on the page size, not on how deep it is.
+    Page sizes are configured per endpoint in
+    `REST_FRAMEWORK["PAGE_SIZE_LIMITS"]`.
+    """
+
+    ordering = ("created_at", "id")
+    page_size_key = "default"
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_page_size_limits(self):
+        """
+        Return `(default, max)` page sizes for this endpoint.
+        """
+        limits = settings.REST_FRAMEWORK.get("PAGE_SIZE_LIMITS", {})
+        endpoint = limits.get(self.page_size_key, limits.get("default", {}))
+        default = endpoint.get("default", 50)
+        return default, endpoint.get("max", default)
+
+    def get_page_size(self, request):
+        default, maximum = self.get_page_size_limits()
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return default
+        if page_size <= 0:
+            return default
+        return min(page_size, maximum)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self._page_queryset(queryset, request)
+        return self._set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        `paginate_queryset()` for async views, fetching with the async ORM.
+        """
+        queryset = self._page_queryset(queryset, request)
+        return self._set_page([instance async for instance in queryset])
+
+    def _page_queryset(self, queryset, request):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.position, self.reverse = self.decode_cursor(request)
+        model = queryset.model
+
+        ordering = self.ordering
+        if self.reverse:
+            ordering = tuple(self._flip(field) for field in ordering)
+        queryset = queryset.order_by(*ordering)
+        if self.position is not None:
+            queryset = queryset.filter(
+                self._seek_filter(model, ordering, self.position)
+            )
+        return queryset[: self.page_size + 1]
+
+    def _set_page(self, results):
+        has_more = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        if self.reverse:
+            self.page.reverse()
+            self.has_previous, self.has_next = has_more, self.position is not None
+        else:
+            self.has_previous, self.has_next = self.position is not None, has_more
+        return self.page
+
+    def get_paginated_data(self, data):
+        return {
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self._position(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self._position(self.page[0]), reverse=True)
+
+    def encode_cursor(self, position, reverse):
+        tokens = [("p", value) for value in position]
+        if reverse:
+            tokens.append(("r", "1"))
+        cursor = b64encode(parse.urlencode(tokens).encode("ascii")).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            tokens = parse.parse_qs(
+                b64decode(encoded.encode("ascii")).decode("ascii"),
+                keep_blank_values=True,
+            )
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        position = tokens.get("p", [])
+        if len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return tuple(position), tokens.get("r") == ["1"]
+
+    def _position(self, instance):
+        position = []
+        for field in self.ordering:
+            name = field.lstrip("-")
+            # Rows of the lean serializers are `values()` dicts
+            if isinstance(instance, dict):
+                value = instance[name]
+            else:
+                value = getattr(instance, name)
+            position.append(
+                value.isoformat() if hasattr(value, "isoformat") else str(value)
+            )
+        return position
+
+    def _seek_filter(self, model, ordering, position):
+        """
+        Build `(a, b, ...) > (x, y, ...)` honouring each field's direction.
+        """
+        values = []
+        for field, raw in zip(ordering, position):
+            try:
+                values.append(model._meta.get_field(field.lstrip("-")).to_python(raw))
+            except ValidationError:
+                raise NotFound(self.invalid_cursor_message)
+
+        condition = Q()
+        for index, field in enumerate(ordering):
+            name = field.lstrip("-")
+            operator = "lt" if field.startswith("-") else "gt"
+            step = Q(**{f"{name}__{operator}": values[index]})
+            for previous, value in zip(ordering[:index], values):
+                step &= Q(**{previous.lstrip("-"): value})
+            condition |= step
+        return condition
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith("-") else f"-{field}"
+
+    def get_html_context(self):
+        return {
+            "previous_url": self.get_previous_link(),
+            "next_url": self.get_next_link(),
+        }
+
+
+class ProjectCursorPagination(KeysetCursorPagination):
+    page_size_key = "projects"
+
+
+class TaskCursorPagination(KeysetCursorPagination):
+    page_size_key = "tasks"
+
+
+class CommentCursorPagination(KeysetCursorPagination):
+    page_size_key = "comments"
+
+
+class MemberCursorPagination(KeysetCursorPagination):
+    # ProjectMembers has no timestamp; the primary key is already monotonic
+    ordering = ("id",)
+    page_size_key = "members"
+
+
+class SearchPagination(KeysetCursorPagination):
+    """
+    Pages of ranked search hits, fetched with LIMIT/OFFSET via `?page=`.
+
+    Ranks are computed per query, so there is no stored ordering to seek
+    on; `max_page` bounds how deep a client can go instead.
+    """
+
+    page_size_key = "search"
+    page_query_param = "page"
+    max_page = 50
+
+    def paginate_search(self, search, request):
+        """
+        `search(limit, offset)` returns a list of hits.
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.number = self.get_page_number(request)
+        results = search(self.page_size + 1, (self.number - 1) * self.page_size)
+        self.page = results[: self.page_size]
+        self.has_previous = self.number > 1
+        self.has_next = len(results) > self.page_size and self.number < self.max_page
+        return self.page
+
+    def get_page_number(self, request):
+        try:
+            number = int(request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            raise NotFound("Invalid page")
+        if not 1 <= number <= self.max_page:
+            raise NotFound("Invalid page")
+        return number
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.base_url, self.page_query_param, self.number + 1
+        )
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.number == 2:
+            return remove_query_param(self.base_url, self.page_query_param)
+        return replace_query_param(
+            self.base_url, self.page_query_param, self.number - 1
+        )
+
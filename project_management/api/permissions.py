@@ -0,0 +1,126 @@
+from django.conf import settings
+from rest_framework.exceptions import NotFound, PermissionDenied
+
+from .cache import get_cache
+from .models import ProjectMembers
+
+
+# Project-scoped authorization
+#
+# `ProjectMembers` is the membership index: every project owner has an Admin
+# row (see `signals.py`). Members may read a project and write its tasks and
+# comments; Admins may also edit the project and manage its members.
+#
+# Object checks use the user's `{project_id: role}` map, loaded with one
+# index-only query, kept for the rest of the request and cached across
+# requests until one of the user's memberships changes. Collections whose
+# project is not known up front are filtered with a semi-join instead, so
+# users in thousands of projects do not send thousands of parameters.
+#
+# The map lives in the "api" cache. With a shared backend a membership
+# change clears it for every process. With the default local memory it is
+# cleared only in the process making the change, and the others keep it
+# for up to `API_PROJECT_ROLES["TIMEOUT"]` seconds.
+
+ADMIN = "Admin"
+MEMBER = "Member"
+
+
+def roles_key(user_id):
+    return f"api:roles:{user_id}"
+
+
+def roles_timeout():
+    # Bounds staleness in processes the invalidation does not reach
+    return settings.API_PROJECT_ROLES.get("TIMEOUT", 30)
+
+
+def membership_rows(user_id):
+    return ProjectMembers.objects.filter(user_id=user_id).values_list(
+        "project_id", "role"
+    )
+
+
+def build_roles(rows):
+    roles = {}
+    for project_id, role in rows:
+        # A user listed twice keeps the stronger role
+        if roles.get(project_id) != ADMIN:
+            roles[project_id] = role
+    return roles
+
+
+def invalidate_project_roles(user_ids):
+    get_cache().delete_many([roles_key(user_id) for user_id in user_ids])
+
+
+def get_user_roles(user_id):
+    """
+    Return the `{project_id: role}` map of a user, from the cache if possible.
+    """
+    key = roles_key(user_id)
+    roles = get_cache().get(key)
+    if roles is None:
+        roles = build_roles(membership_rows(user_id))
+        get_cache().set(key, roles, timeout=roles_timeout())
+    return roles
+
+
+def get_project_roles(request):
+    """
+    `get_user_roles()` for the request's user, loaded once per request.
+    """
+    roles = getattr(request, "_project_roles", None)
+    if roles is None:
+        roles = request._project_roles = get_user_roles(request.user.pk)
+    return roles
+
+
+async def aget_project_roles(request):
+    """
+    `get_project_roles()` for async views.
+    """
+    roles = getattr(request, "_project_roles", None)
+    if roles is None:
+        key = roles_key(request.user.pk)
+        roles = await get_cache().aget(key)
+        if roles is None:
+            rows = [row async for row in membership_rows(request.user.pk)]
+            roles = build_roles(rows)
+            await get_cache().aset(key, roles, timeout=roles_timeout())
+        request._project_roles = roles
+    return roles
+
+
+def check_role(roles, project_id, role=MEMBER, detail="Project not found"):
+    """
+    Raise `NotFound` if the user cannot see the project (so its existence is
+    not revealed) and `PermissionDenied` if their role is not enough.
+    """
+    try:
+        granted = roles.get(int(project_id))
+    except (TypeError, ValueError):
+        granted = None
+    if granted is None:
+        raise NotFound(detail)
+    if role == ADMIN and granted != ADMIN:
+        raise PermissionDenied("Only project admins can do this")
+
+
+def check_project_role(request, project_id, role=MEMBER, detail="Project not found"):
+    check_role(get_project_roles(request), project_id, role, detail)
+
+
+def visible_projects(user):
+    """
+    Subquery of the ids of the projects `user` belongs to.
+    """
+    return ProjectMembers.objects.filter(user_id=user.pk).values("project_id")
+
+
+def filter_visible(queryset, user, project_field="project"):
+    """
+    Restrict `queryset` to objects whose `project_field` is one of the
+    user's projects.
+    """
+    return queryset.filter(**{f"{project_field}__in": visible_projects(user)})
@@ -0,0 +1,91 @@
+from functools import lru_cache
+
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField
+
+
+def _lookup(prefix, source):
+    """
+    Turn a dotted serializer `source` into an ORM lookup under `prefix`.
+    """
+    path = source.replace(".", "__")
+    return f"{prefix}__{path}" if prefix else path
+
+
+def _walk(serializer, prefix, in_prefetch, lookups, fields=None):
+    for name, field in serializer.fields.items():
+        if field.write_only or (fields is not None and name not in fields):
+            continue
+        if field.source == "*" or isinstance(field, serializers.SerializerMethodField):
+            # The field reads arbitrary attributes: every column must be loaded
+            lookups["columns"] = None
+            continue
+        lookup = _lookup(prefix, field.source)
+
+        if isinstance(field, serializers.ListSerializer):
+            # Reverse FK / M2M nested with many=True: one extra query per relation
+            lookups["prefetch_related"].append(lookup)
+            _walk(field.child, lookup, True, lookups)
+        elif isinstance(field, serializers.BaseSerializer):
+            # Forward FK / one-to-one nested serializer: fold into the JOIN
+            if in_prefetch:
+                lookups["prefetch_related"].append(lookup)
+            else:
+                lookups["select_related"].append(lookup)
+            _walk(field, lookup, in_prefetch, lookups)
+        elif isinstance(field, ManyRelatedField):
+            lookups["prefetch_related"].append(lookup)
+        elif not in_prefetch and lookups["columns"] is not None:
+            # Plain columns and primary-key related fields (read from `<fk>_id`)
+            lookups["columns"].append(lookup)
+
+
+def _collect(serializer_class, fields):
+    if fields is not None:
+        fields = frozenset(fields)
+    return _collect_cached(serializer_class, fields)
+
+
+@lru_cache(maxsize=None)
+def _collect_cached(serializer_class, fields):
+    lookups = {"select_related": [], "prefetch_related": [], "columns": []}
+    _walk(serializer_class(), "", False, lookups, fields)
+    return lookups
+
+
+def get_related_lookups(serializer_class, fields=None):
+    """
+    Derive the `select_related` and `prefetch_related` lookups needed to
+    render `serializer_class` without issuing per-row queries.
+    """
+    lookups = _collect(serializer_class, fields)
+    return tuple(lookups["select_related"]), tuple(lookups["prefetch_related"])
+
+
+def get_loaded_columns(serializer_class, fields=None):
+    """
+    Derive the `only()` lookups `serializer_class` reads, or None when the
+    serializer may touch columns that cannot be known in advance.
+    """
+    columns = _collect(serializer_class, fields)["columns"]
+    return None if columns is None else tuple(columns)
+
+
+def optimize_queryset(queryset, serializer_class, fields=None, extra_columns=()):
+    """
+    Apply the joins and prefetches `serializer_class` needs to `queryset`.
+
+    With a sparse fieldset in `fields`, relations of dropped fields are not
+    joined and only the columns still rendered (plus `extra_columns`, e.g.
+    the pagination ordering) are fetched.
+    """
+    select_related, prefetch_related = get_related_lookups(serializer_class, fields)
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+    if prefetch_related:
+        queryset = queryset.prefetch_related(*prefetch_related)
+    if fields is not None:
+        columns = get_loaded_columns(serializer_class, fields)
+        if columns is not None:
+            queryset = queryset.only(*columns, *extra_columns)
+    return queryset
@@ -0,0 +1,254 @@
+import logging
+import os
+import re
+import sys
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from rest_framework.serializers import BaseSerializer, ListSerializer
+from rest_framework.views import APIView
+
+from .metrics import view_name
+
+
+# Slow and repeated queries
+#
+# A wrapper installed on every database connection (next to the metrics
+# one) hands the queries of a request to its `Report`, held in a context
+# variable like the metrics `Sample`. Statements are compared by their
+# fingerprint (the SQL with literals and IN lists collapsed, parameters are
+# never looked at), and one run `REPEAT_THRESHOLD` times in a request is
+# reported as an N+1, once; any statement slower than `SLOW_QUERY_MS` is
+# reported too. Only then is the stack walked, to find the view, the
+# serializers (outermost first) and the line of api/ code that ran it, so
+# requests without problems only pay for a dict lookup per query.
+#
+# `QueryWatchMiddleware` logs the problems of each request on the
+# "api.queries" logger; tests wrap requests in `assert_no_query_problems()`.
+# Queries run while a streaming response is consumed are not watched by
+# the middleware.
+
+logger = logging.getLogger("api.queries")
+
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+# The execute wrappers themselves are never the call site
+WRAPPER_FILES = {
+    os.path.join(API_DIR, "metrics.py"),
+    os.path.join(API_DIR, "querywatch.py"),
+}
+TRANSACTION_STATEMENTS = ("SAVEPOINT", "RELEASE", "ROLLBACK", "BEGIN", "COMMIT")
+MAX_SLOW_QUERIES = 20  # Per request
+
+_report = ContextVar("query_report", default=None)
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LISTS = re.compile(r"\((?:\s*(?:%s|\?)\s*,)*\s*(?:%s|\?)\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(sql):
+    """
+    `sql` with literals and placeholders lists collapsed, so that the same
+    statement for other rows gets the same fingerprint.
+    """
+    sql = _LITERALS.sub("?", sql)
+    sql = _LISTS.sub("(...)", sql)
+    return _SPACES.sub(" ", sql).strip()
+
+
+def is_enabled():
+    return settings.API_QUERY_WATCH["ENABLED"]
+
+
+def call_site():
+    """
+    `(view, serializers, location)` of the code running the current query.
+    """
+    view = None
+    serializers = []
+    location = None
+    frame = sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        owner = frame.f_locals.get("self")
+        if isinstance(owner, BaseSerializer):
+            if not isinstance(owner, ListSerializer):
+                name = type(owner).__name__
+                if name not in serializers:
+                    serializers.append(name)
+        elif view is None and isinstance(owner, APIView):
+            action = getattr(owner, "action", None)
+            view = type(owner).__name__ + (f".{action}" if action else "")
+        if (
+            location is None
+            and code.co_filename.startswith(API_DIR)
+            and code.co_filename not in WRAPPER_FILES
+        ):
+            filename = os.path.relpath(code.co_filename, os.path.dirname(API_DIR))
+            location = f"{filename}:{frame.f_lineno} in {code.co_name}"
+        frame = frame.f_back
+    return view, serializers[::-1], location
+
+
+class Problem:
+    __slots__ = ("kind", "sql", "count", "duration", "view", "serializers", "location")
+
+    def __init__(self, kind, sql, count, duration):
+        self.kind = kind
+        self.sql = sql
+        self.count = count
+        self.duration = duration
+        self.view, self.serializers, self.location = call_site()
+
+    def describe(self, view=None):
+        if self.kind == "repeated":
+            summary = f"N+1 query, run {self.count} times"
+        else:
+            summary = f"Slow query, {self.duration * 1000:.1f} ms"
+        parts = [f"{summary} in {self.view or view or 'unknown view'}"]
+        if self.serializers:
+            parts.append("serializer " + " > ".join(self.serializers))
+        if self.location:
+            parts.append(f"at {self.location}")
+        return ", ".join(parts) + f": {self.sql[:500]}"
+
+
+class Report:
+    def __init__(self, repeat_threshold=None, slow_query_ms=None):
+        options = settings.API_QUERY_WATCH
+        if repeat_threshold is None:
+            repeat_threshold = options["REPEAT_THRESHOLD"]
+        if slow_query_ms is None:
+            slow_query_ms = options["SLOW_QUERY_MS"]
+        self.repeat_threshold = repeat_threshold
+        self.slow_query = slow_query_ms / 1000
+        self.queries = 0
+        # {fingerprint: count}
+        self.counts = {}
+        # {fingerprint: Problem}
+        self.repeated = {}
+        self.slow = []
+
+    @property
+    def problems(self):
+        return [*self.repeated.values(), *self.slow]
+
+    def add(self, sql, duration):
+        self.queries += 1
+        key = fingerprint(sql)
+        if key.startswith(TRANSACTION_STATEMENTS):
+            return
+        count = self.counts.get(key, 0) + 1
+        self.counts[key] = count
+        if count >= self.repeat_threshold:
+            problem = self.repeated.get(key)
+            if problem is None:
+                self.repeated[key] = Problem("repeated", key, count, duration)
+            else:
+                problem.count = count
+                problem.duration += duration
+        if duration >= self.slow_query and len(self.slow) < MAX_SLOW_QUERIES:
+            self.slow.append(Problem("slow", sql, 1, duration))
+
+
+def watch_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper handing the current request's queries to its
+    `Report`.
+    """
+    report = _report.get()
+    if report is None:
+        return execute(sql, params, many, context)
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        report.add(sql, perf_counter() - started)
+
+
+def install_query_watcher(sender, connection, **kwargs):
+    """`connection_created` receiver."""
+    if watch_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(watch_query)
+
+
+@contextmanager
+def watch_queries(repeat_threshold=None, slow_query_ms=None):
+    """
+    Collect the queries run in the block (and in the threads
+    `sync_to_async()` runs it in) into the `Report` it yields.
+    """
+    for connection in connections.all(initialized_only=True):
+        install_query_watcher(None, connection)
+    report = Report(repeat_threshold, slow_query_ms)
+    token = _report.set(report)
+    try:
+        yield report
+    finally:
+        _report.reset(token)
+
+
+@contextmanager
+def assert_no_query_problems(repeat_threshold=None, slow_query_ms=None):
+    """
+    Fail with the problems found if the block runs an N+1 or slow query.
+    """
+    with watch_queries(repeat_threshold, slow_query_ms) as report:
+        yield report
+    if report.problems:
+        raise AssertionError(
+            "\n".join(problem.describe() for problem in report.problems)
+        )
+
+
+class QueryWatchMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        # Leaves the queries to an enclosing `watch_queries()`
+        if not is_enabled() or _report.get() is not None:
+            return self.get_response(request)
+        report = Report()
+        token = _report.set(report)
+        try:
+            response = self.get_response(request)
+        finally:
+            _report.reset(token)
+        self.log(request, report)
+        return response
+
+    async def __acall__(self, request):
+        if not is_enabled() or _report.get() is not None:
+            return await self.get_response(request)
+        report = Report()
+        token = _report.set(report)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _report.reset(token)
+        self.log(request, report)
+        return response
+
+    def log(self, request, report):
+        for problem in report.problems:
+            logger.warning(
+                "%s %s: %s",
+                request.method,
+                request.path,
+                problem.describe(view_name(request)),
+            )
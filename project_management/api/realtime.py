@@ -0,0 +1,237 @@
+import asyncio
+import json
+import re
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from .authentication import CachedJWTAuthentication
+from .models import ProjectMembers
+from .permissions import get_user_roles
+
+
+# Broadcast layer
+#
+# Views publish task and comment events to a per-project group; every
+# WebSocket subscribed to that project receives them. `publish()` may be
+# called from any thread, `subscribe()` from inside the event loop that
+# consumes the subscription.
+
+
+class Subscription:
+    """
+    A bounded queue of messages for one consumer. When a slow client falls
+    `max_queue` messages behind, the oldest ones are dropped; clients can
+    catch up with the changes endpoint.
+    """
+
+    def __init__(self, backend, group, max_queue):
+        self.backend = backend
+        self.group = group
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=max_queue)
+
+    def deliver(self, message):
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            # The consumer's event loop is gone
+            self.backend.unsubscribe(self)
+
+    def _put(self, message):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.backend.unsubscribe(self)
+
+
+class BaseBroadcastBackend:
+    def __init__(self, max_queue=100, **options):
+        self.max_queue = max_queue
+
+    def subscribe(self, group):
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription):
+        raise NotImplementedError
+
+    def publish(self, group, message):
+        raise NotImplementedError
+
+
+class LocalBroadcastBackend(BaseBroadcastBackend):
+    """
+    In-process fan-out. Only reaches WebSockets served by the same process,
+    so it suits tests and single-process deployments; multi-process
+    deployments need a backend implementing the same three methods on top
+    of a shared pub/sub service.
+    """
+
+    def __init__(self, max_queue=100, **options):
+        super().__init__(max_queue, **options)
+        self._groups = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, group):
+        subscription = Subscription(self, group, self.max_queue)
+        with self._lock:
+            self._groups[group].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._groups.get(subscription.group)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._groups[subscription.group]
+
+    def publish(self, group, message):
+        with self._lock:
+            subscribers = list(self._groups.get(group, ()))
+        for subscription in subscribers:
+            subscription.deliver(message)
+
+
+@lru_cache(maxsize=None)
+def get_broadcast_backend():
+    config = settings.API_BROADCAST
+    return import_string(config["BACKEND"])(**config.get("OPTIONS", {}))
+
+
+def project_group(project_id):
+    return f"project-{project_id}"
+
+
+def user_group(user_id):
+    return f"user-{user_id}"
+
+
+def publish_roles_changed(user_ids):
+    """
+    Have the users' WebSockets check their project membership again.
+    """
+    backend = get_broadcast_backend()
+    for user_id in user_ids:
+        backend.publish(user_group(user_id), "roles")
+
+
+def publish_event(project_id, model, action, objects):
+    """
+    Publish `<model>.<action>` for `objects` to the project's subscribers
+    once the current transaction commits.
+    """
+    message = json.dumps(
+        {"type": f"{model}.{action}", "project": int(project_id), "objects": objects},
+        cls=JSONEncoder,
+    )
+    transaction.on_commit(
+        lambda: get_broadcast_backend().publish(project_group(project_id), message)
+    )
+
+
+# WebSocket endpoint: ws(s)://<host>/ws/projects/<project_id>/?token=<access token>
+#
+# The socket is closed with 4401 when the access token expires, and with 4403
+# once the user is no longer a member of the project: checked whenever their
+# memberships change, and every `API_BROADCAST["RECHECK_SECONDS"]` in case
+# that notice came from another process's broadcast backend.
+
+PROJECT_PATH = re.compile(r"^/ws/projects/(?P<project_id>\d+)/$")
+
+
+def authenticate(scope, project_id):
+    """
+    Resolve the JWT in the query string and check the user is a member of
+    the project.
+    Returns the user and the token's expiry (a timestamp), or None.
+    """
+    query = parse_qs(scope.get("query_string", b"").decode())
+    token = query.get("token", [None])[0]
+    if not token:
+        return None
+    authentication = CachedJWTAuthentication()
+    try:
+        validated_token = authentication.get_validated_token(token)
+        user = authentication.get_user(validated_token)
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+    if not ProjectMembers.objects.filter(project_id=project_id, user=user).exists():
+        return None
+    return user, validated_token["exp"]
+
+
+def is_member(user_id, project_id):
+    return project_id in get_user_roles(user_id)
+
+
+async def websocket_application(scope, receive, send):
+    match = PROJECT_PATH.match(scope["path"])
+    message = await receive()
+    if message["type"] != "websocket.connect":
+        return
+    if match is None:
+        await send({"type": "websocket.close", "code": 4404})
+        return
+    project_id = int(match["project_id"])
+    authenticated = await sync_to_async(authenticate)(scope, project_id)
+    if authenticated is None:
+        await send({"type": "websocket.close", "code": 4401})
+        return
+    user, expires_at = authenticated
+
+    backend = get_broadcast_backend()
+    subscription = backend.subscribe(project_group(project_id))
+    roles_changed = backend.subscribe(user_group(user.pk))
+    await send({"type": "websocket.accept"})
+    receiving = asyncio.ensure_future(receive())
+    publishing = asyncio.ensure_future(subscription.get())
+    rechecking = asyncio.ensure_future(roles_changed.get())
+    recheck_seconds = settings.API_BROADCAST.get("RECHECK_SECONDS", 60)
+    recheck_at = time.time() + recheck_seconds
+    try:
+        while True:
+            done, _ = await asyncio.wait(
+                {receiving, publishing, rechecking},
+                timeout=max(min(expires_at, recheck_at) - time.time(), 0),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if time.time() >= expires_at:
+                await send({"type": "websocket.close", "code": 4401})
+                break
+            if rechecking in done or time.time() >= recheck_at:
+                if rechecking in done:
+                    rechecking = asyncio.ensure_future(roles_changed.get())
+                recheck_at = time.time() + recheck_seconds
+                if not await sync_to_async(is_member)(user.pk, project_id):
+                    await send({"type": "websocket.close", "code": 4403})
+                    break
+            if receiving in done:
+                if receiving.result()["type"] == "websocket.disconnect":
+                    break
+                # Client messages are ignored; the socket is push-only
+                receiving = asyncio.ensure_future(receive())
+            if publishing in done:
+                await send({"type": "websocket.send", "text": publishing.result()})
+                publishing = asyncio.ensure_future(subscription.get())
+    finally:
+        subscription.close()
+        roles_changed.close()
+        receiving.cancel()
+        publishing.cancel()
+        rechecking.cancel()
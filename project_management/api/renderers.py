@@ -0,0 +1,177 @@
+from math import isfinite
+from time import perf_counter
+
+from django.conf import settings
+from rest_framework import serializers
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .metrics import add_render_time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Fast JSON
+#
+# The renderer and parser use orjson when it is installed
+# (`pip install orjson`) and DRF's stdlib `json` ones otherwise. orjson
+# writes datetimes itself and everything else DRF's encoder knows (Decimal,
+# lazy strings, querysets, ...) goes through the encoder's `default()`, so
+# the output is the same, byte for byte: compact, UTF-8, with U+2028 and
+# U+2029 escaped. Indented output (the browsable API, `; indent=` media
+# types), the non-default `UNICODE_JSON` / `COMPACT_JSON` / `STRICT_JSON`
+# settings and values orjson cannot write (integers over 64 bits) fall back
+# to the stdlib. orjson writes NaN and infinities as `null`, so output with
+# a `null` is checked for them and falls back to the stdlib too, which
+# raises like DRF's strict renderer. The check skips what serializers
+# without float fields (`.data`, lean pages) produced, which is most of a
+# response.
+
+if orjson is not None:
+    OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+    # orjson writes U+2028 and U+2029 as is
+    ESCAPES = [(b"\xe2\x80\xa8", b"\\u2028"), (b"\xe2\x80\xa9", b"\\u2029")]
+
+_encoder = JSONEncoder()
+
+
+def dumps(data):
+    """
+    `data` as JSON bytes, or None if orjson is missing or cannot write it.
+    """
+    if orjson is None:
+        return None
+    try:
+        content = orjson.dumps(data, default=_encoder.default, option=OPTIONS)
+    except orjson.JSONEncodeError:
+        return None
+    if b"null" in content and has_non_finite_float(data):
+        return None
+    for char, escape in ESCAPES:
+        if char in content:
+            content = content.replace(char, escape)
+    return content
+
+
+LEAF_TYPES = frozenset({str, int, bool, type(None)})
+
+# Fields whose representation is never a float
+FLOAT_FREE_REPRESENTATIONS = frozenset(
+    field.to_representation
+    for field in (
+        serializers.CharField,
+        serializers.IntegerField,
+        serializers.BooleanField,
+        serializers.DateTimeField,
+        serializers.DateField,
+        serializers.PrimaryKeyRelatedField,
+    )
+)
+
+# `{(serializer class, field names): bool}`
+_float_free = {}
+
+
+def is_float_free(serializer):
+    """
+    Whether nothing `serializer` outputs can be a float.
+    """
+    if isinstance(serializer, serializers.ListSerializer):
+        return is_float_free(serializer.child)
+    key = (type(serializer), tuple(serializer.fields))
+    if key not in _float_free:
+        _float_free[key] = all(
+            map(is_float_free_field, serializer.fields.values())
+        )
+    return _float_free[key]
+
+
+def is_float_free_field(field):
+    if isinstance(field, serializers.BaseSerializer):
+        return is_float_free(field)
+    representation = type(field).to_representation
+    if representation is serializers.ChoiceField.to_representation:
+        # Choices map to their keys (model choices to the stored strings)
+        return not any(isinstance(choice, float) for choice in field.choices)
+    return (
+        representation in FLOAT_FREE_REPRESENTATIONS
+        and getattr(field, "pk_field", None) is None
+    )
+
+
+def has_non_finite_float(data):
+    """
+    Whether `data` holds a NaN or infinity, as a value or a key. The output
+    of serializers without float fields is not looked at, and containers of
+    only strings, integers and None are skipped without a Python loop.
+    """
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        serializer = getattr(value, "serializer", None)
+        if serializer is not None and is_float_free(serializer):
+            continue
+        if isinstance(value, dict):
+            if not LEAF_TYPES.issuperset(map(type, value)) and any(
+                isinstance(key, float) and not isfinite(key) for key in value
+            ):
+                return True
+            items = value.values()
+        elif isinstance(value, (list, tuple)):
+            items = value
+        elif isinstance(value, float):
+            return not isfinite(value)
+        else:
+            continue
+        if LEAF_TYPES.issuperset(map(type, items)):
+            continue
+        for item in items:
+            if type(item) in LEAF_TYPES:
+                continue
+            if isinstance(item, float):
+                if not isfinite(item):
+                    return True
+            elif isinstance(item, (dict, list, tuple)):
+                stack.append(item)
+    return False
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        started = perf_counter()
+        content = None
+        if (
+            self.compact
+            and self.strict
+            and not self.ensure_ascii
+            and self.get_indent(accepted_media_type, renderer_context or {}) is None
+        ):
+            content = dumps(data)
+        if content is None:
+            content = super().render(data, accepted_media_type, renderer_context)
+        add_render_time(perf_counter() - started)
+        return content
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None or not self.strict:
+            return super().parse(stream, media_type, parser_context)
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        try:
+            content = stream.read()
+            if encoding.lower().replace("-", "") != "utf8":
+                content = content.decode(encoding)
+            return orjson.loads(content)
+        except (ValueError, LookupError) as exc:
+            raise ParseError(f"JSON parse error - {exc}")
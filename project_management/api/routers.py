@@ -0,0 +1,122 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+from .cache import get_cache
+
+
+# Read replicas
+#
+# Queries go to the primary unless a request opts in: the `list` and
+# `retrieve` actions of the viewsets, and the async read views, run inside
+# `replica_reads()`, which routes every read of the request to one of
+# `DATABASE_REPLICAS`. Writes always go to the primary.
+#
+# Replicas lag behind the primary, so after a successful write a user's
+# reads stay on the primary for `DATABASE_REPLICA_STICKY_SECONDS` (read
+# your writes). The marker is kept in the "api" cache, so it is seen by
+# every process sharing that cache.
+
+READ_ACTIONS = {"list", "retrieve"}
+
+_replica = ContextVar("replica", default=None)
+
+
+def get_replicas():
+    return settings.DATABASE_REPLICAS
+
+
+def sticky_key(user_id):
+    return f"api:primary:{user_id}"
+
+
+def stick_to_primary(user):
+    if user.is_authenticated:
+        get_cache().set(
+            sticky_key(user.pk),
+            True,
+            timeout=settings.DATABASE_REPLICA_STICKY_SECONDS,
+        )
+
+
+def choose_replica(user):
+    """
+    Return the replica to serve `user`'s reads from, or None when there is
+    none or the user wrote recently.
+    """
+    replicas = get_replicas()
+    if not replicas:
+        return None
+    if user.is_authenticated and get_cache().get(sticky_key(user.pk)):
+        return None
+    return random.choice(replicas)
+
+
+async def achoose_replica(user):
+    """
+    `choose_replica()` for async views.
+    """
+    replicas = get_replicas()
+    if not replicas:
+        return None
+    if user.is_authenticated and await get_cache().aget(sticky_key(user.pk)):
+        return None
+    return random.choice(replicas)
+
+
+@contextmanager
+def replica_reads(alias):
+    """
+    Route the reads made in the block (and in the threads `sync_to_async()`
+    runs it in) to `alias`; None leaves them on the primary.
+    """
+    token = _replica.set(alias)
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _replica.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        databases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in get_replicas():
+            return False
+        return None
+
+
+class ReplicaReadsMixin:
+    """
+    Serve a viewset's `list` and `retrieve` actions from a replica, and keep
+    a user on the primary for a while after any write.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.action in READ_ACTIONS:
+            self.replica_token = _replica.set(choose_replica(request.user))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, "replica_token", None)
+        if token is not None:
+            _replica.reset(token)
+            self.replica_token = None
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            stick_to_primary(request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,370 @@
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Q
+from django.db.utils import OperationalError
+
+from .models import Tasks, Comments
+
+
+# Full-text search
+#
+# Task titles and descriptions and comment contents are indexed by the
+# database itself, so bulk writes, `QuerySet.update()` and cascades are
+# covered without signals:
+#
+# - SQLite: the FTS5 table `api_search_index`, filled by triggers on
+#   `api_tasks` and `api_comments`. Tasks are stored at rowid `2 * id` and
+#   comments at `2 * id + 1`, and every row carries its project as a token,
+#   so a project-scoped query is a single index lookup.
+# - Postgres: generated `tsvector` columns with GIN indexes.
+#
+# Both match every word of the query (stemmed) and rank task titles above
+# descriptions and comments. Without an index (other backends, SQLite built
+# without FTS5) search falls back to unranked `icontains` scans.
+
+MAX_TERMS = 16
+SNIPPET_LENGTH = 200
+
+# `{(alias, database name): bool}`, whether a SQLite database has the index
+_sqlite_indexes = {}
+
+SQLITE_INDEX = """
+CREATE VIRTUAL TABLE IF NOT EXISTS api_search_index USING fts5(
+    project, task UNINDEXED, title, body, tokenize = 'porter unicode61'
+)
+"""
+
+# Titles weigh more than descriptions and comments; `project` only scopes
+SQLITE_RANK = (
+    "INSERT INTO api_search_index(api_search_index, rank) "
+    "VALUES ('rank', 'bm25(0.0, 0.0, 4.0, 1.0)')"
+)
+
+# Dropped by SQLite whenever a migration rebuilds `api_tasks` or
+# `api_comments`, so they are re-created after every `migrate`
+SQLITE_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS api_search_task_insert
+    AFTER INSERT ON api_tasks BEGIN
+        INSERT INTO api_search_index(rowid, project, task, title, body)
+        VALUES (new.id * 2, new.project_id, new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_search_task_update
+    AFTER UPDATE OF title, description, project_id ON api_tasks
+    WHEN old.title IS NOT new.title
+        OR old.description IS NOT new.description
+        OR old.project_id IS NOT new.project_id
+    BEGIN
+        UPDATE api_search_index
+        SET project = new.project_id, title = new.title, body = new.description
+        WHERE rowid = old.id * 2;
+        UPDATE api_search_index SET project = new.project_id
+        WHERE old.project_id IS NOT new.project_id
+            AND rowid IN (SELECT id * 2 + 1 FROM api_comments WHERE task_id = new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_search_task_delete
+    AFTER DELETE ON api_tasks BEGIN
+        DELETE FROM api_search_index WHERE rowid = old.id * 2;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_search_comment_insert
+    AFTER INSERT ON api_comments BEGIN
+        INSERT INTO api_search_index(rowid, project, task, title, body)
+        SELECT new.id * 2 + 1, project_id, new.task_id, '', new.content
+        FROM api_tasks WHERE id = new.task_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_search_comment_update
+    AFTER UPDATE OF content, task_id ON api_comments
+    WHEN old.content IS NOT new.content OR old.task_id IS NOT new.task_id
+    BEGIN
+        UPDATE api_search_index
+        SET project = (SELECT project_id FROM api_tasks WHERE id = new.task_id),
+            task = new.task_id,
+            body = new.content
+        WHERE rowid = old.id * 2 + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_search_comment_delete
+    AFTER DELETE ON api_comments BEGIN
+        DELETE FROM api_search_index WHERE rowid = old.id * 2 + 1;
+    END
+    """,
+]
+
+SQLITE_TRIGGER_NAMES = [
+    "api_search_task_insert",
+    "api_search_task_update",
+    "api_search_task_delete",
+    "api_search_comment_insert",
+    "api_search_comment_update",
+    "api_search_comment_delete",
+]
+
+SQLITE_DROP_TRIGGERS = [
+    f"DROP TRIGGER IF EXISTS {name}" for name in SQLITE_TRIGGER_NAMES
+]
+SQLITE_DROP = SQLITE_DROP_TRIGGERS + ["DROP TABLE IF EXISTS api_search_index"]
+
+SQLITE_REBUILD = [
+    "DELETE FROM api_search_index",
+    """
+    INSERT INTO api_search_index(rowid, project, task, title, body)
+    SELECT id * 2, project_id, id, title, description FROM api_tasks
+    """,
+    """
+    INSERT INTO api_search_index(rowid, project, task, title, body)
+    SELECT c.id * 2 + 1, t.project_id, c.task_id, '', c.content
+    FROM api_comments c JOIN api_tasks t ON t.id = c.task_id
+    """,
+]
+
+SQLITE_SEARCH = """
+SELECT rowid, task, snippet(api_search_index, -1, '', '', '...', 16)
+FROM api_search_index
+WHERE api_search_index MATCH %s
+ORDER BY rank, rowid
+LIMIT %s OFFSET %s
+"""
+
+POSTGRES_INDEX = [
+    """
+    ALTER TABLE api_tasks ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english'::regconfig, title), 'A')
+        || setweight(to_tsvector('english'::regconfig, description), 'B')
+    ) STORED
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS tasks_search_idx
+    ON api_tasks USING GIN (search_vector)
+    """,
+    """
+    ALTER TABLE api_comments ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english'::regconfig, content), 'B')
+    ) STORED
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS comments_search_idx
+    ON api_comments USING GIN (search_vector)
+    """,
+]
+
+POSTGRES_DROP = [
+    "ALTER TABLE api_tasks DROP COLUMN IF EXISTS search_vector",
+    "ALTER TABLE api_comments DROP COLUMN IF EXISTS search_vector",
+]
+
+# Headlines are only built for the rows of the page
+POSTGRES_SEARCH = """
+WITH query AS (SELECT plainto_tsquery('english'::regconfig, %s) AS q),
+hits AS (
+    SELECT 'task' AS kind, t.id, t.id AS task, t.description AS body,
+        ts_rank(t.search_vector, query.q) AS rank
+    FROM api_tasks t, query
+    WHERE t.project_id = %s AND t.search_vector @@ query.q
+    UNION ALL
+    SELECT 'comment', c.id, c.task_id, c.content,
+        ts_rank(c.search_vector, query.q)
+    FROM api_comments c JOIN api_tasks t ON t.id = c.task_id, query
+    WHERE t.project_id = %s AND c.search_vector @@ query.q
+    ORDER BY rank DESC, kind DESC, id
+    LIMIT %s OFFSET %s
+)
+SELECT kind, id, task, ts_headline(
+    'english'::regconfig,
+    body,
+    query.q,
+    'StartSel="", StopSel="", MaxWords=16, MinWords=8'
+)
+FROM hits, query
+ORDER BY rank DESC, kind DESC, id
+"""
+
+
+def install_search_index(connection):
+    """
+    Create the index for `connection` (idempotent). Returns whether the
+    backend has one.
+    """
+    _sqlite_indexes.clear()
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            for statement in POSTGRES_INDEX:
+                cursor.execute(statement)
+            return True
+        if connection.vendor != "sqlite":
+            return False
+        try:
+            cursor.execute(SQLITE_INDEX)
+        except OperationalError:
+            # SQLite built without FTS5
+            return False
+        cursor.execute(SQLITE_RANK)
+        for statement in SQLITE_TRIGGERS:
+            cursor.execute(statement)
+    return True
+
+
+def reinstall_search_triggers(using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    `post_migrate` receiver: restore triggers dropped by table rebuilds.
+    """
+    # Migrations may have created or dropped the index
+    _sqlite_indexes.clear()
+    connection = connections[using]
+    if connection.vendor == "sqlite" and has_search_index(connection):
+        install_search_index(connection)
+
+
+def drop_search_index(connection):
+    _sqlite_indexes.clear()
+    statements = {"postgresql": POSTGRES_DROP, "sqlite": SQLITE_DROP}
+    with connection.cursor() as cursor:
+        for statement in statements.get(connection.vendor, []):
+            cursor.execute(statement)
+
+
+def drop_search_triggers(connection):
+    """
+    Stop indexing writes on SQLite, e.g. during a bulk import. Restore with
+    `install_search_index()` followed by `rebuild_search_index()`.
+    """
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            for statement in SQLITE_DROP_TRIGGERS:
+                cursor.execute(statement)
+
+
+def search_triggers_installed(connection):
+    if connection.vendor != "sqlite" or not has_search_index(connection):
+        return True
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name IN "
+            f"({', '.join(['%s'] * len(SQLITE_TRIGGER_NAMES))})",
+            SQLITE_TRIGGER_NAMES,
+        )
+        return cursor.fetchone()[0] == len(SQLITE_TRIGGER_NAMES)
+
+
+def rebuild_search_index(connection):
+    """
+    Re-index every task and comment. Only needed on SQLite, and only for
+    rows written with the triggers missing.
+    """
+    if connection.vendor == "sqlite" and has_search_index(connection):
+        with connection.cursor() as cursor:
+            for statement in SQLITE_REBUILD:
+                cursor.execute(statement)
+
+
+def has_search_index(connection):
+    if connection.vendor == "postgresql":
+        return True
+    if connection.vendor != "sqlite":
+        return False
+    key = (connection.alias, connection.settings_dict["NAME"])
+    if key not in _sqlite_indexes:
+        tables = connection.introspection.table_names()
+        _sqlite_indexes[key] = "api_search_index" in tables
+    return _sqlite_indexes[key]
+
+
+def search_terms(query):
+    """
+    Words of a search query, lowercased and deduplicated. Operators are not
+    supported, so user input never reaches the backend's query syntax.
+    """
+    terms = []
+    for term in re.findall(r"\w+", query.lower()):
+        if term not in terms:
+            terms.append(term)
+    return terms[:MAX_TERMS]
+
+
+def search_project(project_id, query, limit, offset=0, using=DEFAULT_DB_ALIAS):
+    """
+    Return up to `limit` hits for `query` in a project, best first, as
+    `{"type", "id", "task", "title", "snippet"}` dicts where `title` is the
+    task's title and `snippet` the matching text.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+    connection = connections[using]
+    if connection.vendor == "sqlite" and has_search_index(connection):
+        rows = sqlite_search(connection, project_id, terms, limit, offset)
+    elif connection.vendor == "postgresql":
+        rows = postgres_search(connection, project_id, terms, limit, offset)
+    else:
+        rows = fallback_search(project_id, terms, limit, offset, using)
+
+    titles = dict(
+        Tasks.objects.using(using)
+        .filter(pk__in={task for _, _, task, _ in rows})
+        .values_list("id", "title")
+    )
+    return [
+        {
+            "type": kind,
+            "id": pk,
+            "task": task,
+            "title": titles.get(task, ""),
+            "snippet": snippet,
+        }
+        for kind, pk, task, snippet in rows
+    ]
+
+
+def sqlite_search(connection, project_id, terms, limit, offset):
+    words = " AND ".join(f'"{term}"' for term in terms)
+    match = f'project:"{int(project_id)}" AND {{title body}}:({words})'
+    with connection.cursor() as cursor:
+        cursor.execute(SQLITE_SEARCH, [match, limit, offset])
+        return [
+            ("comment" if rowid % 2 else "task", rowid // 2, task, snippet)
+            for rowid, task, snippet in cursor.fetchall()
+        ]
+
+
+def postgres_search(connection, project_id, terms, limit, offset):
+    params = [" ".join(terms), project_id, project_id, limit, offset]
+    with connection.cursor() as cursor:
+        cursor.execute(POSTGRES_SEARCH, params)
+        return cursor.fetchall()
+
+
+def fallback_search(project_id, terms, limit, offset, using):
+    """
+    Unranked: matching tasks, then matching comments, oldest first.
+    """
+    tasks = Tasks.objects.using(using).filter(project_id=project_id)
+    comments = Comments.objects.using(using).filter(task__project_id=project_id)
+    for term in terms:
+        tasks = tasks.filter(Q(title__icontains=term) | Q(description__icontains=term))
+        comments = comments.filter(content__icontains=term)
+    end = offset + limit
+    rows = [
+        ("task", pk, pk, description[:SNIPPET_LENGTH])
+        for pk, description in tasks.order_by("id").values_list("id", "description")[
+            :end
+        ]
+    ]
+    if len(rows) < end:
+        rows += [
+            ("comment", pk, task, content[:SNIPPET_LENGTH])
+            for pk, task, content in comments.order_by("id").values_list(
+                "id", "task_id", "content"
+            )[: end - len(rows)]
+        ]
+    return rows[offset:end]
@@ -1,7 +1,134 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
 from .models import Users, Projects, ProjectMembers, Tasks, Comments
 
 
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """
+    A ModelSerializer that takes an additional `fields` argument that
+    controls which fields should be displayed.
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Resolve primary keys against the instances a `BulkListSerializer`
+    preloaded for the whole batch, instead of one query per value.
+    Behaves like `PrimaryKeyRelatedField` outside of bulk validation.
+    """
+
+    def to_internal_value(self, data):
+        preloaded = self.context.get("preloaded", {}).get(self.field_name)
+        if preloaded is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            pk = self.get_queryset().model._meta.pk.to_python(data)
+        except (TypeError, DjangoValidationError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        if pk not in preloaded:
+            self.fail("does_not_exist", pk_value=data)
+        return preloaded[pk]
+
+
+def bulk_item_pk(model, item):
+    """
+    The `id` of a bulk update item as `model`'s primary key (so `"3"` is
+    `3`), or None if it has none or it is malformed.
+    """
+    if not isinstance(item, dict) or isinstance(item.get("id"), bool):
+        return None
+    try:
+        return model._meta.pk.to_python(item.get("id"))
+    except (TypeError, DjangoValidationError):
+        return None
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """
+    Validate a list of items in one pass and write it with
+    `bulk_create` / `bulk_update`.
+
+    Related primary keys are loaded with a single `in_bulk()` per field.
+    For updates, pass the target instances keyed by id as `instance`; each
+    may appear once in the data.
+    """
+
+    batch_size = 1000
+
+    def preload_related(self, data):
+        preloaded = {}
+        for name, field in self.child.fields.items():
+            if field.read_only or not isinstance(field, PreloadedPrimaryKeyRelatedField):
+                continue
+            model_pk = field.get_queryset().model._meta.pk
+            pks = set()
+            for item in data:
+                if not isinstance(item, dict) or item.get(name) is None:
+                    continue
+                try:
+                    pks.add(model_pk.to_python(item[name]))
+                except (TypeError, DjangoValidationError):
+                    continue
+            preloaded[name] = field.get_queryset().in_bulk(pks)
+        return preloaded
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self._context["preloaded"] = self.preload_related(data)
+        self._matched_instances = []
+        self._matched_pks = set()
+        return super().to_internal_value(data)
+
+    def run_child_validation(self, data):
+        if self.instance is None:
+            return self.child.run_validation(data)
+        pk = bulk_item_pk(self.child.Meta.model, data)
+        instance = self.instance.get(pk) if pk is not None else None
+        if instance is None:
+            raise serializers.ValidationError({"id": ["Not found."]})
+        if pk in self._matched_pks:
+            raise serializers.ValidationError({"id": ["Duplicate id."]})
+        self._matched_pks.add(pk)
+        self.child.instance = instance
+        self.child.initial_data = data
+        validated = self.child.run_validation(data)
+        self._matched_instances.append(instance)
+        return validated
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        return model.objects.bulk_create(
+            [model(**attrs) for attrs in validated_data], batch_size=self.batch_size
+        )
+
+    def update(self, instance, validated_data):
+        instances, fields = self._matched_instances, set()
+        for obj, attrs in zip(instances, validated_data):
+            for attr, value in attrs.items():
+                setattr(obj, attr, value)
+            fields.update(attrs)
+        if fields:
+            # bulk_update() skips save(), so refresh `auto_now` columns here
+            for field in self.child.Meta.model._meta.concrete_fields:
+                if getattr(field, "auto_now", False):
+                    for obj in instances:
+                        field.pre_save(obj, add=False)
+                    fields.add(field.name)
+            self.child.Meta.model.objects.bulk_update(
+                instances, sorted(fields), batch_size=self.batch_size
+            )
+        return instances
+
+
 # User Serializers
 class RegisterUserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True)
@@ -76,7 +203,7 @@ class ProjectMemberCreateSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 # Task Serializers
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(DynamicFieldsModelSerializer):
     assigned_to = UserSerializer()
     project = ProjectSerializer()
 
@@ -96,8 +223,11 @@ class TaskSerializer(serializers.ModelSerializer):
 
 
 class TaskCreateUpdateSerializer(serializers.ModelSerializer):
+    serializer_related_field = PreloadedPrimaryKeyRelatedField
+
     class Meta:
         model = Tasks
+        list_serializer_class = BulkListSerializer
         fields = [
             "id",
             "title",
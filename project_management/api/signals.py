@@ -0,0 +1,213 @@
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .authentication import user_cache
+from .cache import bump_versions
+from .changes import record_changes, record_moves
+from .models import Users, Projects, ProjectMembers, Tasks, Comments, ProjectTaskSummary
+from .permissions import ADMIN, invalidate_project_roles
+from .realtime import publish_roles_changed
+from .stats import (
+    comment_counts,
+    record_comment_changes,
+    record_task_changes,
+    record_task_deletions,
+    stored_task_buckets,
+    summary_enabled,
+    task_bucket,
+    unassign_user,
+)
+
+
+@receiver(post_save, sender=Users)
+@receiver(post_save, sender=Projects)
+@receiver(post_save, sender=ProjectMembers)
+@receiver(post_save, sender=Tasks)
+@receiver(post_delete, sender=Users)
+@receiver(post_delete, sender=Projects)
+@receiver(post_delete, sender=ProjectMembers)
+@receiver(post_delete, sender=Tasks)
+def invalidate_cached_responses(sender, instance, **kwargs):
+    """
+    Invalidate cached responses that embed `instance`.
+
+    Bump once now and again on commit, so readers that cached the
+    pre-commit row while the transaction was open are invalidated too.
+    """
+    bump_versions(sender, [instance.pk])
+    transaction.on_commit(lambda: bump_versions(sender, [instance.pk]))
+
+
+@receiver(post_save, sender=Users)
+@receiver(post_delete, sender=Users)
+def evict_cached_user(sender, instance, **kwargs):
+    user_cache.evict(instance.pk)
+    transaction.on_commit(lambda: user_cache.evict(instance.pk))
+
+
+@receiver(post_save, sender=Projects)
+def add_owner_membership(sender, instance, created, **kwargs):
+    if created:
+        ProjectMembers.objects.create(project=instance, user=instance.owner, role=ADMIN)
+
+
+@receiver(post_save, sender=Users)
+@receiver(post_save, sender=ProjectMembers)
+@receiver(post_delete, sender=Users)
+@receiver(post_delete, sender=ProjectMembers)
+def invalidate_roles(sender, instance, **kwargs):
+    user_id = instance.pk if sender is Users else instance.user_id
+    invalidate_project_roles([user_id])
+    transaction.on_commit(lambda: invalidate_project_roles([user_id]))
+    transaction.on_commit(lambda: publish_roles_changed([user_id]))
+
+
+@receiver(post_save, sender=Tasks)
+@receiver(post_save, sender=Comments)
+@receiver(post_save, sender=ProjectMembers)
+def log_save(sender, instance, created, **kwargs):
+    record_changes(sender, [instance], "create" if created else "update")
+    # Set by views that can move the instance, see `remember_project()`
+    before = getattr(instance, "_project_before", None)
+    if before is not None and not created:
+        record_moves(sender, {instance.pk: before}, [instance])
+
+
+def is_implied_delete(sender, origin):
+    # Comments removed along with their task are implied by the task tombstone
+    return sender is Comments and deleted_model(origin) in (Tasks, Projects)
+
+
+@receiver(pre_delete, sender=Tasks)
+@receiver(pre_delete, sender=Comments)
+@receiver(pre_delete, sender=ProjectMembers)
+def count_logged_deletes(sender, instance, origin=None, **kwargs):
+    """
+    Count the rows a delete() removes: pre_delete is sent for all of them
+    before the first post_delete, so `log_delete` knows which is the last
+    and logs them all with one INSERT.
+    """
+    if origin is None or is_implied_delete(sender, origin):
+        return
+    pending = getattr(origin, "_changes_pending_deletes", None)
+    if pending is None:
+        pending = origin._changes_pending_deletes = {}
+    pending.setdefault(sender, [0, []])[0] += 1
+
+
+@receiver(post_delete, sender=Tasks)
+@receiver(post_delete, sender=Comments)
+@receiver(post_delete, sender=ProjectMembers)
+def log_delete(sender, instance, origin=None, **kwargs):
+    if is_implied_delete(sender, origin):
+        return
+    pending = getattr(origin, "_changes_pending_deletes", {})
+    if sender not in pending:
+        record_changes(sender, [instance], "delete")
+        return
+    expected, instances = pending[sender]
+    instances.append(instance)
+    if len(instances) == expected:
+        del pending[sender]
+        record_changes(sender, instances, "delete")
+
+
+@receiver(pre_delete, sender=Users)
+def log_unassigned_tasks(sender, instance, **kwargs):
+    """
+    Deleting a user nulls `assigned_to` with an UPDATE that sends no signals.
+    """
+    tasks = Tasks.objects.filter(assigned_to=instance).only("id", "project_id")
+    record_changes(Tasks, tasks, "update")
+
+
+# Project task summary (stats.py)
+
+
+def deleted_model(origin):
+    return origin.model if isinstance(origin, QuerySet) else type(origin)
+
+
+@receiver(pre_save, sender=Tasks)
+def remember_task_bucket(sender, instance, **kwargs):
+    if summary_enabled() and not instance._state.adding:
+        instance._summary_before = stored_task_buckets([instance.pk])
+
+
+@receiver(post_save, sender=Tasks)
+def summarize_task_save(sender, instance, **kwargs):
+    record_task_changes(getattr(instance, "_summary_before", {}), [instance])
+
+
+@receiver(pre_delete, sender=Tasks)
+def remember_task_comments(sender, instance, origin=None, **kwargs):
+    if not summary_enabled():
+        return
+    # Comments deleted along with their task are subtracted with it
+    deleted_tasks = getattr(origin, "_summary_deleted_tasks", None)
+    if deleted_tasks is None:
+        deleted_tasks = origin._summary_deleted_tasks = set()
+        if deleted_model(origin) is Tasks:
+            # One grouped count for every task the delete() removes
+            if isinstance(origin, QuerySet):
+                task_ids = origin.values("pk")
+            else:
+                task_ids = [origin.pk]
+            origin._summary_comments = comment_counts(task_ids)
+            origin._summary_deletions = []
+    deleted_tasks.add(instance.pk)
+
+
+@receiver(post_delete, sender=Tasks)
+def summarize_task_delete(sender, instance, origin=None, **kwargs):
+    deletions = getattr(origin, "_summary_deletions", None)
+    if deletions is None:
+        return
+    comments = origin._summary_comments.get(instance.pk, 0)
+    deletions.append((task_bucket(instance), comments))
+    # Applied as one delta once the last task is gone
+    if len(deletions) == len(origin._summary_deleted_tasks):
+        del origin._summary_deleted_tasks, origin._summary_deletions
+        record_task_deletions(deletions)
+
+
+@receiver(pre_save, sender=Comments)
+def remember_comment_task(sender, instance, **kwargs):
+    if summary_enabled() and not instance._state.adding:
+        instance._summary_task_before = (
+            Comments.objects.filter(pk=instance.pk)
+            .values_list("task_id", flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Comments)
+def summarize_comment_save(sender, instance, created, **kwargs):
+    if created:
+        record_comment_changes([instance.task_id], 1)
+        return
+    before = getattr(instance, "_summary_task_before", instance.task_id)
+    if before != instance.task_id:
+        record_comment_changes([before], -1)
+        record_comment_changes([instance.task_id], 1)
+
+
+@receiver(post_delete, sender=Comments)
+def summarize_comment_delete(sender, instance, origin=None, **kwargs):
+    if instance.task_id in getattr(origin, "_summary_deleted_tasks", ()):
+        return
+    if deleted_model(origin) is not Projects:
+        record_comment_changes([instance.task_id], -1)
+
+
+@receiver(post_delete, sender=Projects)
+def drop_project_summary(sender, instance, **kwargs):
+    ProjectTaskSummary.objects.filter(project_id=instance.pk).delete()
+
+
+@receiver(pre_delete, sender=Users)
+def summarize_unassigned_tasks(sender, instance, **kwargs):
+    unassign_user(instance.pk)
+
@@ -0,0 +1,293 @@
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import Tasks, Comments, ProjectTaskSummary
+
+
+# Project statistics
+#
+# Every statistic is derived from task counts per `(status, priority,
+# assignee)` bucket, which are either computed with one GROUP BY over the
+# project's tasks or read from `ProjectTaskSummary`, where signal handlers
+# keep them up to date. The summary makes the endpoint cost independent of
+# project size. Overdue counts depend on the clock, so they are always
+# counted live, from the partial index on open tasks.
+
+DONE = "Done"
+
+
+def summary_enabled():
+    return settings.API_PROJECT_STATS.get("SUMMARY", False)
+
+
+def overdue_filter(prefix=""):
+    return Q(**{f"{prefix}due_date__lt": timezone.now()}) & ~Q(
+        **{f"{prefix}status": DONE}
+    )
+
+
+def build_stats(project_id, buckets, comments, overdue):
+    """
+    Build the response from `(status, priority, assignee_id, tasks)` rows.
+    """
+    by_status = {status: 0 for status, _ in Tasks.STATUS_CHOICES}
+    by_priority = {priority: 0 for priority, _ in Tasks.PRIORITY_CHOICES}
+    assignees = defaultdict(lambda: {"tasks": 0, "open": 0})
+    for status, priority, assignee_id, tasks in buckets:
+        if not tasks:
+            continue
+        by_status[status] = by_status.get(status, 0) + tasks
+        by_priority[priority] = by_priority.get(priority, 0) + tasks
+        assignee = assignees[assignee_id or None]
+        assignee["tasks"] += tasks
+        if status != DONE:
+            assignee["open"] += tasks
+    return {
+        "project": project_id,
+        "tasks": sum(by_status.values()),
+        "by_status": by_status,
+        "by_priority": by_priority,
+        "overdue": overdue,
+        "assignees": [
+            {"user": user_id, **counts}
+            for user_id, counts in sorted(
+                assignees.items(), key=lambda item: (item[0] is None, item[0] or 0)
+            )
+        ],
+        "comments": comments,
+    }
+
+
+def compute_project_stats(project_id):
+    """
+    Stats computed from the project's rows: one grouped query over tasks
+    (with the overdue count folded in) and one count over comments.
+    """
+    rows = (
+        Tasks.objects.filter(project_id=project_id)
+        .values("status", "priority", "assigned_to")
+        .annotate(tasks=Count("id"), overdue=Count("id", filter=overdue_filter()))
+        .order_by()
+    )
+    buckets, overdue = [], 0
+    for row in rows:
+        buckets.append(
+            (row["status"], row["priority"], row["assigned_to"], row["tasks"])
+        )
+        overdue += row["overdue"]
+    comments = Comments.objects.filter(task__project_id=project_id).count()
+    return build_stats(project_id, buckets, comments, overdue)
+
+
+def summarized_project_stats(project_id):
+    """
+    Stats read from `ProjectTaskSummary`, plus a live overdue count.
+    """
+    rows = ProjectTaskSummary.objects.filter(project_id=project_id).values_list(
+        "status", "priority", "assignee_id", "tasks", "comments"
+    )
+    buckets, comments = [], 0
+    for status, priority, assignee_id, tasks, bucket_comments in rows:
+        buckets.append((status, priority, assignee_id, tasks))
+        comments += bucket_comments
+    overdue = (
+        Tasks.objects.filter(project_id=project_id).filter(overdue_filter()).count()
+    )
+    return build_stats(project_id, buckets, comments, overdue)
+
+
+def project_stats(project_id):
+    if summary_enabled():
+        return summarized_project_stats(project_id)
+    return compute_project_stats(project_id)
+
+
+# Summary maintenance
+#
+# Writes are expressed as deltas, `{bucket: [tasks, comments]}` where a
+# bucket is `(project_id, status, priority, assignee_id)`, and applied with
+# one UPDATE per bucket (an INSERT for new buckets).
+
+
+def task_bucket(task):
+    return (task.project_id, task.status, task.priority, task.assigned_to_id or 0)
+
+
+def stored_task_buckets(task_ids):
+    """
+    Return `{task_id: bucket}` as currently stored in the database.
+    """
+    rows = Tasks.objects.filter(pk__in=task_ids).values_list(
+        "id", "project_id", "status", "priority", "assigned_to_id"
+    )
+    return {
+        pk: (project_id, status, priority, assignee_id or 0)
+        for pk, project_id, status, priority, assignee_id in rows
+    }
+
+
+def comment_counts(task_ids):
+    return dict(
+        Comments.objects.filter(task_id__in=task_ids)
+        .values_list("task_id")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+
+
+def apply_deltas(deltas):
+    for bucket, (tasks, comments) in deltas.items():
+        project_id, status, priority, assignee_id = bucket
+        if not tasks and not comments:
+            continue
+        bucket = ProjectTaskSummary.objects.filter(
+            project_id=project_id,
+            status=status,
+            priority=priority,
+            assignee_id=assignee_id,
+        )
+        changes = {"tasks": F("tasks") + tasks, "comments": F("comments") + comments}
+        if bucket.update(**changes) or tasks < 0 or comments < 0:
+            # A missing bucket with a negative delta belongs to a project
+            # that is being deleted
+            continue
+        try:
+            with transaction.atomic():
+                ProjectTaskSummary.objects.create(
+                    project_id=project_id,
+                    status=status,
+                    priority=priority,
+                    assignee_id=assignee_id,
+                    tasks=tasks,
+                    comments=comments,
+                )
+        except IntegrityError:
+            # Created concurrently
+            bucket.update(**changes)
+
+
+def record_task_changes(before, tasks):
+    """
+    Update the summary for `tasks` (saved) given `before`, their previous
+    `{task_id: bucket}` (missing for new tasks). Moving a task to another
+    bucket moves its comments with it.
+    """
+    if not summary_enabled():
+        return
+    deltas = defaultdict(lambda: [0, 0])
+    moved = {}
+    for task in tasks:
+        old, new = before.get(task.pk), task_bucket(task)
+        if old == new:
+            continue
+        deltas[new][0] += 1
+        if old is not None:
+            deltas[old][0] -= 1
+            moved[task.pk] = (old, new)
+    if moved:
+        for task_id, count in comment_counts(moved).items():
+            old, new = moved[task_id]
+            deltas[old][1] -= count
+            deltas[new][1] += count
+    apply_deltas(deltas)
+
+
+def record_task_deletions(buckets):
+    """
+    `buckets` holds `(bucket, comment count)` for each deleted task.
+    """
+    if not summary_enabled():
+        return
+    deltas = defaultdict(lambda: [0, 0])
+    for bucket, comments in buckets:
+        deltas[bucket][0] -= 1
+        deltas[bucket][1] -= comments
+    apply_deltas(deltas)
+
+
+def record_comment_changes(task_ids, delta):
+    """
+    Add `delta` comments to the buckets of `task_ids` (one entry per comment).
+    """
+    if not summary_enabled():
+        return
+    buckets = stored_task_buckets(set(task_ids))
+    deltas = defaultdict(lambda: [0, 0])
+    for task_id, count in Counter(task_ids).items():
+        if task_id in buckets:
+            deltas[buckets[task_id]][1] += delta * count
+    apply_deltas(deltas)
+
+
+def unassign_user(user_id):
+    """
+    Move a deleted user's buckets to "unassigned"; the `SET_NULL` on their
+    tasks is an UPDATE that sends no signals.
+    """
+    if not summary_enabled():
+        return
+    deltas = defaultdict(lambda: [0, 0])
+    rows = ProjectTaskSummary.objects.filter(assignee_id=user_id)
+    for row in rows:
+        deltas[(row.project_id, row.status, row.priority, 0)] = [
+            row.tasks,
+            row.comments,
+        ]
+    rows.delete()
+    apply_deltas(deltas)
+
+
+def rebuild_summary(project_ids=None):
+    """
+    Recompute `ProjectTaskSummary` from scratch, for all projects or the
+    given ones. Needed after turning the summary on, or after writes that
+    bypass signals (raw SQL, `QuerySet.update()`).
+    """
+    tasks = Tasks.objects.all()
+    comments = Comments.objects.all()
+    summary = ProjectTaskSummary.objects.all()
+    if project_ids is not None:
+        tasks = tasks.filter(project_id__in=project_ids)
+        comments = comments.filter(task__project_id__in=project_ids)
+        summary = summary.filter(project_id__in=project_ids)
+
+    counts = defaultdict(lambda: [0, 0])
+    for project_id, status, priority, assignee_id, count in (
+        tasks.values_list("project_id", "status", "priority", "assigned_to_id")
+        .annotate(count=Count("id"))
+        .order_by()
+    ):
+        counts[(project_id, status, priority, assignee_id or 0)][0] = count
+    for project_id, status, priority, assignee_id, count in (
+        comments.values_list(
+            "task__project_id", "task__status", "task__priority", "task__assigned_to_id"
+        )
+        .annotate(count=Count("id"))
+        .order_by()
+    ):
+        counts[(project_id, status, priority, assignee_id or 0)][1] = count
+
+    with transaction.atomic():
+        summary.delete()
+        ProjectTaskSummary.objects.bulk_create(
+            [
+                ProjectTaskSummary(
+                    project_id=project_id,
+                    status=status,
+                    priority=priority,
+                    assignee_id=assignee_id,
+                    tasks=tasks_count,
+                    comments=comments_count,
+                )
+                for (project_id, status, priority, assignee_id), (
+                    tasks_count,
+                    comments_count,
+                ) in counts.items()
+            ],
+            batch_size=1000,
+        )
+    return len(counts)
@@ -1,3 +1,2772 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import json
+import threading
+import tempfile
+import time
+import tracemalloc
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import TestCase, mock, skipUnless
+
+from asgiref.sync import async_to_sync, sync_to_async
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections, transaction
+from django.core.management.base import CommandError
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import (
+    AsyncClient,
+    AsyncRequestFactory,
+    RequestFactory,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import ResolverMatch, get_resolver, resolve
+from django.utils import timezone
+from django.utils.http import http_date
+from django.utils.translation import gettext_lazy
+from rest_framework import serializers
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import (
+    async_views,
+    compression,
+    export,
+    hashers,
+    metrics,
+    querywatch,
+    routers,
+)
+from .authentication import user_cache
+from .hashers import VerificationBusy, VerificationPool
+from .lean import get_lean_serializer
+from .permissions import get_user_roles
+from .renderers import FastJSONParser, FastJSONRenderer, is_float_free
+from .search import search_project
+from .stats import compute_project_stats, rebuild_summary, summarized_project_stats
+from .models import (
+    Users,
+    Projects,
+    ProjectMembers,
+    Tasks,
+    Comments,
+    ChangeLog,
+    ImportCheckpoint,
+    ProjectTaskSummary,
+)
+from .cache import cache_stats, get_cache, reset_cache_stats
+from .changes import changes_since, current_token
+from .querysets import get_related_lookups
+from .querywatch import assert_no_query_problems, watch_queries
+from .realtime import LocalBroadcastBackend, websocket_application
+from .serializers import (
+    ProjectSerializer,
+    ProjectMemberSerializer,
+    TaskSerializer,
+    CommentSerializer,
+)
+
+
+class APIFixtureMixin:
+    """
+    Shared helpers for building users, projects, tasks and comments.
+    """
+
+    @classmethod
+    def make_user(cls, name):
+        return Users.objects.create_user(
+            username=name, email=f"{name}@example.com", password="secret-pass-123"
+        )
+
+    @classmethod
+    def make_project(cls, owner, name="Project"):
+        return Projects.objects.create(name=name, description="", owner=owner)
+
+    @classmethod
+    def make_tasks(cls, project, count, assigned_to=None, **fields):
+        fields.setdefault("description", "")
+        fields.setdefault("due_date", timezone.now() + timedelta(days=7))
+        return [
+            Tasks.objects.create(
+                title=f"Task {i}",
+                project=project,
+                assigned_to=assigned_to,
+                **fields,
+            )
+            for i in range(count)
+        ]
+
+    @classmethod
+    def make_comments(cls, task, user, count):
+        return [
+            Comments.objects.create(content=f"Comment {i}", user=user, task=task)
+            for i in range(count)
+        ]
+
+
+class RelatedLookupTests(APIFixtureMixin, APITestCase):
+    def test_lookups_follow_nested_serializers(self):
+        self.assertEqual(
+            get_related_lookups(TaskSerializer),
+            (("assigned_to", "project", "project__owner"), ()),
+        )
+        self.assertEqual(get_related_lookups(ProjectSerializer), (("owner",), ()))
+        self.assertEqual(get_related_lookups(ProjectMemberSerializer), (("user",), ()))
+        self.assertEqual(get_related_lookups(CommentSerializer), (("user",), ()))
+
+
+class QueryCountTests(APIFixtureMixin, APITestCase):
+    """
+    Pin the number of queries per endpoint so it does not grow with result size.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = cls.make_user("owner")
+        cls.small = cls.make_project(cls.user, "Small")
+        cls.large = cls.make_project(cls.user, "Large")
+        cls.make_tasks(cls.small, 1, assigned_to=cls.user)
+        cls.large_tasks = cls.make_tasks(cls.large, 25, assigned_to=cls.user)
+        cls.make_comments(cls.large_tasks[0], cls.user, 25)
+        for i in range(25):
+            member = cls.make_user(f"member{i}")
+            ProjectMembers.objects.create(project=cls.large, user=member, role="Member")
+            project = cls.make_project(member, f"Member project {i}")
+            ProjectMembers.objects.create(project=project, user=cls.user, role="Member")
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        # Counts below are for a warm role map, which is cached across requests
+        get_user_roles(self.user.pk)
+
+    def assertQueriesIndependentOfSize(self, small_url, large_url, num):
+        with self.assertNumQueries(num):
+            self.assertEqual(self.client.get(small_url).status_code, 200)
+        with self.assertNumQueries(num):
+            self.assertEqual(self.client.get(large_url).status_code, 200)
+
+    def test_task_list(self):
+        # ETag aggregate + page
+        self.assertQueriesIndependentOfSize(
+            f"/api/projects/{self.small.id}/tasks/",
+            f"/api/projects/{self.large.id}/tasks/",
+            2,
+        )
+
+    def test_comment_list(self):
+        # ETag aggregate + page
+        self.assertQueriesIndependentOfSize(
+            f"/api/tasks/{self.large_tasks[1].id}/comments/",
+            f"/api/tasks/{self.large_tasks[0].id}/comments/",
+            2,
+        )
+
+    def test_member_list(self):
+        self.assertQueriesIndependentOfSize(
+            f"/api/projects/{self.small.id}/members/",
+            f"/api/projects/{self.large.id}/members/",
+            1,
+        )
+
+    def test_project_list(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/projects/")
+        self.assertEqual(len(response.data["results"]), 27)
+
+    def test_detail_endpoints(self):
+        task = self.large_tasks[0]
+        urls = [
+            f"/api/projects/{self.large.id}/",
+            f"/api/tasks/{task.id}/",
+            f"/api/comments/{task.comments.first().id}/",
+            f"/api/members/{self.large.members.first().id}/",
+            f"/api/users/{self.user.id}/",
+        ]
+        for url in urls:
+            with self.subTest(url=url), self.assertNumQueries(1):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+
+@override_settings(
+    REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK,
+        "PAGE_SIZE_LIMITS": {"tasks": {"default": 10, "max": 20}},
+    }
+)
+class CursorPaginationTests(APIFixtureMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = cls.make_user("owner")
+        cls.project = cls.make_project(cls.user)
+        cls.tasks = cls.make_tasks(cls.project, 25)
+        # Same timestamp on several rows: the id must break the tie
+        Tasks.objects.filter(id__in=[t.id for t in cls.tasks[8:13]]).update(
+            created_at=cls.tasks[8].created_at
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        self.url = f"/api/projects/{self.project.id}/tasks/"
+
+    def test_walk_forward_and_back(self):
+        ids, url, pages = [], self.url, []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            ids.extend(task["id"] for task in response.data["results"])
+            url = response.data["next"]
+        self.assertEqual(ids, [task.id for task in self.tasks])
+        self.assertEqual([len(page["results"]) for page in pages], [10, 10, 5])
+        self.assertIsNone(pages[0]["previous"])
+
+        response = self.client.get(pages[-1]["previous"])
+        self.assertEqual(response.data["results"], pages[1]["results"])
+        response = self.client.get(response.data["previous"])
+        self.assertEqual(response.data["results"], pages[0]["results"])
+        self.assertIsNone(response.data["previous"])
+
+    def test_deep_pages_seek_instead_of_offset(self):
+        response = self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(response.data["next"])
+        sql = queries.captured_queries[-1]["sql"]
+        self.assertNotIn("OFFSET", sql.upper())
+        self.assertIn("LIMIT 11", sql.upper())
+
+    def test_page_size_is_capped(self):
+        response = self.client.get(self.url, {"page_size": 1000})
+        self.assertEqual(len(response.data["results"]), 20)
+        response = self.client.get(self.url, {"page_size": 3})
+        self.assertEqual(len(response.data["results"]), 3)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 404)
+
+
+class QueryPlanTests(APIFixtureMixin, APITestCase):
+    """
+    Run EXPLAIN on the SQL behind each list endpoint and the dashboard filters,
+    and fail on any full table scan.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = cls.make_user("owner")
+        cls.project = cls.make_project(cls.user)
+        cls.tasks = cls.make_tasks(cls.project, 5, assigned_to=cls.user)
+        cls.make_comments(cls.tasks[0], cls.user, 5)
+        ProjectMembers.objects.create(project=cls.project, user=cls.user, role="Admin")
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def explain(self, sql, params=None):
+        with connection.cursor() as cursor:
+            if connection.vendor == "sqlite":
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+                return [row[-1] for row in cursor.fetchall()]
+            cursor.execute(f"EXPLAIN {sql}", params)
+            return [row[0] for row in cursor.fetchall()]
+
+    def assertNoFullScan(self, sql, tables, params=None):
+        plan = self.explain(sql, params)
+        for line in plan:
+            self.assertNotIn("Seq Scan", line, msg=plan)
+            for table in tables:
+                # `SCAN t USING INDEX i` walks an index; bare `SCAN t` reads the table
+                self.assertNotRegex(line, rf"^SCAN {table}$", msg=plan)
+        return plan
+
+    def assertEndpointUsesIndexes(self, url, tables):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        for query in queries.captured_queries:
+            self.assertNoFullScan(query["sql"], tables)
+
+    def test_list_endpoints(self):
+        tables = ["api_projects", "api_projectmembers", "api_tasks", "api_comments"]
+        urls = [
+            "/api/projects/",
+            f"/api/projects/{self.project.id}/members/",
+            f"/api/projects/{self.project.id}/tasks/",
+            f"/api/tasks/{self.tasks[0].id}/comments/",
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEndpointUsesIndexes(url, tables)
+
+    def test_dashboard_filters(self):
+        now = timezone.now()
+        querysets = {
+            "tasks_project_status_idx": Tasks.objects.filter(
+                project=self.project, status="In Progress"
+            ),
+            "tasks_assignee_status_idx": Tasks.objects.filter(
+                assigned_to=self.user, status="To Do", due_date__lt=now
+            ),
+            "tasks_open_due_idx": Tasks.objects.filter(
+                project=self.project, due_date__lt=now
+            ).exclude(status="Done"),
+            "comments_task_created_idx": Comments.objects.filter(
+                task=self.tasks[0]
+            ).order_by("created_at"),
+        }
+        for index, queryset in querysets.items():
+            with self.subTest(index=index):
+                sql, params = queryset.query.sql_with_params()
+                plan = self.assertNoFullScan(sql, ["api_tasks", "api_comments"], params)
+                if connection.vendor == "sqlite":
+                    self.assertIn(index, " ".join(plan))
+
+
+class TaskListFilterTests(APIFixtureMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = cls.make_user("owner")
+        cls.other = cls.make_user("other")
+        cls.project = cls.make_project(cls.user)
+        cls.todo = cls.make_tasks(cls.project, 3, assigned_to=cls.user)
+        cls.done = cls.make_tasks(
+            cls.project, 2, assigned_to=cls.other, status="Done", priority="High"
+        )
+        cls.late = cls.make_tasks(cls.project, 1, status="In Progress")[0]
+        cls.late.due_date = timezone.now() - timedelta(days=3)
+        cls.late.save()
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        self.url = f"/api/projects/{self.project.id}/tasks/"
+
+    def get_ids(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return [task["id"] for task in response.data["results"]]
+
+    def test_filters(self):
+        ids = lambda tasks: [task.id for task in tasks]
+        self.assertEqual(self.get_ids(status="Done"), ids(self.done))
+        self.assertEqual(
+            self.get_ids(status="To Do,In Progress"), ids(self.todo + [self.late])
+        )
+        self.assertEqual(self.get_ids(priority="High"), ids(self.done))
+        self.assertEqual(self.get_ids(assigned_to=self.user.id), ids(self.todo))
+        self.assertEqual(
+            self.get_ids(due_before=timezone.now().isoformat()), [self.late.id]
+        )
+        self.assertEqual(
+            self.get_ids(due_after=timezone.now().isoformat(), status="To Do"),
+            ids(self.todo),
+        )
+
+    def test_ordering(self):
+        ids = self.get_ids(ordering="-due_date")
+        self.assertEqual(ids[-1], self.late.id)
+        self.assertEqual(len(ids), 6)
+        ids = self.get_ids(ordering="due_date", page_size=2)
+        self.assertEqual(ids[0], self.late.id)
+
+    def test_ordering_is_paginated(self):
+        ids, url = [], f"{self.url}?ordering=-title&page_size=2"
+        while url:
+            response = self.client.get(url)
+            ids.extend(task["id"] for task in response.data["results"])
+            url = response.data["next"]
+        expected = Tasks.objects.order_by("-title", "-id").values_list("id", flat=True)
+        self.assertEqual(ids, list(expected))
+
+    def test_invalid_parameters(self):
+        for params in [
+            {"status": "Blocked"},
+            {"ordering": "description"},
+            {"fields": "id,secret"},
+            {"due_before": "tomorrow"},
+        ]:
+            with self.subTest(params=params):
+                response = self.client.get(self.url, params)
+                self.assertEqual(response.status_code, 400)
+
+    def test_sparse_fields_prune_joins_and_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {"fields": "id,title,status"})
+        self.assertEqual(
+            set(response.data["results"][0]), {"id", "title", "status"}
+        )
+        sql = queries.captured_queries[-1]["sql"]
+        self.assertNotIn("JOIN", sql)
+        self.assertNotIn("description", sql)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {"fields": "id,project"})
+        project = response.data["results"][0]["project"]
+        self.assertEqual(project["owner"]["id"], self.user.id)
+        self.assertEqual(len(queries), 2)
+        sql = queries.captured_queries[-1]["sql"]
+        self.assertIn('INNER JOIN "api_projects"', sql)
+        # `assigned_to` is nullable, so only its join would be an outer one
+        self.assertNotIn("LEFT OUTER JOIN", sql)
+
+
+class TaskBulkTests(APIFixtureMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = cls.make_user("owner")
+        cls.project = cls.make_project(cls.user)
+        cls.other_project = cls.make_project(cls.user, "Other")
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        self.url = f"/api/projects/{self.project.id}/tasks/bulk/"
+        self.due_date = (timezone.now() + timedelta(days=1)).isoformat()
+
+    def payload(self, count, **fields):
+        return [
+            {
+                "title": f"Imported {i}",
+                "description": "From the legacy tracker",
+                "due_date": self.due_date,
+                "assigned_to": self.user.id,
+                **fields,
+            }
+            for i in range(count)
+        ]
+
+    def test_bulk_create_query_count_is_constant(self):
+        get_user_roles(self.user.pk)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, self.payload(300), format="json")
+        self.assertEqual(response.status_code, 201)
+        # One in_bulk() per related field, then batched INSERTs only
+        statements = [query["sql"].split()[0] for query in queries.captured_queries]
+        self.assertEqual(statements.count("SELECT"), 2)
+        self.assertLess(statements.count("INSERT"), 10)
+        self.assertEqual(len(response.data), 300)
+        self.assertEqual(self.project.tasks.count(), 300)
+        self.assertEqual(response.data[0]["project"], self.project.id)
+
+    def test_bulk_create_reports_per_item_errors(self):
+        payload = self.payload(3)
+        payload[1]["assigned_to"] = 999999
+        payload[2]["status"] = "Blocked"
+        response = self.client.post(self.url, payload, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertIn("assigned_to", response.data[1])
+        self.assertIn("status", response.data[2])
+        self.assertFalse(self.project.tasks.exists())
+
+    def test_bulk_update(self):
+        tasks = self.make_tasks(self.project, 3)
+        payload = [{"id": task.id, "status": "Done"} for task in tasks]
+        payload[0]["assigned_to"] = self.user.id
+        response = self.client.patch(self.url, payload, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.project.tasks.filter(status="Done").count(), 3)
+        self.assertEqual(self.project.tasks.filter(assigned_to=self.user).count(), 1)
+
+    def test_bulk_update_is_scoped_to_project(self):
+        task = self.make_tasks(self.other_project, 1)[0]
+        response = self.client.patch(
+            self.url, [{"id": task.id, "status": "Done"}], format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {"id": ["Not found."]})
+        task.refresh_from_db()
+        self.assertEqual(task.status, "To Do")
+
+    def test_bulk_update_ids(self):
+        task = self.make_tasks(self.project, 1)[0]
+        response = self.client.patch(
+            self.url, [{"id": str(task.id), "title": "Renamed"}], format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        task.refresh_from_db()
+        self.assertEqual(task.title, "Renamed")
+
+        response = self.client.patch(
+            self.url,
+            [{"id": task.id, "title": "x"}, {"id": task.id, "title": "y"}],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, [{}, {"id": ["Duplicate id."]}])
+        task.refresh_from_db()
+        self.assertEqual(task.title, "Renamed")
+
+    def test_bulk_update_moves_publish_deletes(self):
+        tasks = self.make_tasks(self.project, 2)
+        payload = [
+            {"id": tasks[0].id, "status": "Done"},
+            {"id": tasks[1].id, "project": self.other_project.id},
+        ]
+        with mock.patch("api.views.publish_event") as publish:
+            response = self.client.patch(self.url, payload, format="json")
+        self.assertEqual(response.status_code, 200)
+        events = {
+            (call.args[0], call.args[2]): [item["id"] for item in call.args[3]]
+            for call in publish.mock_calls
+        }
+        self.assertEqual(
+            events,
+            {
+                (self.project.id, "updated"): [tasks[0].id],
+                (self.other_project.id, "updated"): [tasks[1].id],
+                (self.project.id, "deleted"): [tasks[1].id],
+            },
+        )
+
+    def test_bulk_destroy(self):
+        tasks = self.make_tasks(self.project, 3)
+        foreign = self.make_tasks(self.other_project, 1)[0]
+        response = self.client.delete(
+            self.url, [tasks[0].id, foreign.id], format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, [{}, {"id": ["Not found."]}])
+        self.assertEqual(self.project.tasks.count(), 3)
+
+        response = self.client.delete(
+            self.url, [task.id for task in tasks[:2]], format="json"
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(list(self.project.tasks.all()), [tasks[2]])
+
+    def test_single_create_still_validates_relations(self):
+        payload = self.payload(1, assigned_to=999999)[0]
+        response = self.client.post(
+            f"/api/projects/{self.project.id}/tasks/", payload, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("assigned_to", response.data)
+
+
+class ResponseCacheTests(APIFixtureMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = cls.make_user("owner")
+        cls.assignee = cls.make_user("assignee")
+        cls.project = cls.make_project(cls.owner)
+        cls.task = cls.make_tasks(cls.project, 1, assigned_to=cls.assignee)[0]
+        cls.member = ProjectMembers.objects.create(
+            project=cls.project, user=cls.assignee, role="Member"
+        )
+
+    def setUp(self):
+        get_cache().clear()
+        reset_cache_stats()
+        self.client.force_authenticate(self.owner)
+        self.task_url = f"/api/tasks/{self.task.id}/"
+
+    def assertServedFromCache(self, url):
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_detail_responses_are_cached(self):
+        for url in [
+            self.task_url,
+            f"/api/projects/{self.project.id}/",
+            f"/api/members/{self.member.id}/",
+        ]:
+            with self.subTest(url=url):
+                self.assertServedFromCache(url)
+        self.assertEqual(cache_stats(), {"hits": 3, "misses": 3})
+
+    def test_saving_the_object_invalidates(self):
+        self.assertServedFromCache(self.task_url)
+        self.client.patch(self.task_url, {"status": "Done"}, format="json")
+        response = self.client.get(self.task_url)
+        self.assertEqual(response.data["status"], "Done")
+
+    def test_saving_nested_objects_invalidates(self):
+        self.assertServedFromCache(self.task_url)
+        self.owner.first_name = "Renamed"
+        self.owner.save()
+        response = self.client.get(self.task_url)
+        self.assertEqual(response.data["project"]["owner"]["first_name"], "Renamed")
+
+        self.project.name = "Renamed project"
+        self.project.save()
+        response = self.client.get(self.task_url)
+        self.assertEqual(response.data["project"]["name"], "Renamed project")
+
+        self.assignee.delete()
+        response = self.client.get(self.task_url)
+        self.assertIsNone(response.data["assigned_to"])
+
+    def test_deleting_the_object_invalidates(self):
+        self.assertServedFromCache(self.task_url)
+        self.task.delete()
+        self.assertEqual(self.client.get(self.task_url).status_code, 404)
+
+    def test_bulk_update_invalidates(self):
+        self.assertServedFromCache(self.task_url)
+        self.client.patch(
+            f"/api/projects/{self.project.id}/tasks/bulk/",
+            [{"id": self.task.id, "priority": "High"}],
+            format="json",
+        )
+        self.assertEqual(self.client.get(self.task_url).data["priority"], "High")
+
+    def test_evicted_versions_are_a_miss(self):
+        self.assertServedFromCache(self.task_url)
+        get_cache().delete(f"api:version:api.users:{self.assignee.id}")
+        with self.assertNumQueries(1):
+            self.client.get(self.task_url)
+
+
+class ConditionalGetTests(APIFixtureMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = cls.make_user("owner")
+        cls.project = cls.make_project(cls.user)
+        cls.tasks = cls.make_tasks(cls.project, 3, assigned_to=cls.user)
+        cls.comments = cls.make_comments(cls.tasks[0], cls.user, 3)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        self.tasks_url = f"/api/projects/{self.project.id}/tasks/"
+        self.comments_url = f"/api/tasks/{self.tasks[0].id}/comments/"
+
+    def assertNotModified(self, url, etag, **params):
+        with self.assertNumQueries(1):
+            response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def assertModified(self, url, etag, **params):
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        return response
+
+    def test_unchanged_collections_return_304(self):
+        for url in [self.tasks_url, self.comments_url]:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertTrue(response["ETag"].startswith('W/"'))
+                self.assertNotModified(url, response["ETag"])
+
+    def test_if_modified_since_is_ignored(self):
+        # A delete leaves max(updated_at) as it was
+        response = self.client.get(self.tasks_url)
+        self.assertNotIn("Last-Modified", response)
+        self.tasks[2].delete()
+        response = self.client.get(
+            self.tasks_url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60)
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 2)
+
+    def test_changes_invalidate_the_etag(self):
+        etag = self.client.get(self.tasks_url)["ETag"]
+        self.tasks[1].status = "Done"
+        self.tasks[1].save()
+        etag = self.assertModified(self.tasks_url, etag)["ETag"]
+
+        self.make_tasks(self.project, 1)
+        etag = self.assertModified(self.tasks_url, etag)["ETag"]
+
+        self.tasks[2].delete()
+        etag = self.assertModified(self.tasks_url, etag)["ETag"]
+
+        # Nested objects: the project owner and the assignee
+        self.user.first_name = "Renamed"
+        self.user.save()
+        etag = self.assertModified(self.tasks_url, etag)["ETag"]
+
+        self.client.patch(
+            f"/api/projects/{self.project.id}/tasks/bulk/",
+            [{"id": self.tasks[0].id, "priority": "High"}],
+            format="json",
+        )
+        self.assertModified(self.tasks_url, etag)
+
+    def test_assignee_deletion_invalidates(self):
+        other = self.make_user("other")
+        task = self.make_tasks(self.project, 1, assigned_to=other)[0]
+        etag = self.client.get(self.tasks_url)["ETag"]
+        Users.objects.filter(pk=other.pk).delete()
+        task.refresh_from_db()
+        self.assertIsNone(task.assigned_to)
+        self.assertModified(self.tasks_url, etag)
+
+    def test_etag_depends_on_query(self):
+        etag = self.client.get(self.tasks_url)["ETag"]
+        self.assertModified(self.tasks_url, etag, fields="id,title")
+        self.assertModified(self.tasks_url, etag, status="Done")
+
+    def test_comment_changes_invalidate(self):
+        etag = self.client.get(self.comments_url)["ETag"]
+        self.comments[0].content = "Edited"
+        self.comments[0].save()
+        self.assertModified(self.comments_url, etag)
+
+
+class ChangeSyncTests(APIFixtureMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = cls.make_user("owner")
+        cls.project = cls.make_project(cls.user)
+        cls.other_project = cls.make_project(cls.user, "Other")
+        cls.tasks = cls.make_tasks(cls.project, 3)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        self.url = f"/api/projects/{self.project.id}/changes/"
+
+    def sync(self, since):
+        response = self.client.get(self.url, {"since": since})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_changes_since_token(self):
+        token = self.client.get(self.url).data["since"]
+        self.assertEqual(self.sync(token)["tasks"], {"upserted": [], "deleted": []})
+
+        self.tasks[0].status = "Done"
+        self.tasks[0].save()
+        deleted_id = self.tasks[1].id
+        self.tasks[1].delete()
+        comment = self.make_comments(self.tasks[0], self.user, 1)[0]
+        member = ProjectMembers.objects.create(
+            project=self.project, user=self.user, role="Admin"
+        )
+        self.make_tasks(self.other_project, 1)
+
+        data = self.sync(token)
+        self.assertEqual([t["id"] for t in data["tasks"]["upserted"]], [self.tasks[0].id])
+        self.assertEqual(data["tasks"]["upserted"][0]["status"], "Done")
+        self.assertEqual(data["tasks"]["deleted"], [deleted_id])
+        self.assertEqual([c["id"] for c in data["comments"]["upserted"]], [comment.id])
+        self.assertEqual([m["id"] for m in data["members"]["upserted"]], [member.id])
+
+        # Nothing new after the returned token
+        data = self.sync(data["since"])
+        self.assertEqual(data["tasks"], {"upserted": [], "deleted": []})
+
+    def test_cost_is_proportional_to_changes(self):
+        token = self.client.get(self.url).data["since"]
+        self.make_tasks(self.project, 50)
+        self.tasks[0].save()
+        # project, change log, then one query per synced model with changes
+        with self.assertNumQueries(3):
+            data = self.sync(token)
+        self.assertEqual(len(data["tasks"]["upserted"]), 51)
+
+    def test_update_then_delete_is_a_tombstone(self):
+        token = self.client.get(self.url).data["since"]
+        task = self.tasks[2]
+        task_id = task.id
+        task.save()
+        task.delete()
+        data = self.sync(token)
+        self.assertEqual(data["tasks"], {"upserted": [], "deleted": [task_id]})
+
+    def test_bulk_writes_and_cascades_are_logged(self):
+        token = self.client.get(self.url).data["since"]
+        bulk_url = f"/api/projects/{self.project.id}/tasks/bulk/"
+        due_date = (timezone.now() + timedelta(days=1)).isoformat()
+        created = self.client.post(
+            bulk_url,
+            [{"title": "Bulk", "description": "Bulk", "due_date": due_date}],
+            format="json",
+        ).data
+        self.client.patch(
+            bulk_url, [{"id": self.tasks[0].id, "status": "Done"}], format="json"
+        )
+        assignee = self.make_user("assignee")
+        self.tasks[2].assigned_to = assignee
+        self.tasks[2].save()
+        token_after_assign = self.sync(token)["since"]
+        assignee.delete()
+
+        data = self.sync(token)
+        self.assertEqual(
+            sorted(t["id"] for t in data["tasks"]["upserted"]),
+            sorted([created[0]["id"], self.tasks[0].id, self.tasks[2].id]),
+        )
+        data = self.sync(token_after_assign)
+        self.assertEqual([t["id"] for t in data["tasks"]["upserted"]], [self.tasks[2].id])
+        self.assertIsNone(data["tasks"]["upserted"][0]["assigned_to"])
+
+    def test_moved_objects_leave_the_old_project(self):
+        member = self.make_user("member")
+        ProjectMembers.objects.create(project=self.project, user=member, role="Member")
+        token = self.client.get(self.url).data["since"]
+        task, other_task = self.tasks[0], self.make_tasks(self.other_project, 1)[0]
+        comment = self.make_comments(self.tasks[1], self.user, 1)[0]
+        self.make_comments(task, self.user, 1)
+        self.client.patch(
+            f"/api/tasks/{task.id}/", {"project": self.other_project.id}, format="json"
+        )
+        self.client.put(
+            f"/api/comments/{comment.id}/", {"task": other_task.id}, format="json"
+        )
+        self.client.patch(
+            f"/api/projects/{self.project.id}/tasks/bulk/",
+            [{"id": self.tasks[2].id, "project": self.other_project.id}],
+            format="json",
+        )
+
+        # Neither from the token before the moves nor from the start does a
+        # member of the old project see the moved objects
+        self.client.force_authenticate(member)
+        for since in [token, 0]:
+            data = self.sync(since)
+            projects = {t["project"]["id"] for t in data["tasks"]["upserted"]}
+            self.assertLessEqual(projects, {self.project.id})
+            self.assertIn(task.id, data["tasks"]["deleted"])
+            self.assertIn(self.tasks[2].id, data["tasks"]["deleted"])
+            self.assertEqual(data["comments"]["upserted"], [])
+            self.assertIn(comment.id, data["comments"]["deleted"])
+
+        self.client.force_authenticate(self.user)
+        url = f"/api/projects/{self.other_project.id}/changes/"
+        data = self.client.get(url, {"since": token}).data
+        self.assertEqual(
+            sorted(t["id"] for t in data["tasks"]["upserted"]),
+            sorted([task.id, other_task.id, self.tasks[2].id]),
+        )
+        self.assertEqual(data["tasks"]["deleted"], [])
+
+    def test_moved_tasks_take_their_comments(self):
+        other_url = f"/api/projects/{self.other_project.id}/changes/"
+        single, bulk = self.tasks[0], self.tasks[1]
+        comments = [
+            *self.make_comments(single, self.user, 2),
+            *self.make_comments(bulk, self.user, 1),
+        ]
+        token = self.client.get(self.url).data["since"]
+        other_token = self.client.get(other_url).data["since"]
+        self.client.patch(
+            f"/api/tasks/{single.id}/",
+            {"project": self.other_project.id},
+            format="json",
+        )
+        self.client.patch(
+            f"/api/projects/{self.project.id}/tasks/bulk/",
+            [{"id": bulk.id, "project": self.other_project.id}],
+            format="json",
+        )
+
+        comment_ids = sorted(comment.id for comment in comments)
+        data = self.sync(token)
+        self.assertEqual(data["comments"], {"upserted": [], "deleted": comment_ids})
+        data = self.client.get(other_url, {"since": other_token}).data
+        self.assertEqual(
+            sorted(c["id"] for c in data["comments"]["upserted"]), comment_ids
+        )
+        self.assertEqual(data["comments"]["deleted"], [])
+
+    def test_batches(self):
+        from . import changes
+
+        token = self.client.get(self.url).data["since"]
+        self.make_tasks(self.project, 5)
+        original, changes.MAX_CHANGES = changes.MAX_CHANGES, 3
+        try:
+            first = self.sync(token)
+        finally:
+            changes.MAX_CHANGES = original
+        self.assertTrue(first["has_more"])
+        self.assertEqual(len(first["tasks"]["upserted"]), 3)
+        second = self.sync(first["since"])
+        self.assertFalse(second["has_more"])
+        self.assertEqual(len(second["tasks"]["upserted"]), 2)
+
+    def test_invalid_token(self):
+        self.assertEqual(self.client.get(self.url, {"since": "x"}).status_code, 400)
+
+
+@skipUnless(connection.vendor == "postgresql", "Commit-ordered tokens on Postgres")
+class ChangeSyncCommitOrderTests(TransactionTestCase):
+    def log(self):
+        return ChangeLog.objects.create(
+            project_id=1, model="task", object_id=1, action="update"
+        )
+
+    def test_tokens_wait_for_open_transactions(self):
+        token = current_token(1)
+        logged, release = threading.Event(), threading.Event()
+        entries = []
+
+        def write():
+            try:
+                with transaction.atomic():
+                    entries.append(self.log())
+                    logged.set()
+                    release.wait(5)
+            finally:
+                connection.close()
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        logged.wait(5)
+        later = self.log()
+        # The later entry is committed, but comes after the open one's
+        self.assertLess(entries[0].id, later.id)
+        self.assertEqual(current_token(1), token)
+        self.assertEqual(changes_since(1, token)["since"], str(token))
+
+        release.set()
+        writer.join()
+        data = changes_since(1, token)
+        self.assertEqual(data["since"], str(later.id))
+        self.assertEqual(current_token(1), later.id)
+
+
+class BroadcastBackendTests(APITestCase):
+    async def test_publish_from_another_thread(self):
+        backend = LocalBroadcastBackend(max_queue=2)
+        subscription = backend.subscribe("project-1")
+        other = backend.subscribe("project-2")
+        publisher = threading.Thread(
+            target=lambda: [backend.publish("project-1", str(i)) for i in range(3)]
+        )
+        publisher.start()
+        publisher.join()
+        # The slowest consumer keeps only the newest `max_queue` messages
+        self.assertEqual(await asyncio.wait_for(subscription.get(), 1), "1")
+        self.assertEqual(await asyncio.wait_for(subscription.get(), 1), "2")
+        self.assertTrue(other.queue.empty())
+        subscription.close()
+        other.close()
+        self.assertEqual(backend._groups, {})
+
+
+class WebSocketTests(APIFixtureMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = cls.make_user("owner")
+        cls.project = cls.make_project(cls.user)
+        cls.other_project = cls.make_project(cls.user, "Other")
+        cls.task = cls.make_tasks(cls.project, 1)[0]
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    async def connect(self, project, token=None):
+        inbound, outbound = asyncio.Queue(), asyncio.Queue()
+        token = token if token is not None else str(AccessToken.for_user(self.user))
+        scope = {
+            "type": "websocket",
+            "path": f"/ws/projects/{project.id}/",
+            "query_string": f"token={token}".encode(),
+        }
+        await inbound.put({"type": "websocket.connect"})
+        connection = asyncio.ensure_future(
+            websocket_application(scope, inbound.get, outbound.put)
+        )
+        message = await asyncio.wait_for(outbound.get(), 1)
+        return connection, inbound, outbound, message
+
+    def write(self, method, url, data=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return getattr(self.client, method)(url, data, format="json")
+
+    async def test_pushes_task_and_comment_events(self):
+        connection, inbound, outbound, message = await self.connect(self.project)
+        self.assertEqual(message, {"type": "websocket.accept"})
+        other, other_inbound, other_outbound, _ = await self.connect(self.other_project)
+
+        await sync_to_async(self.write)(
+            "patch", f"/api/tasks/{self.task.id}/", {"status": "Done"}
+        )
+        event = json.loads((await asyncio.wait_for(outbound.get(), 1))["text"])
+        self.assertEqual(event["type"], "task.updated")
+        self.assertEqual(event["objects"][0]["status"], "Done")
+
+        await sync_to_async(self.write)(
+            "post", f"/api/tasks/{self.task.id}/comments/", {"content": "Hi"}
+        )
+        event = json.loads((await asyncio.wait_for(outbound.get(), 1))["text"])
+        self.assertEqual(event["type"], "comment.created")
+        self.assertEqual(event["project"], self.project.id)
+
+        await sync_to_async(self.write)("delete", f"/api/tasks/{self.task.id}/")
+        event = json.loads((await asyncio.wait_for(outbound.get(), 1))["text"])
+        self.assertEqual(
+            event,
+            {
+                "type": "task.deleted",
+                "project": self.project.id,
+                "objects": [{"id": self.task.id}],
+            },
+        )
+        self.assertTrue(other_outbound.empty())
+
+        for queue in (inbound, other_inbound):
+            await queue.put({"type": "websocket.disconnect", "code": 1000})
+        await asyncio.wait_for(asyncio.gather(connection, other), 1)
+
+    async def test_moves_are_deletes_for_the_old_project(self):
+        connection, inbound, outbound, _ = await self.connect(self.project)
+        other, other_inbound, other_outbound, _ = await self.connect(self.other_project)
+        await sync_to_async(self.write)(
+            "patch", f"/api/tasks/{self.task.id}/", {"project": self.other_project.id}
+        )
+        event = json.loads((await asyncio.wait_for(outbound.get(), 1))["text"])
+        self.assertEqual(event["type"], "task.deleted")
+        self.assertEqual(event["objects"], [{"id": self.task.id}])
+        event = json.loads((await asyncio.wait_for(other_outbound.get(), 1))["text"])
+        self.assertEqual(event["type"], "task.updated")
+
+        for queue in (inbound, other_inbound):
+            await queue.put({"type": "websocket.disconnect", "code": 1000})
+        await asyncio.wait_for(asyncio.gather(connection, other), 1)
+
+    def test_failed_deletes_publish_nothing(self):
+        comment = self.make_comments(self.task, self.user, 1)[0]
+        for model, url in [
+            (Tasks, f"/api/tasks/{self.task.id}/"),
+            (Comments, f"/api/comments/{comment.id}/"),
+        ]:
+            with self.subTest(url=url), mock.patch.object(
+                model, "delete", side_effect=OperationalError("database is locked")
+            ):
+                with self.captureOnCommitCallbacks() as callbacks:
+                    with self.assertRaises(OperationalError):
+                        self.client.delete(url)
+                self.assertEqual(callbacks, [])
+
+    async def test_rejects_invalid_tokens(self):
+        connection, _, _, message = await self.connect(self.project, token="bogus")
+        self.assertEqual(message, {"type": "websocket.close", "code": 4401})
+        await asyncio.wait_for(connection, 1)
+
+    async def test_closes_when_membership_is_lost(self):
+        member = await sync_to_async(self.make_user)("member")
+        membership = await ProjectMembers.objects.acreate(
+            project=self.project, user=member, role="Member"
+        )
+        token = str(AccessToken.for_user(member))
+        connection, _, outbound, message = await self.connect(self.project, token)
+        self.assertEqual(message, {"type": "websocket.accept"})
+
+        await sync_to_async(self.write)("delete", f"/api/members/{membership.id}/")
+        message = await asyncio.wait_for(outbound.get(), 1)
+        self.assertEqual(message, {"type": "websocket.close", "code": 4403})
+        await asyncio.wait_for(connection, 1)
+
+    async def test_closes_when_the_token_expires(self):
+        token = AccessToken.for_user(self.user)
+        token.set_exp(lifetime=timedelta(seconds=1))
+        connection, _, outbound, message = await self.connect(self.project, str(token))
+        self.assertEqual(message, {"type": "websocket.accept"})
+        message = await asyncio.wait_for(outbound.get(), 3)
+        self.assertEqual(message, {"type": "websocket.close", "code": 4401})
+        await asyncio.wait_for(connection, 1)
+
+    async def test_rejects_non_members(self):
+        outsider = await sync_to_async(self.make_user)("outsider")
+        token = str(AccessToken.for_user(outsider))
+        connection, _, _, message = await self.connect(self.project, token=token)
+        self.assertEqual(message, {"type": "websocket.close", "code": 4401})
+        await asyncio.wait_for(connection, 1)
+
+
+class AsyncReadTests(APIFixtureMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = cls.make_user("owner")
+        cls.project = cls.make_project(cls.user)
+        cls.tasks = cls.make_tasks(cls.project, 5, assigned_to=cls.user)
+        cls.make_comments(cls.tasks[0], cls.user, 3)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        self.factory = AsyncRequestFactory()
+        self.auth = f"Bearer {AccessToken.for_user(self.user)}"
+
+    async def aget(self, view, path, headers=None, **kwargs):
+        request = self.factory.get(
+            path, headers={"Authorization": self.auth, **(headers or {})}
+        )
+        return await view(request, **kwargs)
+
+    def sync_get(self, path):
+        return self.client.get(path).json()
+
+    async def test_matches_sync_views(self):
+        project_id, task_id = self.project.id, self.tasks[0].id
+        cases = [
+            (async_views.project_list, "/api/projects/", {}),
+            (
+                async_views.project_detail,
+                f"/api/projects/{project_id}/",
+                {"pk": project_id},
+            ),
+            (
+                async_views.task_list,
+                f"/api/projects/{project_id}/tasks/"
+                "?page_size=2&ordering=-due_date&fields=id,title",
+                {"project_id": project_id},
+            ),
+            (async_views.task_detail, f"/api/tasks/{task_id}/", {"pk": task_id}),
+            (
+                async_views.comment_list,
+                f"/api/tasks/{task_id}/comments/",
+                {"task_id": task_id},
+            ),
+        ]
+        for view, path, kwargs in cases:
+            with self.subTest(path=path):
+                response = await self.aget(view, path, **kwargs)
+                self.assertEqual(response.status_code, 200)
+                expected = await sync_to_async(self.sync_get)(path)
+                self.assertEqual(json.loads(response.content), expected)
+
+    async def test_follows_cursor(self):
+        path = f"/api/projects/{self.project.id}/tasks/?page_size=3"
+        pages = []
+        while path:
+            response = await self.aget(
+                async_views.task_list, path, project_id=self.project.id
+            )
+            pages.append(json.loads(response.content))
+            path = pages[-1]["next"]
+        self.assertEqual(len(pages), 2)
+        ids = [task["id"] for page in pages for task in page["results"]]
+        self.assertEqual(ids, [task.id for task in self.tasks])
+
+    async def test_conditional_get(self):
+        path = f"/api/projects/{self.project.id}/tasks/"
+        response = await self.aget(
+            async_views.task_list, path, project_id=self.project.id
+        )
+        response = await self.aget(
+            async_views.task_list,
+            path,
+            headers={"If-None-Match": response.headers["ETag"]},
+            project_id=self.project.id,
+        )
+        self.assertEqual(response.status_code, 304)
+
+    async def test_detail_uses_response_cache(self):
+        reset_cache_stats()
+        path = f"/api/tasks/{self.tasks[1].id}/"
+        for _ in range(2):
+            response = await self.aget(
+                async_views.task_detail, path, pk=self.tasks[1].id
+            )
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(cache_stats(), {"hits": 1, "misses": 1})
+
+        response = await self.aget(
+            async_views.comment_detail, "/api/comments/0/", pk=0
+        )
+        self.assertEqual(response.status_code, 404)
+
+    async def test_requires_authentication(self):
+        request = self.factory.get("/api/projects/")
+        response = await async_views.project_list(request)
+        self.assertEqual(response.status_code, 401)
+
+        request = self.factory.get(
+            "/api/projects/", headers={"Authorization": "Bearer bogus"}
+        )
+        response = await async_views.project_list(request)
+        self.assertEqual(response.status_code, 401)
+
+    async def test_writes_fall_through_to_viewsets(self):
+        request = self.factory.patch(
+            f"/api/tasks/{self.tasks[2].id}/",
+            {"status": "Done"},
+            content_type="application/json",
+            headers={"Authorization": self.auth},
+        )
+        response = await async_views.task_detail(request, pk=self.tasks[2].id)
+        self.assertEqual(response.status_code, 200)
+        task = await Tasks.objects.aget(pk=self.tasks[2].id)
+        self.assertEqual(task.status, "Done")
+
+
+class CachedAuthenticationTests(APIFixtureMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = cls.make_user("owner")
+        cls.project = cls.make_project(cls.user)
+
+    def setUp(self):
+        user_cache.clear()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}"
+        )
+        self.path = f"/api/projects/{self.project.id}/"
+
+    def user_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.path)
+        return response, [q for q in queries if '"api_users"' in q["sql"]]
+
+    def test_repeat_requests_skip_user_query(self):
+        response, queries = self.user_queries()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(queries)
+        response, queries = self.user_queries()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, [])
+
+    def test_deactivation_evicts_user(self):
+        self.client.get(self.path)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.path).status_code, 401)
+
+    def test_unsignalled_change_expires_after_ttl(self):
+        self.client.get(self.path)
+        Users.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get(self.path).status_code, 200)
+
+        later = time.monotonic() + user_cache.ttl + 1
+        with mock.patch("api.authentication.time.monotonic", return_value=later):
+            self.assertEqual(self.client.get(self.path).status_code, 401)
+
+    def test_cache_is_bounded(self):
+        users = [self.make_user(f"user{index}") for index in range(3)]
+        with mock.patch.object(user_cache, "max_size", 2):
+            for user in users:
+                user_cache.set(user)
+        self.assertIsNone(user_cache.get(users[0].pk))
+        self.assertEqual(user_cache.get(users[2].pk), users[2])
+
+
+FAST_PASSWORD_HASHING = {
+    **settings.API_PASSWORD_HASHING,
+    "ALGORITHM": "scrypt",
+    "OPTIONS": {"scrypt": {"work_factor": 2**10, "block_size": 8, "parallelism": 1}},
+}
+
+
+@override_settings(API_PASSWORD_HASHING=FAST_PASSWORD_HASHING)
+class LoginTests(APIFixtureMixin, APITestCase):
+    def setUp(self):
+        self.user = self.make_user("owner")
+
+    def login(self, email="owner@example.com", password="secret-pass-123"):
+        return self.client.post(
+            "/api/users/login/", {"email": email, "password": password}, format="json"
+        )
+
+    def test_login(self):
+        response = self.login()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("access", response.data)
+
+    def test_unknown_email_looks_like_wrong_password(self):
+        wrong_password = self.login(password="wrong-pass")
+        with mock.patch("api.hashers._verify", wraps=hashers._verify) as verify:
+            unknown_email = self.login(email="nobody@example.com")
+        verify.assert_called_once()
+        self.assertEqual(unknown_email.status_code, wrong_password.status_code)
+        self.assertEqual(unknown_email.data, wrong_password.data)
+
+    def test_rehashes_on_login(self):
+        self.user.password = make_password("secret-pass-123", hasher="pbkdf2_sha256")
+        self.user.save()
+        self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("scrypt$1024$"))
+
+        options = {"work_factor": 2**11, "block_size": 8, "parallelism": 1}
+        stronger = {**FAST_PASSWORD_HASHING, "OPTIONS": {"scrypt": options}}
+        with self.settings(API_PASSWORD_HASHING=stronger):
+            self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("scrypt$2048$"))
+
+    def test_busy_pool_rejects_logins(self):
+        with mock.patch("api.views.verify_password", side_effect=VerificationBusy):
+            response = self.login()
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("Retry-After", response.headers)
+
+    def test_pool_is_bounded(self):
+        pool = VerificationPool(workers=1, queue=1)
+        release = threading.Event()
+        running = [pool.submit(release.wait) for _ in range(2)]
+        with self.assertRaises(VerificationBusy):
+            pool.submit(release.wait)
+        release.set()
+        for future in running:
+            future.result(timeout=1)
+        self.assertTrue(pool.submit(lambda: True).result(timeout=1))
+        pool.executor.shutdown()
+
+
+class ProjectPermissionTests(APIFixtureMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = cls.make_user("owner")
+        cls.admin = cls.make_user("admin")
+        cls.member = cls.make_user("member")
+        cls.outsider = cls.make_user("outsider")
+        cls.project = cls.make_project(cls.owner)
+        cls.other_project = cls.make_project(cls.outsider, "Other")
+        ProjectMembers.objects.create(project=cls.project, user=cls.admin, role="Admin")
+        ProjectMembers.objects.create(
+            project=cls.project, user=cls.member, role="Member"
+        )
+        cls.task = cls.make_tasks(cls.project, 1)[0]
+        cls.comment = cls.make_comments(cls.task, cls.owner, 1)[0]
+
+    def setUp(self):
+        get_cache().clear()
+
+    def as_user(self, user):
+        self.client.force_authenticate(user)
+        return self.client
+
+    @override_settings(API_PROJECT_ROLES={"TIMEOUT": 7})
+    def test_roles_are_cached_for_the_configured_time(self):
+        with mock.patch.object(get_cache(), "set") as cache_set:
+            self.assertEqual(get_user_roles(self.member.pk), {self.project.id: "Member"})
+        cache_set.assert_called_once_with(mock.ANY, mock.ANY, timeout=7)
+
+    def test_owner_is_admin_member(self):
+        membership = self.project.members.get(user=self.owner)
+        self.assertEqual(membership.role, "Admin")
+
+    def test_outsiders_cannot_see_project(self):
+        # Warm the response cache as a member first
+        self.as_user(self.member).get(f"/api/tasks/{self.task.id}/")
+        client = self.as_user(self.outsider)
+        response = client.get("/api/projects/")
+        self.assertEqual(
+            [p["id"] for p in response.data["results"]], [self.other_project.id]
+        )
+        for url in [
+            f"/api/projects/{self.project.id}/",
+            f"/api/projects/{self.project.id}/tasks/",
+            f"/api/projects/{self.project.id}/members/",
+            f"/api/projects/{self.project.id}/changes/",
+            f"/api/tasks/{self.task.id}/",
+            f"/api/comments/{self.comment.id}/",
+        ]:
+            with self.subTest(url=url):
+                self.assertEqual(client.get(url).status_code, 404)
+        response = client.get(f"/api/tasks/{self.task.id}/comments/")
+        self.assertEqual(response.data["results"], [])
+        response = client.patch(
+            f"/api/tasks/{self.task.id}/", {"status": "Done"}, format="json"
+        )
+        self.assertEqual(response.status_code, 404)
+        response = client.post(
+            f"/api/tasks/{self.task.id}/comments/", {"content": "Hi"}, format="json"
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_members_write_tasks_but_not_project(self):
+        client = self.as_user(self.member)
+        response = client.patch(
+            f"/api/tasks/{self.task.id}/", {"status": "Done"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        response = client.post(
+            f"/api/tasks/{self.task.id}/comments/", {"content": "Hi"}, format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+        response = client.patch(
+            f"/api/projects/{self.project.id}/", {"name": "Renamed"}, format="json"
+        )
+        self.assertEqual(response.status_code, 403)
+        response = client.post(
+            f"/api/projects/{self.project.id}/members/",
+            {"project": self.project.id, "user": self.outsider.id, "role": "Member"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(
+            client.delete(f"/api/projects/{self.project.id}/").status_code, 403
+        )
+
+    def test_cannot_move_task_to_foreign_project(self):
+        response = self.as_user(self.member).patch(
+            f"/api/tasks/{self.task.id}/",
+            {"project": self.other_project.id},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 404)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.project_id, self.project.id)
+
+    def test_admins_manage_members(self):
+        client = self.as_user(self.admin)
+        response = client.patch(
+            f"/api/projects/{self.project.id}/", {"name": "Renamed"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+
+        # The outsider's cached role map is replaced when they are added
+        outsider = APIClient()
+        outsider.force_authenticate(self.outsider)
+        url = f"/api/projects/{self.project.id}/tasks/"
+        self.assertEqual(outsider.get(url).status_code, 404)
+        response = client.post(
+            f"/api/projects/{self.project.id}/members/",
+            {"project": self.project.id, "user": self.outsider.id, "role": "Member"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(outsider.get(url).status_code, 200)
+
+        owner_membership = self.project.members.get(user=self.owner)
+        response = client.delete(f"/api/members/{owner_membership.id}/")
+        self.assertEqual(response.status_code, 403)
+
+    def test_role_map_loaded_once_per_request(self):
+        client = self.as_user(self.member)
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as queries:
+                response = client.patch(
+                    f"/api/tasks/{self.task.id}/",
+                    {"project": self.project.id},
+                    format="json",
+                )
+            self.assertEqual(response.status_code, 200)
+            membership_queries = [
+                q for q in queries if 'FROM "api_projectmembers"' in q["sql"]
+            ]
+            self.assertLessEqual(len(membership_queries), 1)
+        # The second request found the map in the cache
+        self.assertEqual(membership_queries, [])
+
+    async def test_async_reads_are_scoped(self):
+        request = AsyncRequestFactory().get(
+            f"/api/tasks/{self.task.id}/",
+            headers={"Authorization": f"Bearer {AccessToken.for_user(self.outsider)}"},
+        )
+        response = await async_views.task_detail(request, pk=self.task.id)
+        self.assertEqual(response.status_code, 404)
+
+
+class ProjectStatsTests(APIFixtureMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = cls.make_user("owner")
+        cls.assignee = cls.make_user("assignee")
+        cls.project = cls.make_project(cls.user)
+        cls.other_project = cls.make_project(cls.user, "Other")
+        cls.tasks = cls.make_tasks(cls.project, 3, assigned_to=cls.assignee)
+        cls.tasks += cls.make_tasks(cls.project, 2, status="Done", priority="High")
+        cls.tasks += cls.make_tasks(
+            cls.project, 1, due_date=timezone.now() - timedelta(days=1)
+        )
+        cls.make_tasks(cls.other_project, 4)
+        cls.make_comments(cls.tasks[0], cls.user, 3)
+        cls.make_comments(cls.tasks[3], cls.user, 2)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        self.url = f"/api/projects/{self.project.id}/stats/"
+        get_user_roles(self.user.pk)
+
+    def test_stats(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(
+            response.data,
+            {
+                "project": self.project.id,
+                "tasks": 6,
+                "by_status": {"To Do": 4, "In Progress": 0, "Done": 2},
+                "by_priority": {"Low": 0, "Medium": 4, "High": 2},
+                "overdue": 1,
+                "assignees": [
+                    {"user": self.assignee.id, "tasks": 3, "open": 3},
+                    {"user": None, "tasks": 3, "open": 1},
+                ],
+                "comments": 5,
+            },
+        )
+
+    def test_requires_membership(self):
+        self.client.force_authenticate(self.assignee)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    @override_settings(API_PROJECT_STATS={"SUMMARY": True})
+    def test_summary_follows_writes(self):
+        call_command("rebuild_project_stats", stdout=StringIO())
+        task_url = f"/api/tasks/{self.tasks[0].id}/"
+        bulk_url = f"/api/projects/{self.project.id}/tasks/bulk/"
+        due_date = (timezone.now() + timedelta(days=3)).isoformat()
+        writes = [
+            ("patch", task_url, {"status": "In Progress"}),
+            ("patch", task_url, {"assigned_to": self.user.id, "priority": "Low"}),
+            ("patch", task_url, {"project": self.other_project.id}),
+            ("patch", task_url, {"project": self.project.id}),
+            (
+                "post",
+                f"/api/projects/{self.project.id}/tasks/",
+                {"title": "New", "description": "New", "due_date": due_date},
+            ),
+            ("post", f"/api/tasks/{self.tasks[1].id}/comments/", {"content": "Hi"}),
+            (
+                "post",
+                bulk_url,
+                [{"title": "Bulk", "description": "Bulk", "due_date": due_date}] * 3,
+            ),
+            (
+                "patch",
+                bulk_url,
+                [{"id": task.id, "status": "Done"} for task in self.tasks[:2]],
+            ),
+            ("delete", f"/api/tasks/{self.tasks[3].id}/", None),
+            ("delete", bulk_url, [self.tasks[0].id, self.tasks[4].id]),
+        ]
+        for method, url, data in writes:
+            with self.subTest(method=method, url=url):
+                response = getattr(self.client, method)(url, data, format="json")
+                self.assertLess(response.status_code, 300, response.data)
+                for project in (self.project, self.other_project):
+                    self.assertEqual(
+                        summarized_project_stats(project.id),
+                        compute_project_stats(project.id),
+                    )
+
+        comment = self.make_comments(self.tasks[1], self.assignee, 1)[0]
+        comment.task = self.tasks[2]
+        comment.save()
+        comment.delete()
+        self.assignee.delete()
+        self.assertEqual(
+            summarized_project_stats(self.project.id),
+            compute_project_stats(self.project.id),
+        )
+
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data, compute_project_stats(self.project.id))
+
+        project_id = self.project.id
+        self.project.delete()
+        self.assertFalse(ProjectTaskSummary.objects.filter(project_id=project_id))
+
+    @override_settings(API_PROJECT_STATS={"SUMMARY": True})
+    def test_bulk_delete_queries_do_not_grow_with_tasks(self):
+        call_command("rebuild_project_stats", stdout=StringIO())
+        tasks = self.make_tasks(self.project, 4)
+        for task in tasks:
+            self.make_comments(task, self.user, 2)
+        counts = []
+        for batch in (tasks[:1], tasks[1:]):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.delete(
+                    f"/api/projects/{self.project.id}/tasks/bulk/",
+                    [task.id for task in batch],
+                    format="json",
+                )
+            self.assertEqual(response.status_code, 204)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(
+            summarized_project_stats(self.project.id),
+            compute_project_stats(self.project.id),
+        )
+
+    @override_settings(API_PROJECT_STATS={"SUMMARY": True})
+    def test_rebuild(self):
+        rebuild_summary()
+        self.assertEqual(ProjectTaskSummary.objects.count(), 4)
+        self.assertEqual(
+            summarized_project_stats(self.project.id),
+            compute_project_stats(self.project.id),
+        )
+
+
+class SearchTests(APIFixtureMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = cls.make_user("owner")
+        cls.project = cls.make_project(cls.user)
+        cls.other_project = cls.make_project(cls.user, "Other")
+        cls.task = Tasks.objects.create(
+            title="Export fails on large projects",
+            description="The CSV export times out.",
+            project=cls.project,
+            due_date=timezone.now(),
+        )
+        cls.other_task = Tasks.objects.create(
+            title="Dashboard",
+            description="Show failing exports on the dashboard.",
+            project=cls.project,
+            due_date=timezone.now(),
+        )
+        cls.comment = Comments.objects.create(
+            content="The export failed again today.",
+            user=cls.user,
+            task=cls.other_task,
+        )
+        Tasks.objects.create(
+            title="Export fails elsewhere",
+            description="",
+            project=cls.other_project,
+            due_date=timezone.now(),
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        self.url = f"/api/projects/{self.project.id}/search/"
+
+    def hits(self, query, project=None):
+        project = project or self.project
+        return [
+            (hit["type"], hit["id"])
+            for hit in search_project(project.id, query, limit=10)
+        ]
+
+    def test_ranked_and_scoped(self):
+        response = self.client.get(self.url, {"q": "exports FAILING"})
+        self.assertEqual(response.status_code, 200)
+        hits = {(hit["type"], hit["id"]): hit for hit in response.data["results"]}
+        # Title matches rank first
+        self.assertEqual(next(iter(hits)), ("task", self.task.id))
+        self.assertEqual(
+            set(hits),
+            {
+                ("task", self.task.id),
+                ("task", self.other_task.id),
+                ("comment", self.comment.id),
+            },
+        )
+        comment = hits[("comment", self.comment.id)]
+        self.assertEqual(comment["task"], self.other_task.id)
+        self.assertEqual(comment["title"], "Dashboard")
+        self.assertIn("export failed", comment["snippet"])
+        self.assertEqual(self.hits("dashboard times"), [])
+
+    def test_index_follows_writes(self):
+        self.task.title = "Import is slow"
+        self.task.description = "Nothing else"
+        self.task.save()
+        self.assertEqual(
+            set(self.hits("export")),
+            {("task", self.other_task.id), ("comment", self.comment.id)},
+        )
+        self.assertEqual(self.hits("import"), [("task", self.task.id)])
+
+        Tasks.objects.filter(pk=self.other_task.pk).update(project=self.other_project)
+        self.assertEqual(self.hits("export"), [])
+        self.assertIn(
+            ("comment", self.comment.id), self.hits("export", self.other_project)
+        )
+
+        Comments.objects.filter(pk=self.comment.pk).update(content="Fixed")
+        self.assertEqual(
+            self.hits("fixed", self.other_project), [("comment", self.comment.id)]
+        )
+        self.comment.delete()
+        self.other_task.delete()
+        self.assertEqual(self.hits("fixed dashboard", self.other_project), [])
+
+    def test_pagination(self):
+        self.make_tasks(self.project, 5, description="Export")
+        response = self.client.get(self.url, {"q": "export", "page_size": 3})
+        ids = [hit["id"] for hit in response.data["results"]]
+        self.assertIsNone(response.data["previous"])
+        while response.data["next"]:
+            response = self.client.get(response.data["next"])
+            ids += [hit["id"] for hit in response.data["results"]]
+        self.assertEqual(len(ids), 8)
+        self.assertIsNotNone(response.data["previous"])
+
+    def test_query_syntax_is_not_interpreted(self):
+        for query in ['"export', "export OR x", "export*", "project:1", "NEAR("]:
+            with self.subTest(query=query):
+                response = self.client.get(self.url, {"q": query})
+                self.assertEqual(response.status_code, 200)
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get(self.url, {"q": " ! "}).status_code, 400)
+        response = self.client.get(self.url, {"q": "export", "page": 0})
+        self.assertEqual(response.status_code, 404)
+        self.client.force_authenticate(self.make_user("stranger"))
+        self.assertEqual(self.client.get(self.url, {"q": "export"}).status_code, 404)
+
+    def test_fallback_without_index(self):
+        with mock.patch("api.search.has_search_index", return_value=False):
+            # Tasks first, then comments
+            self.assertEqual(
+                self.hits("export fail"),
+                [
+                    ("task", self.task.id),
+                    ("task", self.other_task.id),
+                    ("comment", self.comment.id),
+                ],
+            )
+
+
+class ExportTests(APIFixtureMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = cls.make_user("owner")
+        cls.project = cls.make_project(cls.user)
+        cls.tasks = cls.make_tasks(cls.project, 3, assigned_to=cls.user)
+        cls.comments = cls.make_comments(cls.tasks[0], cls.user, 2)
+        cls.comments += cls.make_comments(cls.tasks[2], cls.user, 1)
+        cls.make_tasks(cls.make_project(cls.user, "Other"), 2)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def export(self, export_format):
+        response = self.client.get(
+            f"/api/projects/{self.project.id}/export/{export_format}/"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        response, content = self.export("ndjson")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertIn(
+            f"project-{self.project.id}.ndjson", response["Content-Disposition"]
+        )
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(
+            [(row["type"], row["id"]) for row in rows],
+            [
+                ("task", self.tasks[0].id),
+                ("comment", self.comments[0].id),
+                ("comment", self.comments[1].id),
+                ("task", self.tasks[1].id),
+                ("task", self.tasks[2].id),
+                ("comment", self.comments[2].id),
+            ],
+        )
+        task = TaskSerializer(self.tasks[0]).data
+        self.assertEqual(rows[0]["created_at"], task["created_at"])
+        self.assertEqual(rows[0]["due_date"], task["due_date"])
+        self.assertEqual(rows[0]["assigned_to"], self.user.id)
+        self.assertEqual(rows[1]["content"], self.comments[0].content)
+        self.assertEqual(rows[1]["task"], self.tasks[0].id)
+
+    def test_csv(self):
+        response, content = self.export("csv")
+        self.assertEqual(response["Content-Type"], "text/csv")
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[0]["title"], self.tasks[0].title)
+        self.assertEqual(rows[1]["type"], "comment")
+        self.assertEqual(rows[1]["user"], str(self.user.id))
+
+    def test_requires_membership_and_known_format(self):
+        url = f"/api/projects/{self.project.id}/export/"
+        self.assertEqual(self.client.get(url + "xml/").status_code, 404)
+        self.client.force_authenticate(self.make_user("stranger"))
+        self.assertEqual(self.client.get(url + "csv/").status_code, 404)
+
+    def test_memory_stays_flat(self):
+        description = "x" * 2000
+        Tasks.objects.bulk_create(
+            [
+                Tasks(
+                    title=f"Task {i}",
+                    description=description,
+                    project=self.project,
+                    due_date=timezone.now(),
+                )
+                for i in range(2000)
+            ]
+        )
+        with mock.patch.object(export, "CHUNK_SIZE", 100):
+            response = self.client.get(
+                f"/api/projects/{self.project.id}/export/ndjson/"
+            )
+            size = 0
+            tracemalloc.start()
+            try:
+                for chunk in response.streaming_content:
+                    size += len(chunk)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+        # About 100 rows and one output buffer at a time, not the 4 MB export
+        self.assertGreater(size, 4_000_000)
+        self.assertLess(peak, 1_500_000)
+
+    def test_async_iteration(self):
+        async def collect(iterator):
+            return [chunk async for chunk in export.aiterate(iterator)]
+
+        chunks = export.export_project(self.project.id, "ndjson")
+        self.assertEqual(
+            b"".join(async_to_sync(collect)(chunks)),
+            self.export("ndjson")[1].encode(),
+        )
+
+
+class LeanSerializerTests(APIFixtureMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = cls.make_user("owner")
+        cls.member = cls.make_user("member")
+        cls.project = cls.make_project(cls.user)
+        ProjectMembers.objects.create(
+            project=cls.project, user=cls.member, role="Member"
+        )
+        cls.tasks = cls.make_tasks(cls.project, 4, assigned_to=cls.member)
+        # Unassigned, with text JSON escapes
+        cls.tasks += cls.make_tasks(cls.project, 3, description="Résumé \u2013 \"a\"")
+        cls.make_comments(cls.tasks[0], cls.user, 3)
+        cls.make_comments(cls.tasks[0], cls.member, 2)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def assertRendersLikeDRF(self, serializer_class, queryset, fields=None):
+        kwargs = {} if fields is None else {"fields": fields}
+        expected = serializer_class(queryset, many=True, **kwargs).data
+        lean = get_lean_serializer(serializer_class, fields)
+        self.assertIsNotNone(lean)
+        rows = lean.values(queryset)
+        self.assertEqual(
+            JSONRenderer().render(lean.render_many(rows)),
+            JSONRenderer().render(expected),
+        )
+
+    def test_matches_drf_serializers(self):
+        cases = [
+            (TaskSerializer, Tasks.objects.order_by("id")),
+            (CommentSerializer, Comments.objects.order_by("id")),
+            (ProjectMemberSerializer, ProjectMembers.objects.order_by("id")),
+        ]
+        for serializer_class, queryset in cases:
+            with self.subTest(serializer=serializer_class.__name__):
+                self.assertRendersLikeDRF(serializer_class, queryset)
+
+    def test_sparse_fields(self):
+        for fields in (["id", "title"], ["assigned_to", "due_date"], ["project"]):
+            with self.subTest(fields=fields):
+                self.assertRendersLikeDRF(
+                    TaskSerializer, Tasks.objects.order_by("id"), fields
+                )
+
+    def test_uncompilable_serializer(self):
+        class TaskTitleSerializer(serializers.ModelSerializer):
+            upper = serializers.SerializerMethodField()
+
+            class Meta:
+                model = Tasks
+                fields = ["id", "upper"]
+
+            def get_upper(self, task):
+                return task.title.upper()
+
+        self.assertIsNone(get_lean_serializer(TaskTitleSerializer))
+
+    def collect_pages(self, path):
+        pages = []
+        while path:
+            response = self.client.get(path)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.content)
+            path = response.json()["next"]
+        return pages
+
+    def test_list_endpoints_match(self):
+        paths = [
+            f"/api/projects/{self.project.id}/tasks/?page_size=2",
+            f"/api/projects/{self.project.id}/tasks/?page_size=3&ordering=-due_date",
+            f"/api/projects/{self.project.id}/tasks/?fields=id,assigned_to&page_size=4",
+            f"/api/tasks/{self.tasks[0].id}/comments/?page_size=2",
+            f"/api/projects/{self.project.id}/members/?page_size=1",
+        ]
+        for path in paths:
+            with self.subTest(path=path):
+                with override_settings(API_LEAN_SERIALIZERS=False):
+                    expected = self.collect_pages(path)
+                with override_settings(API_LEAN_SERIALIZERS=True):
+                    self.assertEqual(self.collect_pages(path), expected)
+                self.assertGreater(len(expected), 1)
+
+    @override_settings(API_LEAN_SERIALIZERS=True)
+    def test_async_list_endpoints(self):
+        factory = AsyncRequestFactory()
+        auth = f"Bearer {AccessToken.for_user(self.user)}"
+        path = f"/api/projects/{self.project.id}/tasks/?page_size=3&ordering=title"
+        request = factory.get(path, headers={"Authorization": auth})
+        response = async_to_sync(async_views.task_list)(
+            request, project_id=self.project.id
+        )
+        self.assertEqual(response.status_code, 200)
+        with override_settings(API_LEAN_SERIALIZERS=False):
+            expected = self.client.get(path).json()
+        self.assertEqual(json.loads(response.content), expected)
+
+
+class FastJSONTests(APIFixtureMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = cls.make_user("owner")
+        cls.project = cls.make_project(cls.user)
+        cls.tasks = cls.make_tasks(
+            cls.project, 3, assigned_to=cls.user, description="Naïve \u2028 \"ok\""
+        )
+        cls.make_comments(cls.tasks[0], cls.user, 2)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def assertRendersLikeDRF(self, data, accepted_media_type=None):
+        self.assertEqual(
+            FastJSONRenderer().render(data, accepted_media_type),
+            JSONRenderer().render(data, accepted_media_type),
+        )
+
+    def test_matches_drf_renderer(self):
+        now = timezone.now()
+        cases = [
+            TaskSerializer(Tasks.objects.all(), many=True).data,
+            CommentSerializer(Comments.objects.all(), many=True).data,
+            {"at": now, "date": now.date(), "naive": now.replace(tzinfo=None)},
+            {"price": Decimal("12.50"), 1: "int key", "lazy": gettext_lazy("Tasks")},
+            {"huge": 2**70, "nested": [{"none": None, "float": 1.5}]},
+            [],
+        ]
+        for data in cases:
+            with self.subTest(data=data):
+                self.assertRendersLikeDRF(data)
+        self.assertRendersLikeDRF(cases[0], "application/json; indent=4")
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+
+    def test_rejects_non_finite_floats(self):
+        for value in [float("nan"), float("inf"), -float("inf")]:
+            for data in [{"a": [1, {"b": value}]}, {value: 1}]:
+                with self.subTest(data=data):
+                    with self.assertRaises(ValueError):
+                        JSONRenderer().render(data)
+                    with self.assertRaises(ValueError):
+                        FastJSONRenderer().render(data)
+        self.assertRendersLikeDRF({"a": None, "b": 1.5})
+
+    def test_checks_serializers_with_float_fields(self):
+        class ReadingSerializer(serializers.Serializer):
+            name = serializers.CharField()
+            value = serializers.FloatField()
+
+        readings = [{"name": "a", "value": float("nan")}, {"name": "b", "value": None}]
+        data = ReadingSerializer(readings, many=True).data
+        with self.assertRaises(ValueError):
+            FastJSONRenderer().render({"previous": None, "results": data})
+        self.assertFalse(is_float_free(ReadingSerializer()))
+        self.assertTrue(is_float_free(TaskSerializer(many=True)))
+
+    def test_fallback_without_orjson(self):
+        data = TaskSerializer(Tasks.objects.all(), many=True).data
+        with mock.patch("api.renderers.orjson", None):
+            self.assertEqual(
+                FastJSONRenderer().render(data), JSONRenderer().render(data)
+            )
+            self.assertEqual(
+                FastJSONParser().parse(BytesIO(b'{"a": [1, "\\u00e9"]}')),
+                {"a": [1, "é"]},
+            )
+
+    def test_parser(self):
+        parser = FastJSONParser()
+        self.assertEqual(
+            parser.parse(BytesIO('{"title": "Tâche", "n": 1.5}'.encode())),
+            {"title": "Tâche", "n": 1.5},
+        )
+        for content in (b"{", b'{"a": NaN}', b"\xff"):
+            with self.subTest(content=content):
+                with self.assertRaises(ParseError):
+                    parser.parse(BytesIO(content))
+        latin1 = parser.parse(
+            BytesIO('{"a": "é"}'.encode("latin-1")),
+            parser_context={"encoding": "latin-1"},
+        )
+        self.assertEqual(latin1, {"a": "é"})
+
+    def test_endpoints(self):
+        response = self.client.get(f"/api/projects/{self.project.id}/tasks/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, JSONRenderer().render(response.json()))
+        self.assertIn(b"\\u2028", response.content)
+
+        response = self.client.post(
+            f"/api/tasks/{self.tasks[0].id}/comments/",
+            data=json.dumps({"content": "Déjà vu", "task": self.tasks[0].id}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()["content"], "Déjà vu")
+
+        response = self.client.post(
+            f"/api/tasks/{self.tasks[0].id}/comments/",
+            data=b'{"content": ',
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.json()["detail"].startswith("JSON parse error"))
+
+
+class CompressionTests(APIFixtureMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = cls.make_user("owner")
+        cls.project = cls.make_project(cls.user)
+        cls.tasks = cls.make_tasks(cls.project, 20, assigned_to=cls.user)
+        cls.make_comments(cls.tasks[0], cls.user, 20)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def get(self, path, accept_encoding="gzip"):
+        return self.client.get(path, headers={"Accept-Encoding": accept_encoding})
+
+    def test_negotiation(self):
+        preference = ["zstd", "br", "gzip"]
+        cases = [
+            ("gzip, deflate", "gzip"),
+            ("GZIP;q=0.5", "gzip"),
+            ("gzip;q=0", None),
+            ("deflate, identity", None),
+            ("*", "gzip"),
+            ("*;q=0.1, gzip;q=0", None),
+            ("gzip;q=oops", None),
+            ("", None),
+        ]
+        with mock.patch.dict(
+            compression.COMPRESSORS, {"gzip": compression.gzip_compressor}, clear=True
+        ):
+            for header, expected in cases:
+                with self.subTest(header=header):
+                    self.assertEqual(
+                        compression.negotiate_encoding(header, preference), expected
+                    )
+            # br and zstd are only picked when installed
+            compression.COMPRESSORS["br"] = compression.gzip_compressor
+            self.assertEqual(
+                compression.negotiate_encoding("gzip, br", preference), "br"
+            )
+            self.assertEqual(
+                compression.negotiate_encoding("gzip, br;q=0.5", preference), "gzip"
+            )
+            self.assertEqual(compression.negotiate_encoding("zstd", preference), None)
+
+    def test_compresses_list(self):
+        path = f"/api/projects/{self.project.id}/tasks/"
+        plain = self.get(path, "identity")
+        self.assertNotIn("Content-Encoding", plain)
+        self.assertIn("Accept-Encoding", plain["Vary"])
+
+        response = self.get(path)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(int(response["Content-Length"]), len(response.content))
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertLess(len(response.content), len(plain.content) / 4)
+
+    def test_skips_small_responses(self):
+        response = self.get(f"/api/tasks/{self.tasks[0].id}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Content-Encoding", response)
+        with override_settings(
+            API_COMPRESSION={**settings.API_COMPRESSION, "MIN_SIZE": 0}
+        ):
+            response = self.get(f"/api/tasks/{self.tasks[0].id}/")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+
+    def test_skips_encoded_and_compressed_content(self):
+        middleware = compression.CompressionMiddleware(lambda request: None)
+        request = RequestFactory().get("/", headers={"Accept-Encoding": "gzip"})
+        cases = [
+            HttpResponse(b"a" * 4096, content_type="image/png"),
+            HttpResponse(b"a" * 4096, headers={"Content-Encoding": "br"}),
+        ]
+        for response in cases:
+            with self.subTest(response=response):
+                response = middleware.process_response(request, response)
+                self.assertEqual(response.content, b"a" * 4096)
+        response = middleware.process_response(
+            request, HttpResponse(b"a" * 4096, content_type="image/svg+xml")
+        )
+        self.assertEqual(response["Content-Encoding"], "gzip")
+
+    def test_streaming_export(self):
+        path = f"/api/projects/{self.project.id}/export/ndjson/"
+        plain = b"".join(self.get(path, "identity").streaming_content)
+        response = self.get(path)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertNotIn("Content-Length", response)
+        content = b"".join(response.streaming_content)
+        self.assertEqual(gzip.decompress(content), plain)
+
+    def test_async_streaming(self):
+        async def chunks():
+            for i in range(100):
+                yield f"line {i}\n".encode()
+
+        middleware = compression.CompressionMiddleware(lambda request: None)
+        request = RequestFactory().get("/", headers={"Accept-Encoding": "gzip"})
+        response = middleware.process_response(
+            request, StreamingHttpResponse(chunks(), content_type="text/plain")
+        )
+        self.assertTrue(response.is_async)
+
+        async def collect():
+            return b"".join([chunk async for chunk in response.streaming_content])
+
+        self.assertEqual(
+            gzip.decompress(async_to_sync(collect)()),
+            "".join(f"line {i}\n" for i in range(100)).encode(),
+        )
+
+
+@override_settings(DATABASE_REPLICAS=["default"])
+class ReplicaRoutingTests(APIFixtureMixin, APITestCase):
+    """
+    The test database has no replica, so "default" stands in for one: reads
+    routed to it show up as "default", reads left on the primary as None.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = cls.make_user("owner")
+        cls.project = cls.make_project(cls.user)
+        cls.tasks = cls.make_tasks(cls.project, 2, assigned_to=cls.user)
+
+    def setUp(self):
+        get_cache().clear()
+        self.client.force_authenticate(self.user)
+        self.routed = []
+        db_for_read = routers.PrimaryReplicaRouter.db_for_read
+
+        def record(router, model, **hints):
+            alias = db_for_read(router, model, **hints)
+            self.routed.append(alias)
+            return alias
+
+        patcher = mock.patch.object(
+            routers.PrimaryReplicaRouter, "db_for_read", record
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def routed_reads(self, method, path, **kwargs):
+        self.routed.clear()
+        response = getattr(self.client, method)(path, **kwargs)
+        self.assertLess(response.status_code, 400, getattr(response, "data", None))
+        return set(self.routed)
+
+    def test_router(self):
+        router = routers.PrimaryReplicaRouter()
+        with override_settings(DATABASE_REPLICAS=["replica_1"]):
+            self.assertIsNone(router.db_for_read(Tasks))
+            with routers.replica_reads("replica_1"):
+                self.assertEqual(router.db_for_read(Tasks), "replica_1")
+                self.assertEqual(router.db_for_write(Tasks), "default")
+            self.assertIsNone(router.db_for_read(Tasks))
+            self.assertFalse(router.allow_migrate("replica_1", "api"))
+            self.assertIsNone(router.allow_migrate("default", "api"))
+
+    def test_reads_and_writes(self):
+        list_path = f"/api/projects/{self.project.id}/tasks/"
+        self.assertEqual(self.routed_reads("get", list_path), {"default"})
+        detail_path = f"/api/tasks/{self.tasks[0].id}/"
+        with override_settings(
+            API_RESPONSE_CACHE={**settings.API_RESPONSE_CACHE, "ENABLED": False}
+        ):
+            self.assertEqual(self.routed_reads("get", detail_path), {"default"})
+        # The response cache is filled from the primary
+        self.assertNotIn("default", self.routed_reads("get", detail_path))
+        # Other actions stay on the primary
+        self.assertEqual(
+            self.routed_reads("get", f"/api/projects/{self.project.id}/stats/"),
+            {None},
+        )
+        self.assertNotIn(
+            "default",
+            self.routed_reads(
+                "patch", f"/api/tasks/{self.tasks[0].id}/", data={"title": "Renamed"}
+            ),
+        )
+
+    def test_read_your_writes(self):
+        other = self.make_user("other")
+        list_path = f"/api/projects/{self.project.id}/tasks/"
+        self.routed_reads(
+            "patch", f"/api/tasks/{self.tasks[0].id}/", data={"title": "Renamed"}
+        )
+        self.assertEqual(self.routed_reads("get", list_path), {None})
+        self.assertIsNone(routers.choose_replica(self.user))
+        self.assertEqual(routers.choose_replica(other), "default")
+
+        get_cache().delete(routers.sticky_key(self.user.pk))
+        self.assertEqual(self.routed_reads("get", list_path), {"default"})
+
+        # Failed writes do not pin
+        self.client.patch(f"/api/tasks/{self.tasks[0].id}/", data={"status": "?"})
+        self.assertEqual(routers.choose_replica(self.user), "default")
+
+    def test_async_views(self):
+        request = AsyncRequestFactory().get(
+            f"/api/projects/{self.project.id}/tasks/",
+            headers={"Authorization": f"Bearer {AccessToken.for_user(self.user)}"},
+        )
+        self.routed.clear()
+        response = async_to_sync(async_views.task_list)(
+            request, project_id=self.project.id
+        )
+        self.assertEqual(response.status_code, 200)
+        # Authentication reads the primary, the view the replica
+        self.assertIn("default", self.routed)
+
+
+@skipUnless(
+    connection.vendor == "sqlite"
+    and connection.settings_dict["OPTIONS"].get("transaction_mode"),
+    "Tuned SQLite settings",
+)
+class SQLiteTuningTests(TestCase):
+    """
+    The test database lives in memory, so these use an on-disk copy of its
+    settings under the "tuned" alias (with a plain `unittest.TestCase`, as
+    Django's test cases only allow the configured aliases).
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        connections.settings["tuned"] = {
+            **connection.settings_dict,
+            "NAME": f"{directory.name}/db.sqlite3",
+        }
+        self.addCleanup(connections.settings.pop, "tuned")
+        self.addCleanup(connections.__delitem__, "tuned")
+        self.addCleanup(connections["tuned"].close)
+
+    def test_tuned_connections(self):
+        with connections["tuned"].cursor() as cursor:
+            pragmas = {
+                name: cursor.execute(f"PRAGMA {name}").fetchone()[0]
+                for name in ("journal_mode", "synchronous", "mmap_size", "cache_size")
+            }
+        self.assertEqual(
+            pragmas,
+            {
+                "journal_mode": "wal",
+                "synchronous": 1,  # NORMAL
+                "mmap_size": 268435456,
+                "cache_size": -65536,
+            },
+        )
+        self.assertEqual(connections["tuned"].transaction_mode, "IMMEDIATE")
+
+    def test_transactions_wait_for_the_write_lock(self):
+        with connections["tuned"].cursor() as cursor:
+            cursor.execute("CREATE TABLE counter (value integer)")
+            cursor.execute("INSERT INTO counter VALUES (0)")
+
+        def increment(hold):
+            try:
+                with transaction.atomic(using="tuned"):
+                    with connections["tuned"].cursor() as cursor:
+                        cursor.execute("SELECT value FROM counter")
+                        (value,) = cursor.fetchone()
+                        time.sleep(hold)
+                        cursor.execute("UPDATE counter SET value = %s", [value + 1])
+            finally:
+                connections["tuned"].close()
+
+        # Both read before writing: deferred transactions would fail with
+        # "database is locked" or lose an update
+        thread = threading.Thread(target=increment, args=(0.2,))
+        thread.start()
+        time.sleep(0.05)
+        increment(0)
+        thread.join()
+        with connections["tuned"].cursor() as cursor:
+            cursor.execute("SELECT value FROM counter")
+            self.assertEqual(cursor.fetchone()[0], 2)
+
+
+@override_settings(API_METRICS={"ENABLED": True, "TOKEN": "secret"})
+class MetricsTests(APIFixtureMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = cls.make_user("owner")
+        cls.project = cls.make_project(cls.user)
+        cls.tasks = cls.make_tasks(cls.project, 3, assigned_to=cls.user)
+
+    def setUp(self):
+        metrics.registry.reset()
+        self.client.force_authenticate(self.user)
+
+    def scrape(self):
+        response = self.client.get(
+            "/metrics", headers={"Authorization": "Bearer secret"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        lines = response.content.decode().splitlines()
+        return {
+            name: float(value)
+            for name, value in (line.rsplit(" ", 1) for line in lines)
+            if not name.startswith("#")
+        }
+
+    def test_records_views(self):
+        list_path = f"/api/projects/{self.project.id}/tasks/"
+        for _ in range(2):
+            self.client.get(list_path)
+        self.client.get(f"/api/tasks/{self.tasks[0].id}/")
+        self.client.get("/api/tasks/0/")
+        samples = self.scrape()
+
+        labels = 'view="TaskViewSet.list",method="GET"'
+        self.assertEqual(samples[f'api_requests_total{{{labels},status="200"}}'], 2)
+        retrieve = 'view="TaskViewSet.retrieve",method="GET"'
+        self.assertEqual(samples[f'api_requests_total{{{retrieve},status="404"}}'], 1)
+        self.assertEqual(samples[f"api_request_duration_seconds_count{{{labels}}}"], 2)
+        self.assertEqual(
+            samples[f'api_request_duration_seconds_bucket{{{labels},le="+Inf"}}'], 2
+        )
+        self.assertGreater(samples[f"api_request_queries_sum{{{labels}}}"], 0)
+        self.assertEqual(samples[f'api_request_queries_bucket{{{labels},le="0"}}'], 0)
+        self.assertGreater(samples[f"api_request_db_seconds_sum{{{labels}}}"], 0)
+        self.assertGreater(samples[f"api_request_serialize_seconds_sum{{{labels}}}"], 0)
+        self.assertGreater(
+            samples[f"api_request_serialize_seconds_sum{{{retrieve}}}"], 0
+        )
+        self.assertGreater(samples[f"api_request_render_seconds_sum{{{labels}}}"], 0)
+        size = len(self.client.get(list_path).content)
+        self.assertEqual(samples[f"api_response_size_bytes_sum{{{labels}}}"], 2 * size)
+
+    def test_async_requests(self):
+        client = AsyncClient()
+        token = AccessToken.for_user(self.user)
+        response = async_to_sync(client.get)(
+            f"/api/projects/{self.project.id}/tasks/",
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        self.assertEqual(response.status_code, 200)
+        labels = 'view="TaskViewSet.list",method="GET"'
+        samples = self.scrape()
+        self.assertEqual(samples[f"api_request_queries_count{{{labels}}}"], 1)
+        self.assertGreater(samples[f"api_request_queries_sum{{{labels}}}"], 0)
+
+    def test_response_cache_counters(self):
+        get_cache().clear()
+        reset_cache_stats()
+        for _ in range(3):
+            self.client.get(f"/api/tasks/{self.tasks[0].id}/")
+        samples = self.scrape()
+        self.assertEqual(samples["api_response_cache_hits_total"], 2)
+        self.assertEqual(samples["api_response_cache_misses_total"], 1)
+
+    def test_view_names(self):
+        request = RequestFactory().get("/")
+        request.resolver_match = ResolverMatch(async_views.task_list, (), {})
+        self.assertEqual(metrics.view_name(request), "TaskViewSet.list")
+        request.resolver_match = resolve("/metrics")
+        self.assertEqual(metrics.view_name(request), "api.metrics.metrics_view")
+        request.resolver_match = None
+        self.assertEqual(metrics.view_name(request), "unresolved")
+        self.assertEqual(
+            metrics.format_labels(view='a"b\\c'), 'view="a\\"b\\\\c"'
+        )
+
+    def test_unknown_methods_share_a_label(self):
+        for method in ["BREW", "PROPFIND"]:
+            self.client.generic(method, f"/api/tasks/{self.tasks[0].id}/")
+        samples = self.scrape()
+        other = [name for name in samples if 'method="other"' in name]
+        self.assertTrue(other)
+        self.assertFalse([name for name in samples if "BREW" in name])
+
+    def test_token_and_disabling(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 401)
+        with override_settings(API_METRICS={"ENABLED": True, "TOKEN": ""}):
+            self.assertEqual(self.client.get("/metrics").status_code, 403)
+            with override_settings(DEBUG=True):
+                self.assertEqual(self.client.get("/metrics").status_code, 200)
+        metrics.registry.reset()
+        with override_settings(API_METRICS={"ENABLED": False, "TOKEN": ""}):
+            self.client.get(f"/api/tasks/{self.tasks[0].id}/")
+        self.assertEqual(metrics.registry.requests, {})
+
+
+class QueryWatchTests(APIFixtureMixin, APITestCase):
+    """
+    No endpoint of api/views.py runs a statement once per row, or a slow one.
+    """
+
+    ROWS = 6  # Over REPEAT_THRESHOLD, so an N+1 on any of them shows
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = cls.make_user("owner")
+        cls.project = cls.make_project(cls.user)
+        cls.users = [cls.make_user(f"user{i}") for i in range(cls.ROWS)]
+        cls.tasks = []
+        for user in cls.users:
+            ProjectMembers.objects.create(project=cls.project, user=user, role="Admin")
+            task = cls.make_tasks(cls.project, 1, assigned_to=user)[0]
+            cls.tasks.append(task)
+            for commenter in cls.users:
+                cls.make_comments(task, commenter, 1)
+            cls.make_projects_for(user)
+        cls.members = list(ProjectMembers.objects.filter(project=cls.project))
+
+    @classmethod
+    def make_projects_for(cls, user):
+        project = cls.make_project(user, f"{user.username}'s project")
+        ProjectMembers.objects.create(project=project, user=cls.user, role="Member")
+
+    def setUp(self):
+        get_cache().clear()
+        self.client.force_authenticate(self.user)
+
+    def endpoints(self):
+        project, task = self.project, self.tasks[0]
+        comment = task.comments.first()
+        member = next(m for m in self.members if m.user_id != self.user.id)
+        other = self.make_user("other")
+        # Deleted with `other`
+        other_task = self.make_tasks(self.make_project(other, "Other's project"), 1)
+        self.make_comments(other_task[0], other, self.ROWS)
+        user = {"password": "pass-123", "first_name": "New", "last_name": "User"}
+        register = {**user, "username": "new", "email": "new@example.com"}
+        login = {"email": "owner@example.com", "password": "secret-pass-123"}
+        user = {**user, "username": "other", "email": "other@example.com"}
+        new_member = {"project": project.id, "user": other.id, "role": "Member"}
+        due = (timezone.now() + timedelta(days=3)).isoformat()
+        new_tasks = [
+            {"title": f"New {i}", "description": "New", "due_date": due}
+            for i in range(self.ROWS)
+        ]
+        done = [{"id": t.id, "status": "Done"} for t in self.tasks]
+        task_ids = [t.id for t in self.tasks[1:]]
+        project_url = f"/api/projects/{project.id}"
+        return [
+            ("post", "/api/users/register/", register),
+            ("post", "/api/users/login/", login),
+            ("get", f"/api/users/{self.user.id}/", None),
+            ("put", f"/api/users/{other.id}/", user),
+            ("patch", f"/api/users/{other.id}/", {"first_name": "Other"}),
+            ("get", "/api/projects/", None),
+            ("post", "/api/projects/", {"name": "New", "description": "New"}),
+            ("get", f"{project_url}/", None),
+            ("put", f"{project_url}/", {"name": "P", "description": "P"}),
+            ("patch", f"{project_url}/", {"description": "Changed"}),
+            ("get", f"{project_url}/changes/", None),
+            ("get", f"{project_url}/changes/?since=0", None),
+            ("get", f"{project_url}/stats/", None),
+            ("get", f"{project_url}/search/?q=task", None),
+            ("get", f"{project_url}/export/ndjson/", None),
+            ("get", f"{project_url}/export/csv/", None),
+            ("get", f"{project_url}/members/", None),
+            ("post", f"{project_url}/members/", new_member),
+            ("get", f"/api/members/{member.id}/", None),
+            ("put", f"/api/members/{member.id}/", {"role": "Admin"}),
+            ("patch", f"/api/members/{member.id}/", {"role": "Member"}),
+            ("get", f"{project_url}/tasks/", None),
+            ("post", f"{project_url}/tasks/", new_tasks[0]),
+            ("post", f"{project_url}/tasks/bulk/", new_tasks),
+            ("patch", f"{project_url}/tasks/bulk/", done),
+            ("get", f"/api/tasks/{task.id}/", None),
+            ("put", f"/api/tasks/{task.id}/", {"title": "Changed"}),
+            ("patch", f"/api/tasks/{task.id}/", {"priority": "High"}),
+            ("get", f"/api/tasks/{task.id}/comments/", None),
+            ("post", f"/api/tasks/{task.id}/comments/", {"content": "New"}),
+            ("get", f"/api/comments/{comment.id}/", None),
+            ("put", f"/api/comments/{comment.id}/", {"content": "Changed"}),
+            ("delete", f"/api/comments/{comment.id}/", None),
+            ("delete", f"/api/tasks/{task.id}/", None),
+            ("delete", f"{project_url}/tasks/bulk/", task_ids),
+            ("delete", f"/api/members/{member.id}/", None),
+            ("delete", f"{project_url}/", None),
+            ("delete", f"/api/users/{other.id}/", None),
+        ]
+
+    def view_actions(self, patterns=None):
+        """`Class.action` of every route to a viewset of api/views.py."""
+        actions = set()
+        for pattern in patterns or get_resolver().url_patterns:
+            if hasattr(pattern, "url_patterns"):
+                actions |= self.view_actions(pattern.url_patterns)
+                continue
+            cls = getattr(pattern.callback, "cls", None)
+            if cls is not None and cls.__module__ == "api.views":
+                for action in pattern.callback.actions.values():
+                    # CommentViewSet has no partial_update
+                    if hasattr(cls, action):
+                        actions.add(f"{cls.__name__}.{action}")
+        return actions
+
+    def test_endpoints(self):
+        covered = set()
+        for method, url, data in self.endpoints():
+            with self.subTest(method=method, url=url):
+                with assert_no_query_problems():
+                    response = getattr(self.client, method)(url, data, format="json")
+                    if response.streaming:
+                        b"".join(response.streaming_content)
+                self.assertLess(
+                    response.status_code, 400, getattr(response, "data", None)
+                )
+                match = resolve(url.split("?")[0])
+                covered.add(f"{match.func.cls.__name__}.{match.func.actions[method]}")
+        self.assertEqual(covered, self.view_actions())
+
+    def test_reports_n_plus_one(self):
+        with watch_queries() as report:
+            # Without `optimize_queryset()`, each task loads its relations
+            data = TaskSerializer(
+                Tasks.objects.filter(project=self.project), many=True
+            ).data
+        self.assertEqual(len(data), self.ROWS)
+        problems = report.problems
+        # Assignees and project owners share a statement
+        self.assertEqual(
+            sorted(problem.count for problem in problems), [self.ROWS, 2 * self.ROWS]
+        )
+        self.assertEqual(
+            {tuple(problem.serializers) for problem in problems},
+            {
+                ("TaskSerializer", "UserSerializer"),
+                ("TaskSerializer", "ProjectSerializer"),
+            },
+        )
+        for problem in problems:
+            self.assertEqual(problem.kind, "repeated")
+            self.assertTrue(problem.sql.endswith('"id" = %s LIMIT ?'), problem.sql)
+            self.assertRegex(problem.location, r"^api/tests\.py:\d+ in test_")
+            self.assertIsNone(problem.view)
+        with self.assertRaisesMessage(AssertionError, "N+1 query, run 6 times"):
+            with assert_no_query_problems():
+                TaskSerializer(Tasks.objects.all(), many=True).data
+
+    def test_logs_requests(self):
+        options = {"ENABLED": True, "REPEAT_THRESHOLD": 5, "SLOW_QUERY_MS": 0}
+        with override_settings(API_QUERY_WATCH=options):
+            with self.assertLogs("api.queries", "WARNING") as logs:
+                self.client.get(f"/api/projects/{self.project.id}/tasks/")
+        self.assertTrue(logs.output)
+        for line in logs.output:
+            self.assertIn(
+                f"GET /api/projects/{self.project.id}/tasks/: Slow query", line
+            )
+            self.assertIn("in TaskViewSet.list", line)
+            self.assertRegex(line, r", at api/[a-z_]+\.py:\d+ in \w+: ")
+
+        with override_settings(API_QUERY_WATCH={**options, "ENABLED": False}):
+            with self.assertNoLogs("api.queries"):
+                self.client.get(f"/api/projects/{self.project.id}/tasks/")
+
+    def test_slow_queries(self):
+        with watch_queries(slow_query_ms=0) as report:
+            list(Tasks.objects.filter(project=self.project))
+        [problem] = report.problems
+        self.assertEqual(problem.kind, "slow")
+        self.assertIn("%s", problem.sql)
+        self.assertGreater(problem.duration, 0)
+        self.assertTrue(problem.describe().startswith("Slow query, "))
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            querywatch.fingerprint(
+                "SELECT *  FROM t WHERE a = %s AND b IN (%s, %s, %s) AND c = 'x''y'"
+                " AND d = 12 AND e1 = 1.5"
+            ),
+            "SELECT * FROM t WHERE a = %s AND b IN (...) AND c = ? AND d = ?"
+            " AND e1 = ?",
+        )
+        self.assertEqual(
+            querywatch.fingerprint("SELECT * FROM t WHERE id IN (1, 2)"),
+            querywatch.fingerprint("SELECT * FROM t WHERE id IN (3)"),
+        )
+
+
+class ImportFixtureMixin:
+    """
+    Writes import inputs to a temporary directory.
+    """
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def write_ndjson(self, name, records):
+        path = f"{self.directory}/{name}.ndjson"
+        with open(path, "w") as file:
+            file.writelines(json.dumps(record) + "\n" for record in records)
+        return path
+
+    def write_csv(self, name, records):
+        path = f"{self.directory}/{name}.csv"
+        with open(path, "w", newline="") as file:
+            writer = csv.DictWriter(file, list(records[0]))
+            writer.writeheader()
+            writer.writerows(records)
+        return path
+
+    def write_inputs(self, comments=3):
+        created_at = "2020-01-02T03:04:05Z"
+        return {
+            "users": self.write_ndjson(
+                "users",
+                [
+                    {
+                        "id": 10 + i,
+                        "username": f"imported{i}",
+                        "email": f"imported{i}@example.com",
+                        "password": make_password("secret-pass-123") if i else None,
+                    }
+                    for i in range(3)
+                ],
+            ),
+            "projects": self.write_csv(
+                "projects",
+                [
+                    {
+                        "id": "p1",
+                        "name": "Imported",
+                        "description": "",
+                        "owner": 10,
+                        "created_at": created_at,
+                    }
+                ],
+            ),
+            "members": self.write_ndjson(
+                "members",
+                [
+                    {"project": "p1", "user": 10, "role": "Member"},
+                    {"project": "p1", "user": 11, "role": "Member"},
+                ],
+            ),
+            "tasks": self.write_csv(
+                "tasks",
+                [
+                    {
+                        "id": 100 + i,
+                        "project": "p1",
+                        "assigned_to": 11 if i else "",
+                        "title": f"Imported task {i}",
+                        "description": "Migrated from the old tracker",
+                        "status": "Done" if i else "To Do",
+                        "priority": "High",
+                        "due_date": "2030-01-01T00:00:00",
+                        "created_at": created_at,
+                    }
+                    for i in range(2)
+                ],
+            ),
+            "comments": self.write_ndjson(
+                "comments",
+                [
+                    {"task": 100 + i % 2, "user": 12, "content": f"Legacy note {i}"}
+                    for i in range(comments)
+                ],
+            ),
+        }
+
+    def import_data(self, *args, **options):
+        output = StringIO()
+        call_command("import_data", *args, stdout=output, **options)
+        return output.getvalue()
+
+
+class ImportTests(ImportFixtureMixin, APITestCase):
+    def test_import(self):
+        output = self.import_data(**self.write_inputs(), batch_size=2)
+        self.assertIn("comments: done, 3 rows (", output)
+        self.assertIn("rows/s)", output)
+
+        owner, assignee, commenter = Users.objects.order_by("id")
+        self.assertFalse(owner.has_usable_password())
+        self.assertTrue(assignee.check_password("secret-pass-123"))
+        project = Projects.objects.get()
+        self.assertEqual(project.owner, owner)
+        self.assertEqual(project.created_at.isoformat(), "2020-01-02T03:04:05+00:00")
+        # The owner's membership is upgraded to Admin, as the signal would
+        self.assertEqual(
+            dict(project.members.values_list("user_id", "role")),
+            {owner.id: "Admin", assignee.id: "Member"},
+        )
+        tasks = list(project.tasks.order_by("title"))
+        self.assertEqual([task.assigned_to for task in tasks], [None, assignee])
+        self.assertEqual(tasks[0].created_at, project.created_at)
+        self.assertTrue(timezone.is_aware(tasks[0].due_date))
+        self.assertEqual(
+            sorted(Comments.objects.values_list("task_id", "user_id")),
+            [(tasks[0].id, commenter.id)] * 2 + [(tasks[1].id, commenter.id)],
+        )
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+        self.client.force_authenticate(owner)
+        response = self.client.get(
+            f"/api/projects/{project.id}/search/", {"q": "legacy"}
+        )
+        self.assertEqual(len(response.data["results"]), 3)
+
+    @override_settings(API_PROJECT_STATS={"SUMMARY": True})
+    def test_rebuilds_summary(self):
+        self.import_data(**self.write_inputs())
+        project = Projects.objects.get()
+        self.assertEqual(
+            summarized_project_stats(project.id), compute_project_stats(project.id)
+        )
+
+    def test_resume(self):
+        inputs = self.write_inputs(comments=5)
+        with open(inputs["comments"], "a") as file:
+            file.write(json.dumps({"task": 999, "user": 12, "content": "Bad"}) + "\n")
+        with self.assertRaisesMessage(CommandError, "comments record 6: unknown task"):
+            self.import_data(**inputs, job="migration", batch_size=2)
+        # Whole batches only
+        self.assertEqual(Comments.objects.count(), 4)
+
+        with open(inputs["comments"]) as file:
+            lines = file.readlines()
+        with open(inputs["comments"], "w") as file:
+            file.writelines(lines[:-1])
+        output = self.import_data(**inputs, job="migration", batch_size=2)
+        self.assertIn("users: resuming after 3 records", output)
+        self.assertEqual(Users.objects.count(), 3)
+        self.assertEqual(Tasks.objects.count(), 2)
+        self.assertEqual(ProjectMembers.objects.count(), 2)
+        self.assertEqual(Comments.objects.count(), 5)
+        self.assertEqual(
+            set(Comments.objects.values_list("task__project", flat=True)),
+            {Projects.objects.get().id},
+        )
+
+    def test_invalid_records(self):
+        inputs = self.write_inputs()
+        path = self.write_ndjson(
+            "tasks", [{"id": 1, "project": "p1", "title": "x", "status": "Later"}]
+        )
+        with self.assertRaisesMessage(CommandError, "tasks record 1: Value 'Later'"):
+            self.import_data(**{**inputs, "tasks": path})
+
+
+class DeferredIndexImportTests(ImportFixtureMixin, TransactionTestCase):
+    def test_defer_indexes(self):
+        output = self.import_data(**self.write_inputs(), defer_indexes=True)
+        self.assertIn("indexes: restored", output)
+        with connection.cursor() as cursor:
+            indexes = connection.introspection.get_constraints(cursor, "api_tasks")
+        self.assertIn("tasks_open_due_idx", indexes)
+        self.assertEqual(
+            len(search_project(Projects.objects.get().id, "legacy", limit=10)), 3
+        )
 
-# Create your tests here.
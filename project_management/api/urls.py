@@ -1,6 +1,8 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework.routers import DefaultRouter
+from .metrics import metrics_view
 from .views import (
     UserViewSet,
     ProjectViewSet,
@@ -25,6 +27,7 @@ router.register(r"comments", CommentViewSet, basename="comments")  # Add Comment
 # URL patterns
 urlpatterns = [
     path("api/", include(router.urls)),
+    path("metrics", metrics_view, name="metrics"),
     # JWT token endpoints
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
@@ -34,6 +37,13 @@ urlpatterns = [
         TaskViewSet.as_view({"get": "list", "post": "create"}),
         name="project-tasks",
     ),
+    path(
+        "api/projects/<int:project_id>/tasks/bulk/",
+        TaskViewSet.as_view(
+            {"post": "bulk_create", "patch": "bulk_update", "delete": "bulk_destroy"}
+        ),
+        name="project-tasks-bulk",
+    ),
     path(
         "api/tasks/<int:pk>/",
         TaskViewSet.as_view(
@@ -65,3 +75,17 @@ urlpatterns = [
     ),
     
 ]
+
+# Async read path (ASGI): GET on these routes runs on the event loop, other
+# methods are handed to the viewsets above. Must precede the router routes.
+if settings.API_ASYNC_READS:
+    from . import async_views
+
+    urlpatterns = [
+        path("api/projects/", async_views.project_list),
+        path("api/projects/<int:pk>/", async_views.project_detail),
+        path("api/projects/<int:project_id>/tasks/", async_views.task_list),
+        path("api/tasks/<int:pk>/", async_views.task_detail),
+        path("api/tasks/<int:task_id>/comments/", async_views.comment_list),
+        path("api/comments/<int:pk>/", async_views.comment_detail),
+    ] + urlpatterns
@@ -1,11 +1,49 @@
+from collections import defaultdict
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from re import M
-from rest_framework import viewsets, status
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from rest_framework import serializers, viewsets, status
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from .cache import bump_versions, cached_retrieve
+from .changes import (
+    changes_since,
+    current_token,
+    get_project_id,
+    record_changes,
+    record_moves,
+    remember_project,
+)
+from .conditional import CollectionValidators
+from .export import CONTENT_TYPES, aiterate, export_project
+from .filters import TaskFilterSerializer
+from .hashers import VerificationBusy, verify_password
+from .lean import serialize_page
 from .models import Users, Projects, ProjectMembers, Tasks, Comments
+from .pagination import (
+    ProjectCursorPagination,
+    MemberCursorPagination,
+    TaskCursorPagination,
+    CommentCursorPagination,
+    SearchPagination,
+)
+from .permissions import (
+    ADMIN,
+    check_project_role,
+    filter_visible,
+    invalidate_project_roles,
+)
+from .querysets import optimize_queryset
+from .realtime import publish_event, publish_roles_changed
+from .routers import ReplicaReadsMixin
+from .search import search_project, search_terms
+from .stats import project_stats, record_task_changes, task_bucket
 from .serializers import (
     RegisterUserSerializer,
     UserSerializer,
@@ -17,11 +55,29 @@ from .serializers import (
     TaskCreateUpdateSerializer,
     CommentSerializer,
     CommentCreateUpdateSerializer,
+    bulk_item_pk,
 )
 
 
+def check_target_project(request, attrs):
+    """
+    A task moved to another project must be moved to one of the user's.
+    """
+    if "project" in attrs:
+        check_project_role(request, attrs["project"].pk)
+
+
+def publish_move(previous_project_id, project_id, model, pk):
+    """
+    Tell the subscribers of the project an object was moved out of that it
+    is gone from there.
+    """
+    if previous_project_id != project_id:
+        publish_event(previous_project_id, model, "deleted", [{"id": pk}])
+
+
 # Users ViewSet
-class UserViewSet(viewsets.ViewSet):
+class UserViewSet(ReplicaReadsMixin, viewsets.ViewSet):
     permission_classes = [AllowAny]
 
     @action(detail=False, methods=["post"])
@@ -38,27 +94,31 @@ class UserViewSet(viewsets.ViewSet):
         """POST /api/users/login/"""
         email = request.data.get("email")
         password = request.data.get("password")
+        # Unknown emails are checked against a dummy hash and get the same
+        # response as a wrong password, so neither reveals which emails exist
+        user = Users.objects.filter(email=email).first() if email else None
         try:
-            user = Users.objects.get(email=email)
-            if not user.check_password(password):
+            if not verify_password(user, password):
                 raise ValueError("Invalid credentials")
             refresh = RefreshToken.for_user(user)
             return Response(
                 {"refresh": str(refresh), "access": str(refresh.access_token)},
                 status=status.HTTP_200_OK,
             )
-        except Users.DoesNotExist:
-            return Response(
-                {"detail": "User not found"}, status=status.HTTP_404_NOT_FOUND
-            )
         except ValueError:
             return Response(
                 {"detail": "Invalid credentials"}, status=status.HTTP_400_BAD_REQUEST
             )
+        except (VerificationBusy, FutureTimeoutError):
+            return Response(
+                {"detail": "Too many login attempts, try again shortly"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": "1"},
+            )
 
     def retrieve(self, request, pk=None):
         """GET /api/users/{id}/"""
-        user = Users.objects.filter(pk=pk).first()
+        user = optimize_queryset(Users.objects.filter(pk=pk), UserSerializer).first()
         if user:
             serializer = UserSerializer(user)
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -108,7 +168,7 @@ class UserViewSet(viewsets.ViewSet):
 
 
 # Projects ViewSet
-class ProjectViewSet(viewsets.ModelViewSet):
+class ProjectViewSet(ReplicaReadsMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing Projects.
     Supports list, create, retrieve, update, and delete.
@@ -116,6 +176,111 @@ class ProjectViewSet(viewsets.ModelViewSet):
 
     queryset = Projects.objects.all()
     permission_classes = [IsAuthenticated]
+    pagination_class = ProjectCursorPagination
+
+    def get_queryset(self):
+        """
+        Only the user's projects. Every response is rendered with
+        `ProjectSerializer`, so always join the owner.
+        """
+        projects = filter_visible(super().get_queryset(), self.request.user, "id")
+        return optimize_queryset(projects, ProjectSerializer)
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        GET /api/projects/{id}/, served from the response cache when fresh.
+        """
+        check_project_role(request, kwargs["pk"])
+        data = cached_retrieve(
+            ProjectSerializer,
+            optimize_queryset(Projects.objects.all(), ProjectSerializer),
+            kwargs["pk"],
+        )
+        if data is not None:
+            return Response(data, status=status.HTTP_200_OK)
+        return Response(
+            {"detail": "Project not found"}, status=status.HTTP_404_NOT_FOUND
+        )
+
+    @action(detail=True, methods=["get"])
+    def changes(self, request, pk=None):
+        """
+        GET /api/projects/{id}/changes/?since=<token>
+
+        Tasks, comments and members created, updated or deleted since
+        `since`. Without `since`, returns no changes and the current token,
+        to start syncing after a full listing.
+        """
+        project = self.get_object()
+        since = request.query_params.get("since")
+        if since is None:
+            return Response(
+                {"since": str(current_token(project.id)), "has_more": False},
+                status=status.HTTP_200_OK,
+            )
+        if not since.isdigit():
+            return Response(
+                {"since": ["Invalid token."]}, status=status.HTTP_400_BAD_REQUEST
+            )
+        data = changes_since(project.id, int(since))
+        return Response(data, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=["get"])
+    def stats(self, request, pk=None):
+        """
+        GET /api/projects/{id}/stats/
+
+        Task counts by status, priority and assignee, overdue tasks and the
+        comment count, aggregated in the database.
+        """
+        check_project_role(request, pk)
+        return Response(project_stats(int(pk)), status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=["get"])
+    def search(self, request, pk=None):
+        """
+        GET /api/projects/{id}/search/?q=<words>
+
+        Tasks and comments of the project that contain every word of `q`,
+        best matches first, from the full-text index (see `search.py`).
+        """
+        check_project_role(request, pk)
+        query = request.query_params.get("q", "")
+        if not search_terms(query):
+            return Response(
+                {"q": ["This field is required."]}, status=status.HTTP_400_BAD_REQUEST
+            )
+        paginator = SearchPagination()
+        hits = paginator.paginate_search(
+            lambda limit, offset: search_project(int(pk), query, limit, offset),
+            request,
+        )
+        return paginator.get_paginated_response(hits)
+
+    @action(
+        detail=True,
+        methods=["get"],
+        url_path=r"export/(?P<export_format>ndjson|csv)",
+    )
+    def export(self, request, pk=None, export_format=None):
+        """
+        GET /api/projects/{id}/export/ndjson/
+        GET /api/projects/{id}/export/csv/
+
+        Every task of the project followed by its comments, streamed (see
+        `export.py`).
+        """
+        check_project_role(request, pk)
+        content = export_project(int(pk), export_format)
+        if isinstance(request._request, ASGIRequest):
+            content = aiterate(content)
+        response = StreamingHttpResponse(
+            content, content_type=CONTENT_TYPES[export_format]
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="project-{pk}.{export_format}"'
+        )
+        return response
 
     def get_serializer_class(self):
         """
@@ -152,6 +317,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
         """
         Override PUT for full updates.
         """
+        check_project_role(request, kwargs["pk"], ADMIN)
         instance = self.get_object()
         serializer = self.get_serializer(instance, data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -165,6 +331,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
         """
         Override PATCH for partial updates.
         """
+        check_project_role(request, kwargs["pk"], ADMIN)
         instance = self.get_object()
         serializer = self.get_serializer(instance, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
@@ -174,7 +341,12 @@ class ProjectViewSet(viewsets.ModelViewSet):
         output_serializer = ProjectSerializer(instance, context={"request": request})
         return Response(output_serializer.data, status=status.HTTP_200_OK)
 
-class ProjectMemberViewSet(viewsets.ViewSet):
+    def destroy(self, request, *args, **kwargs):
+        """DELETE /api/projects/{id}/"""
+        check_project_role(request, kwargs["pk"], ADMIN)
+        return super().destroy(request, *args, **kwargs)
+
+class ProjectMemberViewSet(ReplicaReadsMixin, viewsets.ViewSet):
     """
     ViewSet for managing Project Members.
     """
@@ -183,12 +355,19 @@ class ProjectMemberViewSet(viewsets.ViewSet):
 
     def list(self, request, project_id=None):
         """GET /api/projects/{project_id}/members/"""
-        members = ProjectMembers.objects.filter(project_id=project_id)
-        serializer = ProjectMemberSerializer(members, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        check_project_role(request, project_id)
+        paginator = MemberCursorPagination()
+        data = serialize_page(
+            paginator,
+            ProjectMembers.objects.filter(project_id=project_id),
+            ProjectMemberSerializer,
+            request,
+        )
+        return paginator.get_paginated_response(data)
 
     def create(self, request, project_id=None):
         """POST /api/projects/{project_id}/members/"""
+        check_project_role(request, project_id, ADMIN)
         serializer = ProjectMemberCreateSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save(project_id=project_id)
@@ -197,23 +376,39 @@ class ProjectMemberViewSet(viewsets.ViewSet):
 
     def retrieve(self, request, pk=None):
         """GET /api/members/{id}/"""
-        member = ProjectMembers.objects.filter(pk=pk).first()
-        if member:
-            serializer = ProjectMemberSerializer(member)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+        data = cached_retrieve(
+            ProjectMemberSerializer,
+            optimize_queryset(ProjectMembers.objects.all(), ProjectMemberSerializer),
+            pk,
+        )
+        if data is not None:
+            check_project_role(request, data["project"], detail="Member not found")
+            return Response(data, status=status.HTTP_200_OK)
         return Response(
             {"detail": "Member not found"}, status=status.HTTP_404_NOT_FOUND
         )
 
+    def get_member(self, request, pk):
+        """
+        Load a membership the user administers. The owner's own Admin
+        membership cannot be changed, or the project would lose its owner.
+        """
+        member = ProjectMembers.objects.select_related("project").filter(pk=pk).first()
+        if member:
+            check_project_role(request, member.project_id, ADMIN, "Member not found")
+            if member.user_id == member.project.owner_id:
+                raise PermissionDenied("The project owner's membership cannot change")
+        return member
+
     def update(self, request, pk=None):
         """PUT /api/members/{id}/"""
-        member = ProjectMembers.objects.filter(pk=pk).first()
+        member = self.get_member(request, pk)
         if member:
             serializer = ProjectMemberCreateSerializer(
                 member, data=request.data, partial=True
             )
             if serializer.is_valid():
-                serializer.save()
+                self.save_member(request, serializer)
                 return Response(serializer.data, status=status.HTTP_200_OK)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         return Response(
@@ -224,20 +419,34 @@ class ProjectMemberViewSet(viewsets.ViewSet):
         """
         PATCH /api/members/{id}/
         """
-        member = ProjectMembers().objects.filter(pk=pk).first()
+        member = self.get_member(request, pk)
         if not member:
             return Response({"detail": "Member not found"}, status=status.HTTP_404_NOT_FOUND)
 
         serializer = ProjectMemberCreateSerializer(member, data=request.data, partial=True)
         if serializer.is_valid():
-            serializer.save()
+            self.save_member(request, serializer)
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def save_member(self, request, serializer):
+        """
+        Save a changed membership. Moving it to another project needs Admin
+        there too, and the user it is taken from loses the role.
+        """
+        previous_user_id = serializer.instance.user_id
+        project = serializer.validated_data.get("project")
+        if project is not None:
+            check_project_role(request, project.pk, ADMIN)
+        serializer.save()
+        if serializer.instance.user_id != previous_user_id:
+            invalidate_project_roles([previous_user_id])
+            transaction.on_commit(lambda: invalidate_project_roles([previous_user_id]))
+            transaction.on_commit(lambda: publish_roles_changed([previous_user_id]))
 
     def destroy(self, request, pk=None):
         """DELETE /api/members/{id}/"""
-        member = ProjectMembers.objects.filter(pk=pk).first()
+        member = self.get_member(request, pk)
         if member:
             member.delete()
             return Response(
@@ -248,45 +457,184 @@ class ProjectMemberViewSet(viewsets.ViewSet):
         )
 
 # Task ViewSet
-class TaskViewSet(viewsets.ViewSet):
+class TaskViewSet(ReplicaReadsMixin, viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
 
     def list(self, request, project_id=None):
-        """GET /api/projects/{project_id}/tasks/"""
-        tasks = Tasks.objects.filter(project_id=project_id)
-        serializer = TaskSerializer(tasks, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        """
+        GET /api/projects/{project_id}/tasks/
+
+        Supports `status`, `priority` (comma-separated), `assigned_to`,
+        `due_after`, `due_before`, `ordering` and sparse `fields`.
+        """
+        check_project_role(request, project_id)
+        params = TaskFilterSerializer(data=request.query_params)
+        if not params.is_valid():
+            return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        paginator = TaskCursorPagination()
+        paginator.ordering = params.get_ordering()
+        fields = params.get_sparse_fields()
+        tasks = params.filter_queryset(Tasks.objects.filter(project_id=project_id))
+
+        validators = CollectionValidators(request, tasks, TaskSerializer, fields)
+        not_modified = validators.not_modified_response()
+        if not_modified is not None:
+            return not_modified
+
+        data = serialize_page(
+            paginator,
+            tasks,
+            TaskSerializer,
+            request,
+            fields=fields,
+            extra_columns=[field.lstrip("-") for field in paginator.ordering],
+        )
+        return validators.apply(paginator.get_paginated_response(data))
 
     def create(self, request, project_id=None):
         """
         POST /api/projects/{project_id}/tasks/
         """
+        check_project_role(request, project_id)
         data = request.data.copy()  # Create a mutable copy of the request data
         data["project"] = project_id  # Set the project field from the URL parameter
         serializer = TaskCreateUpdateSerializer(data=data)
         if serializer.is_valid():
             serializer.save()
+            publish_event(project_id, "task", "created", [serializer.data])
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def bulk_create(self, request, project_id=None):
+        """
+        POST /api/projects/{project_id}/tasks/bulk/
+
+        Accepts a list of tasks. Either every task is created, or nothing is
+        and the response holds one error object per item (`{}` when valid).
+        """
+        check_project_role(request, project_id)
+        if not isinstance(request.data, list):
+            return Response(
+                {"detail": "Expected a list of tasks."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        data = [
+            {**item, "project": project_id} if isinstance(item, dict) else item
+            for item in request.data
+        ]
+        serializer = TaskCreateUpdateSerializer(data=data, many=True)
+        if serializer.is_valid():
+            with transaction.atomic():
+                serializer.save()
+                record_changes(Tasks, serializer.instance, "create")
+                record_task_changes({}, serializer.instance)
+                publish_event(project_id, "task", "created", serializer.data)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    def bulk_update(self, request, project_id=None):
+        """
+        PATCH /api/projects/{project_id}/tasks/bulk/
+
+        Accepts a list of partial tasks, each with its `id`.
+        """
+        check_project_role(request, project_id)
+        if not isinstance(request.data, list):
+            return Response(
+                {"detail": "Expected a list of tasks."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        ids = {bulk_item_pk(Tasks, item) for item in request.data} - {None}
+        with transaction.atomic():
+            tasks = (
+                Tasks.objects.select_for_update()
+                .filter(project_id=project_id)
+                .in_bulk(ids)
+            )
+            serializer = TaskCreateUpdateSerializer(
+                tasks, data=request.data, many=True, partial=True
+            )
+            if serializer.is_valid():
+                for attrs in serializer.validated_data:
+                    check_target_project(request, attrs)
+                before = {pk: task_bucket(task) for pk, task in tasks.items()}
+                serializer.save()
+                # bulk_update() bypasses post_save, so log and invalidate explicitly
+                record_changes(Tasks, serializer.instance, "update")
+                projects = {pk: bucket[0] for pk, bucket in before.items()}
+                record_moves(Tasks, projects, serializer.instance)
+                record_task_changes(before, serializer.instance)
+                pks = [task.pk for task in serializer.instance]
+                bump_versions(Tasks, pks)
+                transaction.on_commit(lambda: bump_versions(Tasks, pks))
+                by_project = defaultdict(list)
+                for item in serializer.data:
+                    by_project[item["project"]].append(item)
+                stayed = by_project.pop(int(project_id), [])
+                if stayed:
+                    publish_event(project_id, "task", "updated", stayed)
+                # Tasks moved elsewhere are updated there and gone from here
+                for target, items in by_project.items():
+                    publish_event(target, "task", "updated", items)
+                    deleted = [{"id": item["id"]} for item in items]
+                    publish_event(project_id, "task", "deleted", deleted)
+                return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    def bulk_destroy(self, request, project_id=None):
+        """
+        DELETE /api/projects/{project_id}/tasks/bulk/
+
+        Accepts a list of task ids.
+        """
+        check_project_role(request, project_id)
+        serializer = serializers.ListSerializer(
+            child=serializers.IntegerField(), data=request.data
+        )
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        ids = serializer.validated_data
+        with transaction.atomic():
+            tasks = Tasks.objects.filter(project_id=project_id, id__in=ids)
+            found = set(tasks.values_list("id", flat=True))
+            if len(found) != len(set(ids)):
+                errors = [{} if pk in found else {"id": ["Not found."]} for pk in ids]
+                return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+            tasks.delete()
+            publish_event(
+                project_id, "task", "deleted", [{"id": pk} for pk in sorted(found)]
+            )
+        return Response(
+            {"detail": f"{len(found)} tasks deleted"}, status=status.HTTP_204_NO_CONTENT
+        )
 
     def retrieve(self, request, pk=None):
         """GET /api/tasks/{id}/"""
-        task = Tasks.objects.filter(pk=pk).first()
-        if task:
-            serializer = TaskSerializer(task)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+        data = cached_retrieve(
+            TaskSerializer, optimize_queryset(Tasks.objects.all(), TaskSerializer), pk
+        )
+        if data is not None:
+            check_project_role(request, data["project"]["id"], detail="Task not found")
+            return Response(data, status=status.HTTP_200_OK)
         return Response({"detail": "Task not found"}, status=status.HTTP_404_NOT_FOUND)
 
     def update(self, request, pk=None):
         """PUT /api/tasks/{id}/"""
         task = Tasks.objects.filter(pk=pk).first()
         if task:
+            check_project_role(request, task.project_id, detail="Task not found")
             serializer = TaskCreateUpdateSerializer(
                 task, data=request.data, partial=True
             )
             if serializer.is_valid():
+                check_target_project(request, serializer.validated_data)
+                previous_project_id = task.project_id
+                remember_project(task)
                 serializer.save()
+                publish_event(task.project_id, "task", "updated", [serializer.data])
+                publish_move(previous_project_id, task.project_id, "task", task.id)
                 return Response(serializer.data, status=status.HTTP_200_OK)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         return Response({"detail": "Task not found"}, status=status.HTTP_404_NOT_FOUND)
@@ -298,10 +646,16 @@ class TaskViewSet(viewsets.ViewSet):
         task = Tasks.objects.filter(pk=pk).first()
         if not task:
             return Response({"detail": "Task not found"}, status=status.HTTP_404_NOT_FOUND)
+        check_project_role(request, task.project_id, detail="Task not found")
 
         serializer = TaskCreateUpdateSerializer(task, data=request.data, partial=True)
         if serializer.is_valid():
+            check_target_project(request, serializer.validated_data)
+            previous_project_id = task.project_id
+            remember_project(task)
             serializer.save()
+            publish_event(task.project_id, "task", "updated", [serializer.data])
+            publish_move(previous_project_id, task.project_id, "task", task.id)
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -309,7 +663,10 @@ class TaskViewSet(viewsets.ViewSet):
         """DELETE /api/tasks/{id}/"""
         task = Tasks.objects.filter(pk=pk).first()
         if task:
+            check_project_role(request, task.project_id, detail="Task not found")
+            task_id = task.id
             task.delete()
+            publish_event(task.project_id, "task", "deleted", [{"id": task_id}])
             return Response(
                 {"detail": "Task deleted"}, status=status.HTTP_204_NO_CONTENT
             )
@@ -317,31 +674,49 @@ class TaskViewSet(viewsets.ViewSet):
 
 
 # Comments ViewSet
-class CommentViewSet(viewsets.ViewSet):
+class CommentViewSet(ReplicaReadsMixin, viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
 
     def list(self, request, task_id=None):
         """GET /api/tasks/{task_id}/comments/"""
-        comments = Comments.objects.filter(task_id=task_id)
-        serializer = CommentSerializer(comments, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        comments = filter_visible(
+            Comments.objects.filter(task_id=task_id), request.user, "task__project"
+        )
+        validators = CollectionValidators(request, comments, CommentSerializer)
+        not_modified = validators.not_modified_response()
+        if not_modified is not None:
+            return not_modified
+
+        paginator = CommentCursorPagination()
+        data = serialize_page(paginator, comments, CommentSerializer, request)
+        return validators.apply(paginator.get_paginated_response(data))
 
     def create(self, request, task_id=None):
         """
         POST /api/tasks/{task_id}/comments/
         """
+        project_id = Tasks.objects.filter(pk=task_id).values_list("project_id").first()
+        check_project_role(
+            request, project_id and project_id[0], detail="Task not found"
+        )
         data = request.data.copy()  # Create a mutable copy of the request data
         data["user"] = request.user.id  # Set the user to the authenticated user
         data["task"] = task_id  # Set the task to the task_id from the URL
         serializer = CommentCreateUpdateSerializer(data=data)
         if serializer.is_valid():
-            serializer.save()
+            comment = serializer.save()
+            publish_event(
+                comment.task.project_id, "comment", "created", [serializer.data]
+            )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def retrieve(self, request, pk=None):
         """GET /api/comments/{id}/"""
-        comment = Comments.objects.filter(pk=pk).first()
+        comments = filter_visible(
+            Comments.objects.filter(pk=pk), request.user, "task__project"
+        )
+        comment = optimize_queryset(comments, CommentSerializer).first()
         if comment:
             serializer = CommentSerializer(comment)
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -351,13 +726,26 @@ class CommentViewSet(viewsets.ViewSet):
 
     def update(self, request, pk=None):
         """PUT /api/comments/{id}/"""
-        comment = Comments.objects.filter(pk=pk).first()
+        comment = Comments.objects.select_related("task").filter(pk=pk).first()
         if comment:
+            check_project_role(
+                request, comment.task.project_id, detail="Comment not found"
+            )
             serializer = CommentCreateUpdateSerializer(
                 comment, data=request.data, partial=True
             )
             if serializer.is_valid():
+                task = serializer.validated_data.get("task")
+                if task is not None:
+                    check_project_role(
+                        request, task.project_id, detail="Task not found"
+                    )
+                previous_project_id = comment.task.project_id
+                remember_project(comment)
                 serializer.save()
+                project_id = get_project_id(comment)
+                publish_event(project_id, "comment", "updated", [serializer.data])
+                publish_move(previous_project_id, project_id, "comment", comment.id)
                 return Response(serializer.data, status=status.HTTP_200_OK)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         return Response(
@@ -366,9 +754,16 @@ class CommentViewSet(viewsets.ViewSet):
 
     def destroy(self, request, pk=None):
         """DELETE /api/comments/{id}/"""
-        comment = Comments.objects.filter(pk=pk).first()
+        comment = Comments.objects.select_related("task").filter(pk=pk).first()
         if comment:
+            check_project_role(
+                request, comment.task.project_id, detail="Comment not found"
+            )
+            comment_id = comment.id
             comment.delete()
+            publish_event(
+                get_project_id(comment), "comment", "deleted", [{"id": comment_id}]
+            )
             return Response(
                 {"detail": "Comment deleted"}, status=status.HTTP_204_NO_CONTENT
             )
@@ -0,0 +1,108 @@
+"""
+Concurrency benchmark for the read endpoints.
+
+Opens `--connections` keep-alive connections that behave like slow clients
+(the request is trickled out over `--send-delay` seconds and the response is
+read in small chunks), and measures the latency of GET requests issued over
+them. Run it once against each server with the same database:
+
+    # ASGI (async read views)
+    uvicorn project_management.asgi:application --workers 1
+    # WSGI (DRF viewsets)
+    gunicorn project_management.wsgi --workers 1 --threads 32
+
+    python benchmarks/async_reads.py http://127.0.0.1:8000 \\
+        --token <access token> --path /api/projects/1/tasks/ --connections 1000
+
+Only the standard library is used, so it runs from any environment.
+"""
+
+import argparse
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+from common import percentiles
+
+
+async def slow_request(host, port, path, token, send_delay, read_chunk):
+    """
+    Send one GET as a slow client and return (status, seconds).
+    """
+    started = time.perf_counter()
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        request = (
+            f"GET {path} HTTP/1.1\r\n"
+            f"Host: {host}\r\n"
+            f"Authorization: Bearer {token}\r\n"
+            "Connection: close\r\n\r\n"
+        ).encode()
+        # Trickle the request out in a few pieces
+        pieces = 4
+        size = -(-len(request) // pieces)
+        for start in range(0, len(request), size):
+            writer.write(request[start : start + size])
+            await writer.drain()
+            await asyncio.sleep(send_delay / pieces)
+
+        status_line = await reader.readline()
+        while await reader.read(read_chunk):
+            await asyncio.sleep(0)
+        status = int(status_line.split()[1]) if status_line else 0
+    finally:
+        writer.close()
+    return status, time.perf_counter() - started
+
+
+async def run(args):
+    url = urlsplit(args.base_url)
+    host, port = url.hostname, url.port or 80
+    semaphore = asyncio.Semaphore(args.connections)
+
+    async def one():
+        async with semaphore:
+            try:
+                return await asyncio.wait_for(
+                    slow_request(
+                        host,
+                        port,
+                        args.path,
+                        args.token,
+                        args.send_delay,
+                        args.read_chunk,
+                    ),
+                    args.timeout,
+                )
+            except (OSError, asyncio.TimeoutError):
+                return 0, None
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one() for _ in range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies = [seconds for status, seconds in results if status == 200]
+    errors = len(results) - len(latencies)
+    print(f"requests:    {len(results)} ({errors} failed)")
+    print(f"concurrency: {args.connections}")
+    print(f"throughput:  {len(latencies) / elapsed:.1f} req/s")
+    if latencies:
+        for percentile, seconds in percentiles(latencies).items():
+            print(f"p{percentile}:         {seconds * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("base_url")
+    parser.add_argument("--token", required=True, help="JWT access token")
+    parser.add_argument("--path", default="/api/projects/")
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--send-delay", type=float, default=0.5)
+    parser.add_argument("--read-chunk", type=int, default=512)
+    parser.add_argument("--timeout", type=float, default=30)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Shared setup for the in-process benchmark scripts.
+"""
+
+import os
+import statistics
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+
+def setup_django():
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project_management.settings")
+
+    import django
+
+    django.setup()
+
+
+@contextmanager
+def test_database():
+    """
+    Run the block against a throwaway test database.
+    """
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def percentiles(samples, points=(50, 95, 99)):
+    """
+    Return `{point: value}` for the given percentiles of `samples`.
+    """
+    samples = sorted(samples)
+    if len(samples) == 1:
+        return {point: samples[0] for point in points}
+    quantiles = statistics.quantiles(samples, n=100)
+    return {point: quantiles[point - 1] for point in points}
@@ -0,0 +1,107 @@
+"""
+Response compression benchmark.
+
+Builds a project with `--tasks` tasks (and as many comments on one task) in a
+throwaway test database, then compresses the task and comment list pages
+and the NDJSON export with every installed encoding at a few levels,
+printing the bytes saved against the CPU time it costs.
+
+    python benchmarks/compression.py --tasks 1000 --page-size 100 500
+"""
+
+import argparse
+import time
+from datetime import timedelta
+
+from common import percentiles, setup_django, test_database
+
+setup_django()
+
+from django.utils import timezone  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from api.compression import COMPRESSORS, compress  # noqa: E402
+from api.models import Users, Projects, Tasks, Comments  # noqa: E402
+
+LEVELS = {"gzip": [1, 6, 9], "br": [1, 4, 11], "zstd": [1, 3, 10]}
+
+
+def build(count):
+    owner = Users.objects.create_user(
+        username="owner", email="owner@example.com", password="x"
+    )
+    project = Projects.objects.create(
+        name="Project", description="The project everyone works on", owner=owner
+    )
+    now = timezone.now()
+    tasks = Tasks.objects.bulk_create(
+        [
+            Tasks(
+                title=f"Task {i}",
+                description=f"Steps to reproduce issue {i} on the staging server",
+                project=project,
+                assigned_to=owner,
+                due_date=now + timedelta(days=i % 60),
+            )
+            for i in range(count)
+        ],
+        batch_size=1000,
+    )
+    Comments.objects.bulk_create(
+        [
+            Comments(content=f"Comment {i} on the task", user=owner, task=tasks[0])
+            for i in range(count)
+        ],
+        batch_size=1000,
+    )
+    return owner, project, tasks[0]
+
+
+def payloads(client, project, task, page_sizes):
+    for page_size in page_sizes:
+        for name, url in [
+            ("tasks", f"/api/projects/{project.id}/tasks/"),
+            ("comments", f"/api/tasks/{task.id}/comments/"),
+        ]:
+            response = client.get(url, {"page_size": page_size})
+            assert response.status_code == 200, response.status_code
+            yield f"{name} page_size={page_size}", response.content
+    response = client.get(f"/api/projects/{project.id}/export/ndjson/")
+    yield "export ndjson", b"".join(response.streaming_content)
+
+
+def measure(data, coding, level, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        compressed = compress(data, coding, level)
+        timings.append(time.perf_counter() - started)
+    latency = percentiles(timings)[50]
+    saved = 1 - len(compressed) / len(data)
+    print(
+        f"    {coding:<4} level {level:<2}  {len(compressed) / 1024:8.1f} KiB"
+        f"  saved {saved:6.1%}  {latency * 1000:8.3f} ms"
+        f"  {len(data) / latency / 2**20:8.1f} MiB/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--tasks", type=int, default=1000)
+    parser.add_argument("--page-size", type=int, nargs="+", default=[100, 500])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    print(f"encodings: {', '.join(COMPRESSORS)}")
+    with test_database():
+        owner, project, task = build(args.tasks)
+        client = APIClient()
+        client.force_authenticate(owner)
+        for name, data in payloads(client, project, task, args.page_size):
+            print(f"  {name} ({len(data) / 1024:.1f} KiB):")
+            for coding in COMPRESSORS:
+                for level in LEVELS[coding]:
+                    measure(data, coding, level, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
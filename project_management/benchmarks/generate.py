@@ -0,0 +1,209 @@
+"""
+Benchmark data generator.
+
+Fills an empty database with users, projects, members, tasks and comments
+at one of the `SCALES` below, through the bulk importer (`api/importer.py`,
+with secondary indexes deferred). The data is random but the same for a
+given `--seed`: members are drawn from all users, tasks are assigned to and
+commented on by the project's members, and due dates fall on both sides of
+today.
+
+    python benchmarks/generate.py --scale large --database /tmp/large.sqlite3
+
+`--database` names an SQLite file (created and migrated if missing);
+without it the database from the settings is used, e.g. Postgres through
+`DATABASE_ENGINE`. `benchmarks/suite.py --database` runs against a copy of
+the file.
+"""
+
+import argparse
+import os
+import random
+from datetime import timedelta
+
+from common import setup_django
+
+# Per scale: users, projects, members per project (besides the owner),
+# tasks per project and comments per task (on average)
+SCALES = {
+    "small": {"users": 500, "projects": 100, "members": 5, "tasks": 20, "comments": 5},
+    "medium": {
+        "users": 5_000,
+        "projects": 1_000,
+        "members": 5,
+        "tasks": 50,
+        "comments": 10,
+    },
+    # 10k projects, 500k tasks and 5M comments
+    "large": {
+        "users": 50_000,
+        "projects": 10_000,
+        "members": 5,
+        "tasks": 50,
+        "comments": 10,
+    },
+}
+
+PASSWORD = "benchmark-password"  # Of every generated user
+
+WORDS = (
+    "api backend bug build cache client config crash data database deploy design "
+    "docs error export feature fix frontend index invoice issue layout login "
+    "memory migration mobile monitor onboarding page payment performance query "
+    "release report request review schema search security server session "
+    "signup sync test timeout token upload user workflow add check clean "
+    "document improve investigate move refactor remove rename update verify "
+    "failing slow broken missing new old flaky large small urgent"
+).split()
+FIRST_NAMES = "Ada Alan Barbara Dennis Edsger Frances Grace Ken Linus Margaret".split()
+LAST_NAMES = "Hopper Kay Knuth Lamport Liskov Ritchie Thompson Torvalds Wirth".split()
+STATUSES = ["To Do"] * 4 + ["In Progress"] * 2 + ["Done"] * 4
+PRIORITIES = ["Low"] * 3 + ["Medium"] * 5 + ["High"] * 2
+
+
+class Generator:
+    """
+    The records of each model, in the shape `import_data` reads them. Each
+    input is generated lazily and can be iterated once.
+    """
+
+    def __init__(self, scale, seed=0):
+        from django.utils import timezone
+
+        self.scale = SCALES[scale]
+        self.seed = seed
+        self.now = timezone.now().replace(microsecond=0)
+        rng = random.Random(seed)
+        users = range(1, self.scale["users"] + 1)
+        self.owners = {}
+        # {project id: [member user ids]}, the owner first
+        self.members = {}
+        for project in range(1, self.scale["projects"] + 1):
+            owner = rng.choice(users)
+            others = rng.sample(users, self.scale["members"] + 1)
+            self.owners[project] = owner
+            self.members[project] = [owner] + [
+                user for user in others if user != owner
+            ][: self.scale["members"]]
+
+    def rng(self, name):
+        return random.Random(f"{self.seed}:{name}")
+
+    @staticmethod
+    def text(rng, low, high):
+        return " ".join(rng.choices(WORDS, k=rng.randint(low, high)))
+
+    def timestamp(self, rng, days):
+        return self.now - timedelta(seconds=rng.randrange(days * 86400))
+
+    def users(self):
+        from django.contrib.auth.hashers import make_password
+
+        rng = self.rng("users")
+        password = make_password(PASSWORD)
+        for user in range(1, self.scale["users"] + 1):
+            yield {
+                "id": user,
+                "username": f"user{user}",
+                "email": f"user{user}@example.com",
+                "password": password,
+                "first_name": rng.choice(FIRST_NAMES),
+                "last_name": rng.choice(LAST_NAMES),
+                "date_joined": self.timestamp(rng, 730),
+            }
+
+    def projects(self):
+        rng = self.rng("projects")
+        for project, owner in self.owners.items():
+            created_at = self.timestamp(rng, 365)
+            yield {
+                "id": project,
+                "name": f"Project {project}: {self.text(rng, 1, 3)}",
+                "description": self.text(rng, 5, 20),
+                "owner": owner,
+                "created_at": created_at,
+                "updated_at": created_at,
+            }
+
+    def memberships(self):
+        rng = self.rng("members")
+        for project, members in self.members.items():
+            for user in members[1:]:
+                role = "Admin" if rng.random() < 0.2 else "Member"
+                yield {"project": project, "user": user, "role": role}
+
+    def tasks(self):
+        rng = self.rng("tasks")
+        for project, members in self.members.items():
+            for index in range(self.scale["tasks"]):
+                created_at = self.timestamp(rng, 180)
+                yield {
+                    "id": (project - 1) * self.scale["tasks"] + index + 1,
+                    "title": self.text(rng, 3, 8).capitalize(),
+                    "description": self.text(rng, 10, 40),
+                    "status": rng.choice(STATUSES),
+                    "priority": rng.choice(PRIORITIES),
+                    "project": project,
+                    "assigned_to": rng.choice(members) if rng.random() < 0.9 else None,
+                    "due_date": self.now + timedelta(days=rng.randint(-30, 90)),
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                }
+
+    def comments(self):
+        rng = self.rng("comments")
+        per_task = self.scale["comments"]
+        for project, members in self.members.items():
+            for index in range(self.scale["tasks"]):
+                task = (project - 1) * self.scale["tasks"] + index + 1
+                for _ in range(rng.randint(0, 2 * per_task)):
+                    created_at = self.timestamp(rng, 90)
+                    yield {
+                        "content": self.text(rng, 5, 30).capitalize(),
+                        "task": task,
+                        "user": rng.choice(members),
+                        "created_at": created_at,
+                        "updated_at": created_at,
+                    }
+
+
+def generate(scale, seed=0, report=print):
+    """
+    Load `scale`'s data into the (empty) default database.
+    """
+    from api.importer import Importer
+    from api.models import Users
+
+    if Users.objects.exists():
+        raise SystemExit("The database is not empty.")
+    generator = Generator(scale, seed)
+    Importer(batch_size=5000, report=report, report_every=10).run(
+        {
+            "users": generator.users(),
+            "projects": generator.projects(),
+            "members": generator.memberships(),
+            "tasks": generator.tasks(),
+            "comments": generator.comments(),
+        },
+        defer_indexes=True,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--database", metavar="PATH", help="SQLite file to fill.")
+    args = parser.parse_args()
+    if args.database:
+        os.environ["DATABASE_ENGINE"] = "sqlite"
+        os.environ["DATABASE_NAME"] = os.path.abspath(args.database)
+    setup_django()
+    from django.core.management import call_command
+
+    call_command("migrate", verbosity=0)
+    generate(args.scale, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+JSON renderer benchmark.
+
+Builds a project with `--tasks` tasks, and a task with as many comments, in a
+throwaway test database, then times rendering and parsing the pages of
+GET /api/projects/{id}/tasks/ and GET /api/tasks/{id}/comments/ with DRF's
+stdlib renderer and parser and with the orjson ones (`api/renderers.py`).
+
+    python benchmarks/json_rendering.py --page-size 100 500
+"""
+
+import argparse
+import time
+from datetime import timedelta
+from io import BytesIO
+
+from common import percentiles, setup_django, test_database
+
+setup_django()
+
+from django.utils import timezone  # noqa: E402
+from rest_framework.parsers import JSONParser  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from api import renderers  # noqa: E402
+from api.models import Users, Projects, Tasks, Comments  # noqa: E402
+
+
+def build(count):
+    owner = Users.objects.create_user(
+        username="owner", email="owner@example.com", password="x"
+    )
+    project = Projects.objects.create(name="Project", description="", owner=owner)
+    now = timezone.now()
+    tasks = Tasks.objects.bulk_create(
+        [
+            Tasks(
+                title=f"Task {i}",
+                description="Description of the task, with some détails " * 3,
+                project=project,
+                assigned_to=owner,
+                due_date=now + timedelta(days=i % 60),
+            )
+            for i in range(count)
+        ],
+        batch_size=1000,
+    )
+    Comments.objects.bulk_create(
+        [
+            Comments(content=f"Comment {i} on the task", user=owner, task=tasks[0])
+            for i in range(count)
+        ],
+        batch_size=1000,
+    )
+    return owner, project, tasks[0]
+
+
+def measure(label, function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    latency = percentiles(timings)
+    print(
+        f"    {label:<14} p50 {latency[50] * 1000:8.3f} ms"
+        f"  p95 {latency[95] * 1000:8.3f} ms"
+    )
+    return latency[50]
+
+
+def compare(name, data, repeat):
+    content = JSONRenderer().render(data)
+    assert renderers.FastJSONRenderer().render(data) == content
+    print(f"  {name} ({len(content) / 1024:.0f} KiB):")
+    stdlib = measure("render stdlib", lambda: JSONRenderer().render(data), repeat)
+    fast = measure(
+        "render orjson", lambda: renderers.FastJSONRenderer().render(data), repeat
+    )
+    print(f"    speedup {stdlib / fast:.1f}x")
+    stdlib = measure(
+        "parse stdlib", lambda: JSONParser().parse(BytesIO(content)), repeat
+    )
+    fast = measure(
+        "parse orjson",
+        lambda: renderers.FastJSONParser().parse(BytesIO(content)),
+        repeat,
+    )
+    print(f"    speedup {stdlib / fast:.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--tasks", type=int, default=1000)
+    parser.add_argument("--page-size", type=int, nargs="+", default=[100, 500])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    if renderers.orjson is None:
+        parser.error("orjson is not installed")
+    with test_database():
+        owner, project, task = build(args.tasks)
+        client = APIClient()
+        client.force_authenticate(owner)
+        for page_size in args.page_size:
+            print(f"page_size={page_size}:")
+            for name, url in [
+                ("tasks", f"/api/projects/{project.id}/tasks/"),
+                ("comments", f"/api/tasks/{task.id}/comments/"),
+            ]:
+                response = client.get(url, {"page_size": page_size})
+                assert response.status_code == 200, response.status_code
+                compare(name, response.data, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Login throughput benchmark.
+
+For each hashing algorithm, creates a user in a throwaway test database and
+posts `--logins` logins to /api/users/login/ from `--concurrency` threads,
+going through the verification pool like production requests. Reports
+logins/s and latency percentiles for valid logins, wrong passwords and
+unknown emails (the last two should cost the same).
+
+    python benchmarks/login_throughput.py --concurrency 32 --workers 4
+    python benchmarks/login_throughput.py --algorithm pbkdf2_sha256 --algorithm scrypt
+"""
+
+import argparse
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import percentiles, setup_django, test_database
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+from django.utils.module_loading import import_string  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from api.hashers import get_verification_pool  # noqa: E402
+from api.models import Users  # noqa: E402
+
+PASSWORD = "benchmark-pass-123"
+
+
+def login(email, password):
+    client = APIClient()
+    started = time.perf_counter()
+    response = client.post(
+        "/api/users/login/", {"email": email, "password": password}, format="json"
+    )
+    elapsed = time.perf_counter() - started
+    connection.close()
+    return response.status_code, elapsed
+
+
+def report(label, results, elapsed):
+    latency = percentiles([seconds for _, seconds in results])
+    statuses = sorted({status for status, _ in results})
+    print(
+        f"  {label:<15} {len(results) / elapsed:8.1f} logins/s"
+        f"  p50 {latency[50] * 1000:7.1f} ms"
+        f"  p99 {latency[99] * 1000:7.1f} ms"
+        f"  status {statuses}"
+    )
+
+
+def run(algorithm, args):
+    policy = {**settings.API_PASSWORD_HASHING, "ALGORITHM": algorithm}
+    policy["WORKERS"] = args.workers
+    policy["QUEUE"] = args.concurrency
+    hashers = sorted(
+        settings.PASSWORD_HASHERS,
+        key=lambda path: import_string(path).algorithm != algorithm,
+    )
+    with override_settings(API_PASSWORD_HASHING=policy, PASSWORD_HASHERS=hashers):
+        try:
+            user = Users.objects.create_user(
+                username=algorithm, email=f"{algorithm}@example.com", password=PASSWORD
+            )
+        except ValueError as exc:
+            print(f"{algorithm}: skipped ({exc})")
+            return
+        get_verification_pool.cache_clear()
+        print(f"{algorithm}: {args.workers} workers, {args.concurrency} clients")
+        cases = [
+            ("valid", user.email, PASSWORD),
+            ("wrong password", user.email, "wrong-pass"),
+            ("unknown email", "nobody@example.com", PASSWORD),
+        ]
+        for label, email, password in cases:
+            with ThreadPoolExecutor(args.concurrency) as clients:
+                started = time.perf_counter()
+                results = list(
+                    clients.map(lambda _: login(email, password), range(args.logins))
+                )
+                elapsed = time.perf_counter() - started
+            report(label, results, elapsed)
+        get_verification_pool().executor.shutdown()
+        get_verification_pool.cache_clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--algorithm",
+        action="append",
+        choices=["argon2", "scrypt", "pbkdf2_sha256"],
+        help="Repeat to compare several (default: all)",
+    )
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--workers", type=int, default=settings.API_PASSWORD_HASHING["WORKERS"]
+    )
+    args = parser.parse_args()
+
+    # Rejected logins are expected here
+    logging.getLogger("django.request").setLevel(logging.ERROR)
+    with test_database():
+        for algorithm in args.algorithm or ["argon2", "scrypt", "pbkdf2_sha256"]:
+            run(algorithm, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Request metrics overhead benchmark.
+
+Times GET /api/projects/{id}/tasks/ and GET /api/tasks/{id}/ in a throwaway
+test database with the metrics middleware (and its query timer) turned on
+and off, alternating between the two so that both see the same conditions.
+
+    python benchmarks/metrics_overhead.py --repeat 2000
+"""
+
+import argparse
+import time
+from datetime import timedelta
+
+from common import percentiles, setup_django, test_database
+
+setup_django()
+
+from django.test.utils import override_settings  # noqa: E402
+from django.utils import timezone  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from api.metrics import registry  # noqa: E402
+from api.models import Users, Projects, Tasks  # noqa: E402
+
+
+def build():
+    owner = Users.objects.create_user(
+        username="owner", email="owner@example.com", password="x"
+    )
+    project = Projects.objects.create(name="Project", description="", owner=owner)
+    tasks = Tasks.objects.bulk_create(
+        Tasks(
+            title=f"Task {i}",
+            description="",
+            project=project,
+            assigned_to=owner,
+            due_date=timezone.now() + timedelta(days=i),
+        )
+        for i in range(100)
+    )
+    return owner, project, tasks[0]
+
+
+def timed_get(client, url):
+    started = time.perf_counter()
+    response = client.get(url)
+    elapsed = time.perf_counter() - started
+    assert response.status_code == 200, response.status_code
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+    with test_database():
+        owner, project, task = build()
+        client = APIClient()
+        client.force_authenticate(owner)
+        for name, url in [
+            ("task list", f"/api/projects/{project.id}/tasks/"),
+            ("task detail", f"/api/tasks/{task.id}/"),
+        ]:
+            timings = {True: [], False: []}
+            for i in range(args.repeat * 2):
+                enabled = bool(i % 2)
+                with override_settings(API_METRICS={"ENABLED": enabled, "TOKEN": ""}):
+                    timings[enabled].append(timed_get(client, url))
+            off, on = percentiles(timings[False]), percentiles(timings[True])
+            print(f"{name}:")
+            for label, latency in [("off", off), ("on", on)]:
+                print(
+                    f"  metrics {label:<3} p50 {latency[50] * 1000:7.3f} ms"
+                    f"  p95 {latency[95] * 1000:7.3f} ms"
+                )
+            print(f"  overhead p50 {(on[50] - off[50]) * 1e6:+.0f} us")
+        registry.reset()
+
+
+if __name__ == "__main__":
+    main()
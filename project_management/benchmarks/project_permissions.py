@@ -0,0 +1,118 @@
+"""
+Project permission benchmark.
+
+Builds a user who belongs to `--projects` projects (thousands by default)
+in a throwaway test database and times the permission-scoped reads: loading
+the role map cold and from the cache, and the project list, task list and
+comment list requests that are filtered by membership.
+
+    python benchmarks/project_permissions.py --projects 100 1000 5000
+"""
+
+import argparse
+import time
+from datetime import timedelta
+
+from common import percentiles, setup_django, test_database
+
+setup_django()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+from django.utils import timezone  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from api.cache import get_cache  # noqa: E402
+from api.models import Users, Projects, ProjectMembers, Tasks, Comments  # noqa: E402
+from api.permissions import get_user_roles, roles_key  # noqa: E402
+
+
+def build(count):
+    """
+    A user who is a member of `count` projects owned by someone else, one of
+    which has tasks and comments.
+    """
+    owner = Users.objects.create_user(
+        username=f"owner{count}", email=f"owner{count}@example.com", password="x"
+    )
+    user = Users.objects.create_user(
+        username=f"user{count}", email=f"user{count}@example.com", password="x"
+    )
+    # bulk_create() skips the owner-membership signal; only `user` matters here
+    projects = Projects.objects.bulk_create(
+        [
+            Projects(name=f"Project {i}", description="", owner=owner)
+            for i in range(count)
+        ],
+        batch_size=500,
+    )
+    ProjectMembers.objects.bulk_create(
+        [ProjectMembers(project=p, user=user, role="Member") for p in projects],
+        batch_size=500,
+    )
+    project = projects[-1]
+    due_date = timezone.now() + timedelta(days=7)
+    tasks = Tasks.objects.bulk_create(
+        [
+            Tasks(title=f"Task {i}", description="", project=project, due_date=due_date)
+            for i in range(50)
+        ]
+    )
+    Comments.objects.bulk_create(
+        [Comments(content=f"Comment {i}", user=user, task=tasks[0]) for i in range(50)]
+    )
+    return user, project, tasks[0]
+
+
+def measure(label, function, repeat):
+    timings = []
+    with CaptureQueriesContext(connection) as queries:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - started)
+    latency = percentiles(timings)
+    print(
+        f"  {label:<22} p50 {latency[50] * 1000:8.2f} ms"
+        f"  p95 {latency[95] * 1000:8.2f} ms"
+        f"  {len(queries) / repeat:.0f} queries"
+    )
+
+
+def run(count, repeat):
+    user, project, task = build(count)
+    client = APIClient()
+    client.force_authenticate(user)
+    cache = get_cache()
+    print(f"{count} projects:")
+
+    def cold_roles():
+        cache.delete(roles_key(user.pk))
+        assert len(get_user_roles(user.pk)) == count
+
+    def get(url):
+        def request():
+            response = client.get(url)
+            assert response.status_code == 200, response.status_code
+
+        return request
+
+    measure("role map (cold)", cold_roles, repeat)
+    measure("role map (cached)", lambda: get_user_roles(user.pk), repeat)
+    measure("GET projects", get("/api/projects/"), repeat)
+    measure("GET project tasks", get(f"/api/projects/{project.id}/tasks/"), repeat)
+    measure("GET task comments", get(f"/api/tasks/{task.id}/comments/"), repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--projects", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    with test_database():
+        for count in args.projects:
+            run(count, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Project stats benchmark.
+
+Builds a project with `--tasks` tasks (and a comment per task) in a throwaway
+test database and times GET /api/projects/{id}/stats/ computed live from the
+tasks and read from the materialized summary.
+
+    python benchmarks/project_stats.py --tasks 1000 10000 100000
+"""
+
+import argparse
+import random
+import time
+from datetime import timedelta
+
+from common import percentiles, setup_django, test_database
+
+setup_django()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import CaptureQueriesContext, override_settings  # noqa: E402
+from django.utils import timezone  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from api.models import Users, Projects, Tasks, Comments  # noqa: E402
+from api.stats import rebuild_summary  # noqa: E402
+
+
+def build(count):
+    owner = Users.objects.create_user(
+        username=f"owner{count}", email=f"owner{count}@example.com", password="x"
+    )
+    assignees = [
+        Users.objects.create_user(
+            username=f"user{count}-{i}", email=f"user{count}-{i}@example.com"
+        )
+        for i in range(10)
+    ] + [None]
+    project = Projects.objects.create(name="Project", description="", owner=owner)
+    now = timezone.now()
+    statuses = [status for status, _ in Tasks.STATUS_CHOICES]
+    priorities = [priority for priority, _ in Tasks.PRIORITY_CHOICES]
+    tasks = Tasks.objects.bulk_create(
+        [
+            Tasks(
+                title=f"Task {i}",
+                description="",
+                project=project,
+                status=random.choice(statuses),
+                priority=random.choice(priorities),
+                assigned_to=random.choice(assignees),
+                due_date=now + timedelta(days=random.randint(-30, 30)),
+            )
+            for i in range(count)
+        ],
+        batch_size=1000,
+    )
+    Comments.objects.bulk_create(
+        [Comments(content="Comment", user=owner, task=task) for task in tasks],
+        batch_size=1000,
+    )
+    return owner, project
+
+
+def measure(label, client, url, repeat):
+    timings = []
+    with CaptureQueriesContext(connection) as queries:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = client.get(url)
+            timings.append(time.perf_counter() - started)
+            assert response.status_code == 200, response.status_code
+    latency = percentiles(timings)
+    print(
+        f"  {label:<8} p50 {latency[50] * 1000:8.2f} ms"
+        f"  p95 {latency[95] * 1000:8.2f} ms"
+        f"  {len(queries) / repeat:.0f} queries"
+    )
+
+
+def run(count, repeat):
+    owner, project = build(count)
+    client = APIClient()
+    client.force_authenticate(owner)
+    url = f"/api/projects/{project.id}/stats/"
+    print(f"{count} tasks:")
+    measure("live", client, url, repeat)
+    with override_settings(API_PROJECT_STATS={"SUMMARY": True}):
+        started = time.perf_counter()
+        rebuild_summary([project.id])
+        print(f"  rebuild  {(time.perf_counter() - started) * 1000:8.2f} ms")
+        measure("summary", client, url, repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--tasks", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    with test_database():
+        for count in args.tasks:
+            run(count, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
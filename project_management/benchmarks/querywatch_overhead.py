@@ -0,0 +1,85 @@
+"""
+Query watch overhead benchmark.
+
+Times GET /api/projects/{id}/tasks/ and GET /api/tasks/{id}/ in a throwaway
+test database with N+1 and slow query detection (api/querywatch.py) turned on
+and off, alternating between the two so that both see the same conditions.
+
+    python benchmarks/querywatch_overhead.py --repeat 2000
+"""
+
+import argparse
+import random
+import time
+from datetime import timedelta
+
+from common import percentiles, setup_django, test_database
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+from django.utils import timezone  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from api.models import Users, Projects, Tasks  # noqa: E402
+
+
+def build():
+    owner = Users.objects.create_user(
+        username="owner", email="owner@example.com", password="x"
+    )
+    project = Projects.objects.create(name="Project", description="", owner=owner)
+    tasks = Tasks.objects.bulk_create(
+        Tasks(
+            title=f"Task {i}",
+            description="",
+            project=project,
+            assigned_to=owner,
+            due_date=timezone.now() + timedelta(days=i),
+        )
+        for i in range(100)
+    )
+    return owner, project, tasks[0]
+
+
+def timed_get(client, url):
+    started = time.perf_counter()
+    response = client.get(url)
+    elapsed = time.perf_counter() - started
+    assert response.status_code == 200, response.status_code
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+    with test_database():
+        owner, project, task = build()
+        client = APIClient()
+        client.force_authenticate(owner)
+        options = settings.API_QUERY_WATCH
+        for name, url in [
+            ("task list", f"/api/projects/{project.id}/tasks/"),
+            ("task detail", f"/api/tasks/{task.id}/"),
+        ]:
+            timings = {True: [], False: []}
+            for _ in range(args.repeat):
+                # In random order: the second request of a pair tends to be slower
+                for enabled in random.sample([True, False], 2):
+                    watch = {**options, "ENABLED": enabled}
+                    with override_settings(API_QUERY_WATCH=watch):
+                        timings[enabled].append(timed_get(client, url))
+            off, on = percentiles(timings[False]), percentiles(timings[True])
+            print(f"{name}:")
+            for label, latency in [("off", off), ("on", on)]:
+                print(
+                    f"  watch {label:<3} p50 {latency[50] * 1000:7.3f} ms"
+                    f"  p95 {latency[95] * 1000:7.3f} ms"
+                )
+            print(f"  overhead p50 {(on[50] - off[50]) * 1e6:+.0f} us")
+
+
+if __name__ == "__main__":
+    main()
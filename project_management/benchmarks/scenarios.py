@@ -0,0 +1,291 @@
+"""
+Request scenarios of the benchmark suite, one or more per route of
+`api/urls.py` (see suite.py).
+"""
+
+from datetime import timedelta
+from itertools import count
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.models import Users, Projects, ProjectMembers, Tasks, Comments
+
+from generate import PASSWORD
+
+
+class Scenario:
+    """
+    One request, repeated. `prepare(i)`, when given, runs before each
+    request (untimed) and returns its `(path, data)`, for requests that
+    need rows of their own, e.g. deletes.
+    """
+
+    def __init__(
+        self, name, method, path=None, data=None, prepare=None, headers=None
+    ):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.data = data
+        self.prepare = prepare
+        self.headers = headers or {}
+
+    def request(self, iteration):
+        if self.prepare is not None:
+            return self.prepare(iteration)
+        return self.path, self.data
+
+
+class Fixture:
+    """
+    The rows the scenarios read and write: the last project with comments,
+    its owner (who the requests are made as), its first task with comments
+    and one of its other members. Rows made for writes are named apart.
+    """
+
+    def __init__(self):
+        self.project = (
+            Projects.objects.select_related("owner")
+            .filter(tasks__comments__isnull=False)
+            .order_by("-id")
+            .first()
+        )
+        self.user = self.project.owner
+        self.task = (
+            Tasks.objects.filter(project=self.project, comments__isnull=False)
+            .order_by("id")
+            .first()
+        )
+        self.comment = self.task.comments.order_by("id").first()
+        self.member = (
+            ProjectMembers.objects.filter(project=self.project)
+            .exclude(user=self.user)
+            .order_by("id")
+            .first()
+        )
+        self.names = count()
+
+    def name(self, prefix):
+        return f"{prefix}-{next(self.names)}"
+
+    def new_user(self):
+        name = self.name("benchmark")
+        # Without a password, so that no time goes into hashing it
+        return Users.objects.create_user(username=name, email=f"{name}@example.com")
+
+    def new_project(self):
+        return Projects.objects.create(
+            name=self.name("Project"), description="Benchmark", owner=self.user
+        )
+
+    def new_tasks(self, number):
+        due_date = timezone.now() + timedelta(days=7)
+        return [
+            Tasks.objects.create(
+                title=self.name("Task"),
+                description="Benchmark",
+                project=self.project,
+                assigned_to=self.user,
+                due_date=due_date,
+            )
+            for _ in range(number)
+        ]
+
+    def user_data(self):
+        name = self.name("benchmark")
+        return {
+            "username": name,
+            "email": f"{name}@example.com",
+            "password": PASSWORD,
+            "first_name": "Bench",
+            "last_name": "Mark",
+        }
+
+    def task_data(self):
+        return {
+            "title": self.name("Task"),
+            "description": "Created by the benchmark",
+            "priority": "High",
+            "assigned_to": self.user.id,
+            "due_date": (timezone.now() + timedelta(days=7)).isoformat(),
+        }
+
+
+def build_scenarios(fixture):
+    project, task, comment, member = (
+        fixture.project,
+        fixture.task,
+        fixture.comment,
+        fixture.member,
+    )
+    user = fixture.user
+    project_url = f"/api/projects/{project.id}"
+    credentials = {"email": user.email, "password": PASSWORD}
+    refresh = {"refresh": str(RefreshToken.for_user(user))}
+    metrics_headers = {"Authorization": f"Bearer {settings.API_METRICS['TOKEN']}"}
+
+    def register(i):
+        return "/api/users/register/", fixture.user_data()
+
+    def update_user(i):
+        return f"/api/users/{fixture.new_user().id}/", fixture.user_data()
+
+    def patch_user(i):
+        return f"/api/users/{fixture.new_user().id}/", {"first_name": "Changed"}
+
+    def delete_user(i):
+        return f"/api/users/{fixture.new_user().id}/", None
+
+    def create_project(i):
+        return "/api/projects/", {"name": fixture.name("Project"), "description": "-"}
+
+    def delete_project(i):
+        return f"/api/projects/{fixture.new_project().id}/", None
+
+    def add_member(i):
+        data = {"project": project.id, "user": fixture.new_user().id, "role": "Member"}
+        return f"{project_url}/members/", data
+
+    def delete_member(i):
+        member = ProjectMembers.objects.create(
+            project=project, user=fixture.new_user(), role="Member"
+        )
+        return f"/api/members/{member.id}/", None
+
+    def create_task(i):
+        return f"{project_url}/tasks/", fixture.task_data()
+
+    def bulk_create(i):
+        return f"{project_url}/tasks/bulk/", [fixture.task_data() for _ in range(20)]
+
+    def bulk_update(i):
+        tasks = Tasks.objects.filter(project=project).order_by("id")[:20]
+        status = ["To Do", "In Progress", "Done"][i % 3]
+        ids = tasks.values_list("id", flat=True)
+        data = [{"id": pk, "status": status} for pk in ids]
+        return f"{project_url}/tasks/bulk/", data
+
+    def bulk_delete(i):
+        return f"{project_url}/tasks/bulk/", [t.id for t in fixture.new_tasks(20)]
+
+    def delete_task(i):
+        return f"/api/tasks/{fixture.new_tasks(1)[0].id}/", None
+
+    def delete_comment(i):
+        comment = Comments.objects.create(
+            content=fixture.name("Comment"), task=task, user=user
+        )
+        return f"/api/comments/{comment.id}/", None
+
+    comments_url = f"/api/tasks/{task.id}/comments/"
+    filtered = "?status=To Do,In Progress&ordering=-due_date"
+    return [
+        # Users and tokens
+        Scenario("POST /api/users/register/", "post", prepare=register),
+        Scenario("POST /api/users/login/", "post", "/api/users/login/", credentials),
+        Scenario("GET /api/users/{id}/", "get", f"/api/users/{user.id}/"),
+        Scenario("PUT /api/users/{id}/", "put", prepare=update_user),
+        Scenario("PATCH /api/users/{id}/", "patch", prepare=patch_user),
+        Scenario("DELETE /api/users/{id}/", "delete", prepare=delete_user),
+        Scenario("POST /api/token/", "post", "/api/token/", credentials),
+        Scenario("POST /api/token/refresh/", "post", "/api/token/refresh/", refresh),
+        Scenario("GET /metrics", "get", "/metrics", headers=metrics_headers),
+        Scenario("GET /api/", "get", "/api/"),
+        # Projects
+        Scenario("GET /api/projects/", "get", "/api/projects/"),
+        Scenario("POST /api/projects/", "post", prepare=create_project),
+        Scenario("GET /api/projects/{id}/", "get", f"{project_url}/"),
+        Scenario(
+            "PUT /api/projects/{id}/",
+            "put",
+            f"{project_url}/",
+            {"name": project.name, "description": project.description},
+        ),
+        Scenario(
+            "PATCH /api/projects/{id}/",
+            "patch",
+            f"{project_url}/",
+            {"description": project.description},
+        ),
+        Scenario("DELETE /api/projects/{id}/", "delete", prepare=delete_project),
+        Scenario("GET /api/projects/{id}/changes/", "get", f"{project_url}/changes/"),
+        Scenario(
+            "GET /api/projects/{id}/changes/?since=",
+            "get",
+            f"{project_url}/changes/?since=0",
+        ),
+        Scenario("GET /api/projects/{id}/stats/", "get", f"{project_url}/stats/"),
+        Scenario(
+            "GET /api/projects/{id}/search/?q=", "get", f"{project_url}/search/?q=fix"
+        ),
+        Scenario(
+            "GET /api/projects/{id}/export/ndjson/",
+            "get",
+            f"{project_url}/export/ndjson/",
+        ),
+        Scenario(
+            "GET /api/projects/{id}/export/csv/", "get", f"{project_url}/export/csv/"
+        ),
+        # Members
+        Scenario("GET /api/projects/{id}/members/", "get", f"{project_url}/members/"),
+        Scenario("POST /api/projects/{id}/members/", "post", prepare=add_member),
+        Scenario("GET /api/members/{id}/", "get", f"/api/members/{member.id}/"),
+        Scenario(
+            "PUT /api/members/{id}/",
+            "put",
+            f"/api/members/{member.id}/",
+            {"role": member.role},
+        ),
+        Scenario(
+            "PATCH /api/members/{id}/",
+            "patch",
+            f"/api/members/{member.id}/",
+            {"role": member.role},
+        ),
+        Scenario("DELETE /api/members/{id}/", "delete", prepare=delete_member),
+        # Tasks
+        Scenario("GET /api/projects/{id}/tasks/", "get", f"{project_url}/tasks/"),
+        Scenario(
+            "GET /api/projects/{id}/tasks/?status=&ordering=",
+            "get",
+            f"{project_url}/tasks/{filtered}",
+        ),
+        Scenario("POST /api/projects/{id}/tasks/", "post", prepare=create_task),
+        Scenario("POST /api/projects/{id}/tasks/bulk/", "post", prepare=bulk_create),
+        Scenario("PATCH /api/projects/{id}/tasks/bulk/", "patch", prepare=bulk_update),
+        Scenario(
+            "DELETE /api/projects/{id}/tasks/bulk/", "delete", prepare=bulk_delete
+        ),
+        Scenario("GET /api/tasks/{id}/", "get", f"/api/tasks/{task.id}/"),
+        Scenario(
+            "PUT /api/tasks/{id}/",
+            "put",
+            f"/api/tasks/{task.id}/",
+            {"title": task.title},
+        ),
+        Scenario(
+            "PATCH /api/tasks/{id}/",
+            "patch",
+            f"/api/tasks/{task.id}/",
+            {"priority": task.priority},
+        ),
+        Scenario("DELETE /api/tasks/{id}/", "delete", prepare=delete_task),
+        # Comments
+        Scenario("GET /api/tasks/{id}/comments/", "get", comments_url),
+        Scenario(
+            "POST /api/tasks/{id}/comments/",
+            "post",
+            comments_url,
+            {"content": "Posted by the benchmark"},
+        ),
+        Scenario("GET /api/comments/{id}/", "get", f"/api/comments/{comment.id}/"),
+        Scenario(
+            "PUT /api/comments/{id}/",
+            "put",
+            f"/api/comments/{comment.id}/",
+            {"content": comment.content},
+        ),
+        Scenario("DELETE /api/comments/{id}/", "delete", prepare=delete_comment),
+    ]
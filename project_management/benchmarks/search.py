@@ -0,0 +1,122 @@
+"""
+Full-text search benchmark.
+
+Fills a throwaway test database with `--comments` comments (a million by
+default) spread over `--projects` projects, then times
+GET /api/projects/{id}/search/ for a few queries, served from the full-text
+index and from the `icontains` fallback.
+
+    python benchmarks/search.py --comments 1000000 --projects 100
+"""
+
+import argparse
+import itertools
+import random
+import time
+from datetime import timedelta
+from unittest import mock
+
+from common import percentiles, setup_django, test_database
+
+setup_django()
+
+from django.db import connection  # noqa: E402
+from django.utils import timezone  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from api.models import Users, Projects, ProjectMembers, Tasks, Comments  # noqa: E402
+
+# A Zipf-distributed vocabulary: `word0` is in most texts, `word5000` in few
+VOCABULARY = [f"word{rank}" for rank in range(20000)]
+CUMULATIVE_WEIGHTS = list(
+    itertools.accumulate(1 / (rank + 1) for rank in range(len(VOCABULARY)))
+)
+
+QUERIES = ["word0", "word50", "word5000", "word3 word40", "missing"]
+
+
+def sentence(rng, words):
+    return " ".join(rng.choices(VOCABULARY, cum_weights=CUMULATIVE_WEIGHTS, k=words))
+
+
+def build(comments, projects, batch_size=10000):
+    rng = random.Random(0)
+    user = Users.objects.create_user(
+        username="bench", email="bench@example.com", password="x"
+    )
+    project_list = Projects.objects.bulk_create(
+        [
+            Projects(name=f"Project {i}", description="", owner=user)
+            for i in range(projects)
+        ]
+    )
+    ProjectMembers.objects.bulk_create(
+        [ProjectMembers(project=p, user=user, role="Admin") for p in project_list]
+    )
+    due_date = timezone.now() + timedelta(days=7)
+    tasks = Tasks.objects.bulk_create(
+        [
+            Tasks(
+                title=sentence(rng, 4),
+                description=sentence(rng, 30),
+                project=project_list[i % projects],
+                due_date=due_date,
+            )
+            for i in range(max(comments // 20, projects))
+        ],
+        batch_size=batch_size,
+    )
+    started = time.perf_counter()
+    for offset in range(0, comments, batch_size):
+        Comments.objects.bulk_create(
+            [
+                Comments(content=sentence(rng, 20), user=user, task=rng.choice(tasks))
+                for _ in range(min(batch_size, comments - offset))
+            ]
+        )
+    elapsed = time.perf_counter() - started
+    print(
+        f"{comments} comments, {len(tasks)} tasks, {projects} projects"
+        f" (inserted and indexed at {comments / elapsed:,.0f} comments/s)"
+    )
+    return user, project_list[0]
+
+
+def measure(label, client, url, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(url)
+        timings.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.status_code
+    latency = percentiles(timings)
+    print(
+        f"  {label:<32} p50 {latency[50] * 1000:8.2f} ms"
+        f"  p95 {latency[95] * 1000:8.2f} ms"
+        f"  {len(response.data['results'])} hits"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--comments", type=int, default=1000000)
+    parser.add_argument("--projects", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    with test_database():
+        print(f"Backend: {connection.vendor}")
+        user, project = build(args.comments, args.projects)
+        client = APIClient()
+        client.force_authenticate(user)
+        for label, indexed in (("index", True), ("icontains", False)):
+            print(f"{label}:")
+            with mock.patch("api.search.has_search_index", return_value=indexed):
+                for query in QUERIES:
+                    for page in (1, 5):
+                        url = f"/api/projects/{project.id}/search/"
+                        url += f"?q={query}&page={page}"
+                        measure(f"{query!r} page {page}", client, url, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
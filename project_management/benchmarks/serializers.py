@@ -0,0 +1,102 @@
+"""
+Lean serializer benchmark.
+
+Builds `--rows` tasks in a throwaway test database and times fetching and
+rendering all of them with `TaskSerializer` through DRF and through the
+compiled lean serializer, checking that both render the same JSON.
+
+    python benchmarks/serializers.py --rows 100 10000 100000
+"""
+
+import argparse
+import random
+import time
+from datetime import timedelta
+
+from common import percentiles, setup_django, test_database
+
+setup_django()
+
+from django.utils import timezone  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from api.lean import get_lean_serializer  # noqa: E402
+from api.models import Users, Projects, Tasks  # noqa: E402
+from api.querysets import optimize_queryset  # noqa: E402
+from api.serializers import TaskSerializer  # noqa: E402
+
+
+def build(count):
+    owner = Users.objects.create_user(
+        username=f"owner{count}", email=f"owner{count}@example.com", password="x"
+    )
+    assignees = [
+        Users.objects.create_user(
+            username=f"user{count}-{i}", email=f"user{count}-{i}@example.com"
+        )
+        for i in range(10)
+    ] + [None]
+    project = Projects.objects.create(name="Project", description="", owner=owner)
+    now = timezone.now()
+    Tasks.objects.bulk_create(
+        [
+            Tasks(
+                title=f"Task {i}",
+                description="Description of the task " * 4,
+                project=project,
+                assigned_to=random.choice(assignees),
+                due_date=now + timedelta(days=random.randint(-30, 30)),
+            )
+            for i in range(count)
+        ],
+        batch_size=1000,
+    )
+    return Tasks.objects.filter(project=project).order_by("id")
+
+
+def drf(queryset):
+    queryset = optimize_queryset(queryset, TaskSerializer)
+    return TaskSerializer(list(queryset), many=True).data
+
+
+def lean(queryset):
+    serializer = get_lean_serializer(TaskSerializer)
+    return serializer.render_many(list(serializer.values(queryset)))
+
+
+def measure(label, render, queryset, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        data = render(queryset)
+        timings.append(time.perf_counter() - started)
+    latency = percentiles(timings)
+    rate = len(data) / latency[50] if latency[50] else 0
+    print(
+        f"  {label:<5} p50 {latency[50] * 1000:9.2f} ms"
+        f"  p95 {latency[95] * 1000:9.2f} ms  {rate:10,.0f} rows/s"
+    )
+    return latency[50], data
+
+
+def run(count, repeat):
+    queryset = build(count)
+    print(f"{count} rows:")
+    drf_time, expected = measure("drf", drf, queryset, repeat)
+    lean_time, data = measure("lean", lean, queryset, repeat)
+    assert JSONRenderer().render(data) == JSONRenderer().render(expected)
+    print(f"  speedup {drf_time / lean_time:.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    with test_database():
+        for count in args.rows:
+            run(count, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
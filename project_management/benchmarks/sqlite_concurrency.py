@@ -0,0 +1,118 @@
+"""
+SQLite concurrency benchmark.
+
+For the default SQLite settings and the tuned ones (WAL, busy timeout,
+BEGIN IMMEDIATE, see `DATABASES` in settings), creates a database file,
+then runs `--writers` processes posting comments with
+POST /api/tasks/{id}/comments/ and `--readers` processes listing them with
+GET /api/tasks/{id}/comments/ for `--seconds`, and prints the throughput,
+the "database is locked" errors and the latency of each.
+
+    python benchmarks/sqlite_concurrency.py --writers 8 --readers 8 --seconds 10
+
+Each worker is a separate process with its own connection, as under a
+multi-process server, so Django is set up in the workers rather than here.
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from common import percentiles, setup_django
+
+MODES = {"default": "0", "tuned": "1"}
+
+
+def prepare():
+    setup_django()
+    from django.core.management import call_command
+
+    from api.models import Users, Projects, Tasks
+
+    call_command("migrate", verbosity=0)
+    user = Users.objects.create_user(
+        username="owner", email="owner@example.com", password="x"
+    )
+    project = Projects.objects.create(name="Project", description="", owner=user)
+    task = Tasks.objects.create(
+        title="Task", description="", project=project, due_date="2030-01-01T00:00Z"
+    )
+    return user.pk, task.pk
+
+
+def work(role, user_id, task_id, start, seconds):
+    setup_django()
+    from django.db import OperationalError
+    from django.test.utils import setup_test_environment
+    from rest_framework.test import APIClient
+
+    from api.models import Users
+
+    setup_test_environment()  # Lets the test client's host in
+    client = APIClient()
+    client.force_authenticate(Users.objects.get(pk=user_id))
+    url = f"/api/tasks/{task_id}/comments/"
+    timings, errors = [], 0
+    time.sleep(max(0, start - time.time()))
+    while time.time() < start + seconds:
+        started = time.perf_counter()
+        try:
+            if role == "writer":
+                response = client.post(url, {"content": "Comment"}, format="json")
+            else:
+                response = client.get(url, {"page_size": 50})
+        except OperationalError:
+            errors += 1
+            continue
+        if response.status_code >= 400:
+            errors += 1
+            continue
+        timings.append(time.perf_counter() - started)
+    return role, timings, errors
+
+
+def run(mode, args):
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as directory:
+        # Inherited by the worker processes
+        os.environ["DATABASE_NAME"] = os.path.join(directory, "db.sqlite3")
+        os.environ["DATABASE_SQLITE_TUNED"] = MODES[mode]
+        with context.Pool(1) as pool:
+            user_id, task_id = pool.apply(prepare)
+
+        roles = ["writer"] * args.writers + ["reader"] * args.readers
+        with context.Pool(len(roles)) as pool:
+            # All workers start together, once every process is up
+            start = time.time() + 5
+            results = pool.starmap(
+                work,
+                [(role, user_id, task_id, start, args.seconds) for role in roles],
+            )
+
+    print(f"{mode}:")
+    for role in ("writer", "reader"):
+        timings = [t for r, samples, _ in results if r == role for t in samples]
+        errors = sum(e for r, _, e in results if r == role)
+        latency = percentiles(timings) if timings else {50: 0, 95: 0, 99: 0}
+        print(
+            f"  {role}s {len(timings) / args.seconds:8.1f} req/s"
+            f"  errors {errors:5d}"
+            f"  p50 {latency[50] * 1000:8.2f} ms"
+            f"  p99 {latency[99] * 1000:8.2f} ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+    for mode in MODES:
+        run(mode, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,502 @@
+"""
+API benchmark suite.
+
+Runs every scenario of scenarios.py (one or more per route of api/urls.py)
+`--repeat` times in each of `--rounds` rounds, as the owner of a generated
+project, and prints the latency percentiles, throughput and database
+queries of each. Requests go through the test client in this process, one
+at a time, so the numbers are the server side of a request, without the
+network.
+
+    python benchmarks/suite.py                                # throwaway database
+    python benchmarks/suite.py --database /tmp/large.sqlite3  # copy of generate.py's
+
+Without `--database`, the `--scale` data (see generate.py) is generated into
+a throwaway test database. The run is compared with `--baseline` when that
+was recorded on the same data: a scenario whose best round median is more
+than `--tolerance` slower, or that runs more queries, is a regression and the
+suite exits with status 1, as it does when a route has no scenario.
+Baseline latencies are first scaled by how fast the machine is compared to
+when they were recorded, timed with a workload that runs none of the
+project's code. `--save-baseline` records the run as the baseline instead.
+
+    python benchmarks/suite.py --concurrency 32               # ASGI against WSGI
+
+`--concurrency` runs the read routes of api/async_views.py instead, with
+that many requests in flight, once through the ASGI handler (async views,
+on an event loop) and once through the WSGI handler (DRF viewsets, on as
+many threads), each in a process of its own on the same data. Clients are
+in-process and fast, so this measures the servers' own overhead, not the
+slow clients an event loop is meant to absorb (see async_reads.py).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from io import BytesIO
+from pathlib import Path
+
+from common import percentiles, setup_django, test_database
+from generate import SCALES
+
+BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+# The routes api/async_views.py serves under ASGI
+SERVER_PATHS = [
+    "/api/projects/",
+    "/api/projects/{project}/",
+    "/api/projects/{project}/tasks/",
+    "/api/tasks/{task}/",
+    "/api/tasks/{task}/comments/",
+    "/api/comments/{comment}/",
+]
+
+
+def calibrate():
+    """
+    Seconds taken by a fixed workload that runs none of the project's code
+    (Python, JSON and SQLite), to tell how fast the machine is right now.
+    """
+    rows = [{"id": i, "title": f"Task {i}", "done": i % 3 == 0} for i in range(500)]
+    database = sqlite3.connect(":memory:")
+    database.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, title TEXT)")
+    database.executemany(
+        "INSERT INTO t VALUES (?, ?)", [(i, str(i)) for i in range(500)]
+    )
+    query = "SELECT title FROM t WHERE id % 7 = 0 ORDER BY title"
+    started = time.perf_counter()
+    for _ in range(10):
+        json.loads(json.dumps(rows))
+        database.execute(query).fetchall()
+        sorted((row["title"] for row in rows), reverse=True)
+    elapsed = time.perf_counter() - started
+    database.close()
+    return elapsed
+
+
+def view_actions(patterns):
+    """
+    `Class.action` (or the view's name) of every route under `patterns`.
+    """
+    actions = set()
+    for pattern in patterns:
+        if hasattr(pattern, "url_patterns"):
+            actions |= view_actions(pattern.url_patterns)
+            continue
+        callback = pattern.callback
+        if not getattr(callback, "actions", None):
+            actions.add(view_action(callback, None))
+            continue
+        for method, action in callback.actions.items():
+            # Routes may map methods to actions a viewset does not have
+            if hasattr(callback.cls, action):
+                actions.add(view_action(callback, method))
+    return actions
+
+
+def view_action(callback, method):
+    cls = getattr(callback, "cls", None) or getattr(callback, "view_class", None)
+    if cls is None:
+        return callback.__name__
+    actions = getattr(callback, "actions", None)
+    if not actions:
+        return cls.__name__
+    return f"{cls.__name__}.{actions[method]}"
+
+
+def run(scenario, client, iterations, warmup):
+    """
+    Time `scenario`'s requests. Returns the `Class.action` they were routed
+    to, their timings and their query counts.
+    """
+    from django.urls import resolve
+
+    from api.querywatch import watch_queries
+
+    timings, queries = [], []
+    for iteration in iterations:
+        path, data = scenario.request(iteration)
+        with watch_queries() as report:
+            started = time.perf_counter()
+            response = getattr(client, scenario.method)(
+                path, data, format="json", headers=scenario.headers
+            )
+            if response.streaming:
+                b"".join(response.streaming_content)
+            elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            detail = getattr(response, "data", "")
+            sys.exit(f"{scenario.name}: {response.status_code} {detail}")
+        if iteration >= warmup:
+            timings.append(elapsed)
+            queries.append(report.queries)
+    match = resolve(path.split("?")[0])
+    return view_action(match.func, scenario.method), timings, queries
+
+
+def summarize(rounds, queries):
+    """
+    Percentiles of the timings of all `rounds`, and the lowest median of a
+    round, which bursts of load on the machine affect the least.
+    """
+    timings = [timing for round_timings in rounds for timing in round_timings]
+    latency = percentiles(timings)
+    return {
+        "p50": latency[50] * 1000,
+        "p95": latency[95] * 1000,
+        "p99": latency[99] * 1000,
+        "best_p50": min(statistics.median(timings) for timings in rounds) * 1000,
+        "rps": len(timings) / sum(timings),
+        "queries": statistics.median_low(queries),
+    }
+
+
+def compare(result, baseline, speed, tolerance):
+    """
+    The regressions of `result` against `baseline`, as text. `speed` is how
+    much slower the machine is than when the baseline was recorded.
+    """
+    problems = []
+    change = result["best_p50"] / (baseline["best_p50"] * speed) - 1
+    if change > tolerance:
+        problems.append(f"p50 {change:+.0%}")
+    if result["queries"] > baseline["queries"]:
+        problems.append(f"queries {baseline['queries']} -> {result['queries']}")
+    return problems
+
+
+def copy_database(path, directory):
+    copy = os.path.join(directory, "db.sqlite3")
+    for suffix in ("", "-wal"):
+        if os.path.exists(path + suffix):
+            shutil.copy(path + suffix, copy + suffix)
+    return copy
+
+
+def asgi_requests(paths, headers, concurrency):
+    """
+    Send GET `paths` to the ASGI handler, `concurrency` at a time. Returns
+    their timings.
+    """
+    from django.core.asgi import get_asgi_application
+
+    application = get_asgi_application()
+    headers = [(name.lower().encode(), value.encode()) for name, value in headers]
+
+    async def request(path, semaphore):
+        async with semaphore:
+            messages = []
+            received = False
+
+            async def receive():
+                nonlocal received
+                if received:
+                    # The client stays connected until the response is sent
+                    await asyncio.Future()
+                received = True
+                return {"type": "http.request", "body": b""}
+
+            async def send(message):
+                messages.append(message)
+
+            scope = {
+                "type": "http",
+                "asgi": {"version": "3.0"},
+                "http_version": "1.1",
+                "method": "GET",
+                "scheme": "http",
+                "path": path,
+                "query_string": b"",
+                "headers": headers,
+                "server": ("testserver", 80),
+                "client": ("127.0.0.1", 50000),
+            }
+            started = time.perf_counter()
+            await application(scope, receive, send)
+            elapsed = time.perf_counter() - started
+            if messages[0]["status"] != 200:
+                sys.exit(f"asgi GET {path}: {messages[0]['status']}")
+            return elapsed
+
+    async def run():
+        semaphore = asyncio.Semaphore(concurrency)
+        return await asyncio.gather(*(request(path, semaphore) for path in paths))
+
+    return asyncio.run(run())
+
+
+def wsgi_requests(paths, headers, concurrency):
+    """
+    Send GET `paths` to the WSGI handler from `concurrency` threads. Returns
+    their timings.
+    """
+    from django.core.wsgi import get_wsgi_application
+
+    application = get_wsgi_application()
+    headers = {
+        "HTTP_" + name.upper().replace("-", "_"): value for name, value in headers
+    }
+
+    def request(path):
+        environ = {
+            "REQUEST_METHOD": "GET",
+            "PATH_INFO": path,
+            "QUERY_STRING": "",
+            "SERVER_NAME": "testserver",
+            "SERVER_PORT": "80",
+            "SERVER_PROTOCOL": "HTTP/1.1",
+            "REMOTE_ADDR": "127.0.0.1",
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": "http",
+            "wsgi.input": BytesIO(),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+            **headers,
+        }
+        statuses = []
+        started = time.perf_counter()
+        body = application(environ, lambda status, *args: statuses.append(status))
+        try:
+            b"".join(body)
+        finally:
+            body.close()
+        elapsed = time.perf_counter() - started
+        if not statuses[0].startswith("200"):
+            sys.exit(f"wsgi GET {path}: {statuses[0]}")
+        return elapsed
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        return list(pool.map(request, paths))
+
+
+def serve(server, concurrency, requests):
+    """
+    Time `requests` reads through `server` ("asgi" or "wsgi") in this
+    process, once Django is set up on the data to read.
+    """
+    from django.db import connections
+    from django.test.utils import setup_test_environment
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from scenarios import Fixture
+
+    setup_test_environment(debug=False)  # Lets "testserver" in
+    fixture = Fixture()
+    ids = {
+        "project": fixture.project.id,
+        "task": fixture.task.id,
+        "comment": fixture.comment.id,
+    }
+    headers = [("Authorization", f"Bearer {AccessToken.for_user(fixture.user)}")]
+    connections.close_all()
+    paths = [
+        SERVER_PATHS[i % len(SERVER_PATHS)].format(**ids) for i in range(requests)
+    ]
+    send = asgi_requests if server == "asgi" else wsgi_requests
+    send(paths[: concurrency * 2], headers, concurrency)  # Warm up
+    started = time.perf_counter()
+    timings = send(paths, headers, concurrency)
+    elapsed = time.perf_counter() - started
+    latency = percentiles(timings)
+    return {
+        "rps": requests / elapsed,
+        "p50": latency[50] * 1000,
+        "p95": latency[95] * 1000,
+        "p99": latency[99] * 1000,
+    }
+
+
+def compare_servers(args):
+    """
+    Serve the same reads under ASGI and under WSGI, each in a fresh process.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        if args.database:
+            database = copy_database(args.database, directory)
+        else:
+            database = os.path.join(directory, "db.sqlite3")
+            generate = Path(__file__).resolve().parent / "generate.py"
+            command = [sys.executable, generate, "--scale", args.scale]
+            subprocess.run(
+                [*command, "--database", database],
+                check=True,
+                stdout=subprocess.DEVNULL,
+            )
+        results = {}
+        for server in ("wsgi", "asgi"):
+            environ = {
+                **os.environ,
+                "DATABASE_ENGINE": "sqlite",
+                "DATABASE_NAME": database,
+                "API_ASYNC_READS": "1" if server == "asgi" else "0",
+            }
+            command = [
+                sys.executable,
+                __file__,
+                "--server",
+                server,
+                "--concurrency",
+                str(args.concurrency),
+                "--requests",
+                str(args.requests),
+            ]
+            output = subprocess.run(
+                command, env=environ, check=True, capture_output=True, text=True
+            ).stdout
+            results[server] = json.loads(output.splitlines()[-1])
+
+    dataset = os.path.basename(args.database) if args.database else args.scale
+    print(f"{args.requests} reads, {args.concurrency} in flight, {dataset} data")
+    print(f"{'server':<6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for server, result in results.items():
+        print(
+            f"{server:<6} {result['rps']:8.1f} {result['p50']:8.2f}"
+            f" {result['p95']:8.2f} {result['p99']:8.2f}"
+        )
+    ratio = results["asgi"]["rps"] / results["wsgi"]["rps"]
+    print(f"ASGI/WSGI throughput: {ratio:.2f}x")
+    if args.output:
+        run_data = {
+            "dataset": dataset,
+            "concurrency": args.concurrency,
+            "servers": results,
+        }
+        args.output.write_text(json.dumps(run_data, indent=2) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--database", metavar="PATH", help="SQLite file to copy.")
+    parser.add_argument("--repeat", type=int, default=20, help="Requests per round.")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--only", help="Run the scenarios whose name contains this.")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    parser.add_argument("--output", type=Path, help="Write the results as JSON.")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        help="Compare ASGI and WSGI with this many reads in flight instead.",
+    )
+    parser.add_argument("--requests", type=int, default=3000)
+    # Internal: one side of `--concurrency`, run by `compare_servers()`
+    parser.add_argument("--server", choices=["asgi", "wsgi"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.server:
+        setup_django()
+        print(json.dumps(serve(args.server, args.concurrency, args.requests)))
+        return
+    if args.concurrency:
+        compare_servers(args)
+        return
+
+    directory = tempfile.TemporaryDirectory()
+    if args.database:
+        # Writes go to a copy, so every run starts from the same data
+        os.environ["DATABASE_ENGINE"] = "sqlite"
+        os.environ["DATABASE_NAME"] = copy_database(args.database, directory.name)
+    # GET /metrics is only served with a token
+    os.environ.setdefault("API_METRICS_TOKEN", "benchmark")
+    setup_django()
+
+    from django.test.utils import setup_test_environment
+    from django.urls import get_resolver
+    from rest_framework.test import APIClient
+
+    from generate import generate
+    from scenarios import Fixture, build_scenarios
+
+    dataset = os.path.basename(args.database) if args.database else args.scale
+    with directory, (nullcontext() if args.database else test_database()):
+        if args.database:
+            setup_test_environment()  # Lets the test client's host in
+        else:
+            generate(args.scale, report=lambda line: None)
+        fixture = Fixture()
+        client = APIClient()
+        client.force_authenticate(fixture.user)
+        scenarios = [
+            scenario
+            for scenario in build_scenarios(fixture)
+            if not args.only or args.only in scenario.name
+        ]
+        timings = {scenario.name: [] for scenario in scenarios}
+        queries = {scenario.name: [] for scenario in scenarios}
+        covered, calibration = set(), [calibrate()]
+        # Every round runs each scenario in turn, so that a slow spell of the
+        # machine does not land on a single scenario
+        for number in range(args.rounds):
+            start = 0 if number == 0 else args.warmup + number * args.repeat
+            stop = args.warmup + (number + 1) * args.repeat
+            for scenario in scenarios:
+                action, round_timings, round_queries = run(
+                    scenario, client, range(start, stop), args.warmup
+                )
+                covered.add(action)
+                timings[scenario.name].append(round_timings)
+                queries[scenario.name] += round_queries
+                # Sampled all along, as the machine's speed drifts during a run
+                calibration.append(calibrate())
+    results = {name: summarize(timings[name], queries[name]) for name in timings}
+    calibration = statistics.median(calibration) * 1000
+
+    run_data = {"dataset": dataset, "calibration": calibration, "scenarios": results}
+    baseline, speed = {}, 1
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(run_data, indent=2) + "\n")
+    elif args.baseline.exists():
+        stored = json.loads(args.baseline.read_text())
+        if stored["dataset"] == dataset:
+            baseline = stored["scenarios"]
+            speed = calibration / stored["calibration"]
+            print(f"Machine speed against the baseline: {1 / speed:.2f}x")
+        else:
+            print(f"Baseline is for {stored['dataset']!r} data, not compared.")
+    if args.output:
+        args.output.write_text(json.dumps(run_data, indent=2) + "\n")
+
+    regressions = 0
+    print(
+        f"{'scenario':<52} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+        f" {'req/s':>8} {'queries':>7}  baseline"
+    )
+    for name, result in results.items():
+        line = (
+            f"{name:<52} {result['p50']:8.2f} {result['p95']:8.2f}"
+            f" {result['p99']:8.2f} {result['rps']:8.1f} {result['queries']:7d}"
+        )
+        if name in baseline:
+            problems = compare(result, baseline[name], speed, args.tolerance)
+            regressions += bool(problems)
+            change = result["best_p50"] / (baseline[name]["best_p50"] * speed) - 1
+            line += "  " + (", ".join(problems) if problems else f"ok ({change:+.0%})")
+        print(line)
+
+    # urls.py is the urlconf the API routes are in
+    missing = sorted(view_actions(get_resolver("api.urls").url_patterns) - covered)
+    if missing and not args.only:
+        print(f"Routes without a scenario: {', '.join(missing)}")
+    if regressions:
+        print(f"{regressions} regression(s) against {args.baseline}")
+    if regressions or (missing and not args.only):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
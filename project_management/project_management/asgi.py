@@ -12,5 +12,21 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project_management.settings')
+# Serve read endpoints with the async ORM when running under ASGI
+os.environ.setdefault('API_ASYNC_READS', '1')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once Django is set up, since it loads models
+from api.realtime import websocket_application  # noqa: E402
+
+
+async def application(scope, receive, send):
+    """
+    Serve WebSocket connections (task and comment events per project) and
+    hand everything else to Django.
+    """
+    if scope["type"] == "websocket":
+        await websocket_application(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -41,6 +42,9 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = "api.Users"  # Custom user model
 
 MIDDLEWARE = [
+    "api.metrics.MetricsMiddleware",
+    "api.querywatch.QueryWatchMiddleware",
+    "api.compression.CompressionMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -72,22 +76,196 @@ WSGI_APPLICATION = "project_management.wsgi.application"
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
+# SQLite by default (at DATABASE_NAME, tuned for concurrent requests unless
+# DATABASE_SQLITE_TUNED=0). DATABASE_ENGINE=postgres (`pip install "psycopg[pool]"`)
+# connects to DATABASE_HOST with DATABASE_NAME, DATABASE_USER and
+# DATABASE_PASSWORD, keeping connections open for DATABASE_CONN_MAX_AGE
+# seconds, or pooling up to DATABASE_POOL_SIZE of them per process when set.
+# DATABASE_REPLICA_HOSTS (comma-separated host[:port]) adds read replicas for
+# the list and retrieve endpoints, see api/routers.py.
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+
+def _postgres(host):
+    host, _, port = host.strip().partition(":")
+    database = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": os.environ.get("DATABASE_NAME", "project_management"),
+        "USER": os.environ.get("DATABASE_USER", "postgres"),
+        "PASSWORD": os.environ.get("DATABASE_PASSWORD", ""),
+        "HOST": host,
+        "PORT": port or os.environ.get("DATABASE_PORT", "5432"),
+    }
+    pool_size = int(os.environ.get("DATABASE_POOL_SIZE", "0"))
+    if pool_size:
+        # psycopg's pool checks connections on checkout; it cannot be
+        # combined with persistent connections
+        database["OPTIONS"] = {
+            "pool": {
+                "min_size": int(os.environ.get("DATABASE_POOL_MIN_SIZE", "2")),
+                "max_size": pool_size,
+            }
+        }
+    else:
+        database["CONN_MAX_AGE"] = int(os.environ.get("DATABASE_CONN_MAX_AGE", "60"))
+        database["CONN_HEALTH_CHECKS"] = True
+    return database
+
+
+if os.environ.get("DATABASE_ENGINE", "sqlite") == "postgres":
+    DATABASES = {"default": _postgres(os.environ.get("DATABASE_HOST", "localhost"))}
+    DATABASES.update(
+        {
+            # Tests read the primary through the replica aliases
+            f"replica_{number}": {**_postgres(host), "TEST": {"MIRROR": "default"}}
+            for number, host in enumerate(
+                os.environ.get("DATABASE_REPLICA_HOSTS", "").split(","), 1
+            )
+            if host.strip()
+        }
+    )
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.environ.get("DATABASE_NAME", BASE_DIR / "db.sqlite3"),
+        }
     }
+    if os.environ.get("DATABASE_SQLITE_TUNED", "1") == "1":
+        # Readers and a writer run concurrently (WAL), writers wait for the
+        # lock instead of failing, and transactions take the write lock up
+        # front so they cannot deadlock upgrading a read lock
+        DATABASES["default"]["OPTIONS"] = {
+            "init_command": (
+                "PRAGMA journal_mode=WAL;"
+                "PRAGMA synchronous=NORMAL;"
+                "PRAGMA mmap_size=268435456;"  # 256 MB
+                "PRAGMA cache_size=-65536;"  # 64 MB
+            ),
+            "transaction_mode": "IMMEDIATE",
+            "timeout": 20,  # Seconds waiting for the write lock
+        }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["api.routers.PrimaryReplicaRouter"]
+# How long a user's reads stay on the primary after they write
+DATABASE_REPLICA_STICKY_SECONDS = int(
+    os.environ.get("DATABASE_REPLICA_STICKY_SECONDS", "10")
+)
+
+# Caches
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# The "api" cache holds serialized detail responses. Local memory is per
+# process; point it at a shared backend in production, e.g.
+# API_CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# API_CACHE_LOCATION=redis://127.0.0.1:6379/1
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "api": {
+        "BACKEND": os.environ.get(
+            "API_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("API_CACHE_LOCATION", "api-responses"),
+    },
+}
+
+# Read-through cache for project, task and member detail responses
+API_RESPONSE_CACHE = {
+    "ENABLED": True,
+    "ALIAS": "api",
+    "TIMEOUT": 300,  # Seconds; also bounds staleness if an invalidation is lost
+}
+
+# Per-user project roles (api.permissions), cached in the "api" cache. A
+# membership change clears them at once with a shared cache backend; with
+# local memory other processes keep the old roles for up to TIMEOUT seconds.
+API_PROJECT_ROLES = {
+    "TIMEOUT": int(os.environ.get("API_PROJECT_ROLES_TIMEOUT", "30")),
+}
+
+# Project stats endpoint (api.stats). With SUMMARY on, counts are read from a
+# summary table maintained on every write; run `manage.py rebuild_project_stats`
+# after turning it on.
+API_PROJECT_STATS = {
+    "SUMMARY": os.environ.get("API_PROJECT_STATS_SUMMARY", "0") == "1",
+}
+
+# Serve GET on the project, task and comment list/detail routes with async
+# views (api/async_views.py). Enabled by project_management/asgi.py.
+API_ASYNC_READS = os.environ.get("API_ASYNC_READS", "0") == "1"
+
+# Render list endpoints from `values()` rows with compiled serializers
+# (api/lean.py) instead of DRF's field-by-field serialization.
+API_LEAN_SERIALIZERS = os.environ.get("API_LEAN_SERIALIZERS", "0") == "1"
+
+# Response compression (api.compression). ENCODINGS is the server's preference
+# among those the client accepts; br and zstd need `pip install brotli` /
+# `pip install zstandard` and are skipped without them.
+API_COMPRESSION = {
+    "MIN_SIZE": 1024,  # Bytes; smaller responses are sent as is
+    "ENCODINGS": ["zstd", "br", "gzip"],
+    "LEVELS": {"gzip": 6, "br": 4, "zstd": 3},
+}
+
+# Per-view request metrics (api.metrics), served in the Prometheus format on
+# GET /metrics. Scrapes must send API_METRICS_TOKEN as a bearer token; without
+# it, /metrics is only served with DEBUG on.
+API_METRICS = {
+    "ENABLED": os.environ.get("API_METRICS", "1") == "1",
+    "TOKEN": os.environ.get("API_METRICS_TOKEN", ""),
+}
+
+# N+1 and slow query detection (api.querywatch), logged on the "api.queries"
+# logger with the view, serializer and line of code running them.
+API_QUERY_WATCH = {
+    "ENABLED": os.environ.get("API_QUERY_WATCH", "1") == "1",
+    "REPEAT_THRESHOLD": 5,  # Runs of one statement in a request to call it an N+1
+    "SLOW_QUERY_MS": 200,
+}
+
+# Broadcast layer for WebSocket task and comment events (see api/realtime.py)
+API_BROADCAST = {
+    "BACKEND": "api.realtime.LocalBroadcastBackend",
+    "OPTIONS": {"max_queue": 100},  # Per-client backlog before dropping old events
+    "RECHECK_SECONDS": 60,  # Between membership checks of each open WebSocket
 }
 
 # REST Framework configuration
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",  # Enable JWT
+        "api.authentication.CachedJWTAuthentication",  # JWT, users cached in-process
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",  # Require authentication globally
     ],
+    # orjson when installed, DRF's stdlib JSON otherwise (api.renderers)
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "api.renderers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+    # Cursor pagination page sizes per list endpoint (`?page_size=` up to `max`)
+    "PAGE_SIZE_LIMITS": {
+        "default": {"default": 50, "max": 200},
+        "projects": {"default": 50, "max": 200},
+        "members": {"default": 100, "max": 500},
+        "tasks": {"default": 100, "max": 500},
+        "comments": {"default": 100, "max": 500},
+        "search": {"default": 20, "max": 100},
+    },
+}
+
+# In-process cache of authenticated users (api.authentication). A user
+# deactivated from another process is rejected at most TTL seconds later.
+API_AUTH_CACHE = {
+    "ttl": 30,  # Seconds; 0 disables the cache
+    "max_size": 1024,
 }
 
 # JWT configuration
@@ -98,6 +276,32 @@ SIMPLE_JWT = {
     "BLACKLIST_AFTER_ROTATION": True,  # Blacklist rotated refresh tokens
 }
 
+# Password hashing (api.hashers). ALGORITHM hashes new passwords; hashes made
+# with another algorithm or other OPTIONS are upgraded when their owner logs in.
+# argon2 needs `pip install argon2-cffi`.
+API_PASSWORD_HASHING = {
+    "ALGORITHM": os.environ.get("API_PASSWORD_ALGORITHM", "scrypt"),
+    "OPTIONS": {
+        "argon2": {"time_cost": 2, "memory_cost": 102400, "parallelism": 8},
+        "scrypt": {"work_factor": 2**14, "block_size": 8, "parallelism": 5},
+        "pbkdf2_sha256": {"iterations": 870000},
+    },
+    "WORKERS": int(os.environ.get("API_PASSWORD_WORKERS", 4)),  # Concurrent hashes
+    "QUEUE": 64,  # Logins waiting for a worker before 503 responses
+    "TIMEOUT": 10,  # Seconds a login waits for its result
+}
+
+_PASSWORD_HASHERS = {
+    "argon2": "api.hashers.Argon2PasswordHasher",
+    "scrypt": "api.hashers.ScryptPasswordHasher",
+    "pbkdf2_sha256": "api.hashers.PBKDF2PasswordHasher",
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[API_PASSWORD_HASHING["ALGORITHM"]]] + [
+    path
+    for algorithm, path in _PASSWORD_HASHERS.items()
+    if algorithm != API_PASSWORD_HASHING["ALGORITHM"]
+]
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 